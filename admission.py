@@ -0,0 +1,216 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, request
+from task_dao import DelegatingTaskDAO
+
+# Admission control for TaskResource, so that overload is turned away at the door instead of queueing on the DAO
+# until every client times out:
+#  - token buckets per client (and optionally per client and route) answer 429 with Retry-After when exhausted
+#  - a cap on in-flight DAO calls; a call waits for a slot at most max_queue_time and is otherwise shed with a
+#    503 and Retry-After, as is any call arriving while max_waiting calls are already queued
+# The cap wraps the DAO behind a CachingTaskDAO, so cache hits never take a slot. Streams (iter_tasks) are not
+# capped: they pull from the DAO while the client reads, and a slow reader holding a slot would starve the rest.
+# Nothing here runs unless install_admission() is called.
+
+DEFAULT_MAX_CLIENTS = 10000 # token buckets kept, least recently seen clients are forgotten (and start full again)
+ADMITTED_METHODS = ("get_tasks", "get_task", "status_counts", "create_task", "update_task", "delete_task",
+                    "create_tasks", "update_tasks", "delete_tasks")
+
+
+class OverloadedError(Exception):
+    """Raised when a DAO call is shed because no slot freed up within the queue-time budget."""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds))) # Retry-After takes whole seconds
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst, now):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, rate, burst, now):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class RateLimiter:
+    # rate requests per second with bursts of up to burst, per client; route_limits {endpoint: (rate, burst)} adds
+    # a tighter bucket per client for those routes. A request takes a token from every bucket that applies, or from
+    # none of them. Buckets live in one LRU dict under one lock: a refill is two float operations.
+    def __init__(self, rate, burst=None, route_limits=None, max_clients=DEFAULT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.route_limits = route_limits or {}
+        self.max_clients = max_clients
+        self.buckets = OrderedDict() # {(client, endpoint or None): TokenBucket}
+        self.lock = threading.Lock()
+
+    def _bucket(self, key, burst, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(burst, now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, client, endpoint=None, now=None):
+        # Returns 0.0 when admitted, otherwise the seconds until the request would be
+        now = time.monotonic() if now is None else now
+        limits = [((client, None), self.rate, self.burst)]
+        if endpoint in self.route_limits:
+            limits.append(((client, endpoint),) + tuple(self.route_limits[endpoint]))
+        with self.lock:
+            buckets = []
+            wait = 0.0
+            for key, rate, burst in limits:
+                bucket = self._bucket(key, burst, now)
+                bucket.refill(rate, burst, now)
+                if bucket.tokens < 1.0:
+                    wait = max(wait, (1.0 - bucket.tokens) / rate)
+                buckets.append(bucket)
+            if wait:
+                return wait
+            for bucket in buckets:
+                bucket.tokens -= 1.0
+            return 0.0
+
+
+class ConcurrencyLimiter:
+    # At most max_in_flight holders; others wait in line up to max_queue_time, and arrivals beyond max_waiting
+    # queued are refused outright since they would only wait out the budget.
+    def __init__(self, max_in_flight, max_queue_time=0.1, max_waiting=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue_time = max_queue_time
+        self.max_waiting = max_waiting if max_waiting is not None else 4 * max_in_flight
+        self.in_flight = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        # Returns None when admitted, otherwise why not: "queue_full" or "timeout"
+        with self.condition:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                return None
+            if self.waiting >= self.max_waiting:
+                return "queue_full"
+            deadline = time.monotonic() + self.max_queue_time
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self.condition.wait(remaining):
+                        if self.in_flight < self.max_in_flight: # freed just as the wait timed out
+                            break
+                        return "timeout"
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            return None
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+
+class AdmissionTaskDAO(DelegatingTaskDAO):
+    # Holds a ConcurrencyLimiter slot for the duration of each TaskDAO call
+    def __init__(self, dao, limiter, counters):
+        super().__init__(dao)
+        self.limiter = limiter
+        self.counters = counters
+        for method in ADMITTED_METHODS:
+            setattr(self, method, self._admit(getattr(dao, method)))
+
+    def _admit(self, call):
+        def admitted(*args, **kwargs):
+            refused = self.limiter.acquire()
+            if refused is not None:
+                self.counters.inc(f"shed_{refused}")
+                raise OverloadedError("Server is overloaded, retry later", self.limiter.max_queue_time)
+            try:
+                return call(*args, **kwargs)
+            finally:
+                self.limiter.release()
+        return admitted
+
+
+class AdmissionCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {"admitted": 0, "rate_limited": 0, "shed_queue_full": 0, "shed_timeout": 0}
+
+    def inc(self, name):
+        with self.lock:
+            self.values[name] += 1
+
+
+class AdmissionController:
+    def __init__(self, rate_limiter=None, concurrency=None):
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.counters = AdmissionCounters()
+
+    def stats(self):
+        with self.counters.lock:
+            stats = dict(self.counters.values)
+        if self.concurrency is not None:
+            stats["in_flight"] = self.concurrency.in_flight
+            stats["waiting"] = self.concurrency.waiting
+        return stats
+
+
+def _remote_addr():
+    return request.remote_addr # behind a proxy, pass a client_key that reads the forwarded address instead
+
+
+def install_admission(app, resource, rate=None, burst=None, route_limits=None, max_in_flight=None, max_queue_time=0.1,
+                      max_waiting=None, client_key=_remote_addr, registry=None):
+    # Rate limits the /tasks routes of `resource` (a TaskResource) when rate is set, and caps its in-flight DAO calls
+    # when max_in_flight is set. With a metrics registry (see install_metrics) the counters are exported at /metrics.
+    controller = AdmissionController(RateLimiter(rate, burst, route_limits) if rate else None,
+                                     ConcurrencyLimiter(max_in_flight, max_queue_time, max_waiting) if max_in_flight else None)
+    counters = controller.counters
+    if controller.concurrency is not None:
+        resource.wrap_dao(lambda dao: AdmissionTaskDAO(dao, controller.concurrency, counters))
+
+    def rejection(message, status, retry_after):
+        response = jsonify({"message": message})
+        response.status_code = status
+        response.headers["Retry-After"] = retry_after_header(retry_after)
+        return response
+
+    @app.before_request
+    def admit_request():
+        if not request.path.startswith("/tasks"):
+            return None
+        if controller.rate_limiter is not None:
+            wait = controller.rate_limiter.acquire(client_key(), request.endpoint)
+            if wait:
+                counters.inc("rate_limited")
+                return rejection("Too many requests", 429, wait)
+        counters.inc("admitted")
+        return None
+
+    @app.errorhandler(OverloadedError)
+    def handle_overloaded(error):
+        return rejection(str(error), 503, error.retry_after)
+
+    if registry is not None:
+        registry.collectors.append(lambda: [
+            (f"taskmanager_admission_{name}" + ("" if name in ("in_flight", "waiting") else "_total"),
+             "gauge" if name in ("in_flight", "waiting") else "counter", f"Admission control {name.replace('_', ' ')}", {}, value)
+            for name, value in controller.stats().items()])
+    return controller
@@ -1,10 +1,91 @@
 from flask import Flask
 from task_resource import TaskResource
-from db_task_dao import DBTaskDAO
 
-app = Flask(__name__) # creating Flask instance
+# Backends are imported only when selected, so an in-memory worker never loads SQLAlchemy.
+# TASK_BACKEND: "memory" (default), "columnar" (needs numpy), "wal" (TASK_DATA_DIR), "db" (SQLALCHEMY_DATABASE_URI,
+# tables created on start; TASK_GROUP_COMMIT batches concurrent writes, see GroupCommitWriter), "tiered" (the "db"
+# database behind an in-memory working set with write-behind, see TieredTaskDAO), "sharded" (TASK_SHARDS SQLite
+# files in TASK_DATA_DIR, see ShardedTaskDAO) or "remote"
+# (TASK_STORE_ADDRESS and TASK_STORE_AUTHKEY, see prefork.py); TASK_CACHE puts CachingTaskDAO in front.
+# TASK_RATE_LIMIT and TASK_MAX_IN_FLIGHT turn on admission control (see install_admission), TASK_JOBS_DIR the
+# background job routes (see install_jobs).
+DEFAULT_CONFIG = {
+    "TASK_BACKEND": "memory",
+    "TASK_CACHE": False,
+    "TASK_GROUP_COMMIT": False,
+    "TASK_COMMIT_DELAY": 0.0, # seconds a group commit batch stays open for more writes
+    "TASK_COMMIT_BATCH": 256, # writes per group commit batch at most
+    "TASK_HOT_CAPACITY": 100_000, # tasks the tiered backend keeps in memory
+    "TASK_MAX_STALENESS": 1.0, # seconds a tiered write may wait before it is written to the database
+    "TASK_SHARDS": 4, # fixed once the sharded backend has written its files
+    "TASK_RATE_LIMIT": None, # requests per second per client
+    "TASK_RATE_BURST": None, # defaults to one second's worth
+    "TASK_MAX_IN_FLIGHT": None, # concurrent DAO calls
+    "TASK_MAX_QUEUE_TIME": 0.1, # seconds a DAO call may wait for a slot before the request is shed with a 503
+    "TASK_JOBS_DIR": None, # jobs.db and export files
+    "TASK_JOB_WORKERS": 1, # jobs running at once
+}
 
-task_api = TaskResource(app) # setting up endpoints through API
+
+def create_dao(app):
+    config = app.config
+    backend = config["TASK_BACKEND"]
+    if backend == "memory":
+        from in_memory_task_dao import InMemoryDAO
+        dao = InMemoryDAO()
+    elif backend == "columnar":
+        from columnar_task_dao import ColumnarTaskDAO
+        dao = ColumnarTaskDAO()
+    elif backend == "wal":
+        from wal_task_dao import WALTaskDAO
+        dao = WALTaskDAO(config["TASK_DATA_DIR"])
+    elif backend in ("db", "tiered"):
+        from db_task_dao import db, DBTaskDAO, GroupCommitWriter, init_db, is_memory_uri
+        config.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///tasks.db")
+        if backend == "tiered" and is_memory_uri(config["SQLALCHEMY_DATABASE_URI"]):
+            raise ValueError("the tiered backend needs a file-backed database, not :memory:")
+        config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
+        init_db(app)
+        with app.app_context():
+            db.create_all(bind_key=None)
+        if backend == "tiered":
+            from tiered_task_dao import TieredTaskDAO
+            dao = TieredTaskDAO(app, DBTaskDAO(db), config["TASK_HOT_CAPACITY"], config["TASK_MAX_STALENESS"])
+        else:
+            group_commit = None
+            if config["TASK_GROUP_COMMIT"]:
+                group_commit = GroupCommitWriter(app, db, config["TASK_COMMIT_DELAY"], config["TASK_COMMIT_BATCH"])
+            dao = DBTaskDAO(db, group_commit=group_commit)
+    elif backend == "sharded":
+        from sharded_task_dao import ShardedTaskDAO
+        dao = ShardedTaskDAO(config["TASK_DATA_DIR"], config["TASK_SHARDS"])
+    elif backend == "remote":
+        from shared_store import RemoteTaskDAO
+        dao = RemoteTaskDAO(config["TASK_STORE_ADDRESS"], config["TASK_STORE_AUTHKEY"])
+    else:
+        raise ValueError(f"unknown TASK_BACKEND {backend!r}")
+    if config["TASK_CACHE"]:
+        from cached_task_dao import CachingTaskDAO
+        dao = CachingTaskDAO(dao)
+    return dao
+
+
+def create_app(config=None):
+    app = Flask(__name__) # creating Flask instance
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    resource = TaskResource(app, create_dao(app)) # setting up endpoints through API
+    if app.config["TASK_RATE_LIMIT"] or app.config["TASK_MAX_IN_FLIGHT"]:
+        from admission import install_admission
+        install_admission(app, resource, rate=app.config["TASK_RATE_LIMIT"], burst=app.config["TASK_RATE_BURST"],
+                          max_in_flight=app.config["TASK_MAX_IN_FLIGHT"], max_queue_time=app.config["TASK_MAX_QUEUE_TIME"])
+    if app.config["TASK_JOBS_DIR"]:
+        from jobs import install_jobs
+        install_jobs(app, resource, app.config["TASK_JOBS_DIR"], workers=app.config["TASK_JOB_WORKERS"])
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run()
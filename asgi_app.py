@@ -0,0 +1,219 @@
+import json
+import re
+from urllib.parse import parse_qsl, urlencode
+from async_task_dao import AsyncInMemoryDAO
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+from task_json import dumps_tasks
+from task_resource import (Task, STREAM_CHUNK_SIZE, parse_int_arg, parse_task_query, parse_if_match, parse_bulk_create,
+                           parse_bulk_update, parse_bulk_delete, prepare_bulk, finish_bulk)
+from task_dao import check_task_fields, next_cursor, task_etag
+
+# Asyncio serving mode: the /tasks routes and {"message": ...} error contract of TaskResource as a plain ASGI
+# application over an AsyncTaskDAO, so one process can hold many concurrent connections. Serve it with any ASGI
+# server, e.g. `uvicorn asgi_app:app` (in-memory store) or create_asgi_app(AsyncDBTaskDAO(...)).
+
+TASK_PATH = re.compile(r"^/tasks/(\d+)$")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        self.body = body
+
+    def json(self):
+        if self.headers.get("content-type", "").split(";")[0].strip() != "application/json":
+            raise HTTPError(415, "Invalid request format")
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(415, "Invalid JSON format")
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send(send, status, body=b"", content_type="application/json", headers=()):
+    raw_headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    raw_headers.extend((name.encode(), value.encode()) for name, value in headers)
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class TaskApp:
+    def __init__(self, dao):
+        self.dao = dao
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        request = Request(scope, await _read_body(receive))
+        try:
+            await self._dispatch(request, send)
+        except HTTPError as error:
+            await _send(send, error.status, json.dumps({"message": str(error)}).encode(), headers=error.headers)
+        except TaskNotFoundError as error:
+            await _send(send, 404, json.dumps({"message": str(error)}).encode())
+        except InvalidTaskError as error:
+            await _send(send, 400, json.dumps({"message": str(error)}).encode())
+        except VersionConflictError as error:
+            await _send(send, 412, json.dumps({"message": str(error)}).encode())
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                close = getattr(self.dao, "close", None)
+                if close is not None:
+                    await close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, request, send):
+        if request.path == "/tasks":
+            handlers = {"GET": self.get_tasks, "POST": self.create_task}
+            args = ()
+        elif request.path == "/tasks/bulk":
+            handlers = {"POST": self.create_tasks, "PATCH": self.update_tasks, "DELETE": self.delete_tasks}
+            args = ()
+        else:
+            match = TASK_PATH.match(request.path)
+            if match is None:
+                raise HTTPError(404, "Not found")
+            handlers = {"GET": self.get_task, "PATCH": self.update_task, "DELETE": self.delete_task}
+            args = (int(match.group(1)),)
+        handler = handlers.get(request.method)
+        if handler is None:
+            raise HTTPError(405, "Method not allowed", headers=[("allow", ", ".join(sorted(handlers)))])
+        await handler(request, send, *args)
+
+    async def get_tasks(self, request, send):
+        try:
+            query = parse_task_query(request.args)
+            limit = parse_int_arg(request.args, "limit", minimum=1)
+        except ValueError as error:
+            raise HTTPError(400, str(error))
+        stream = request.args.get("stream")
+        if stream is None and "application/x-ndjson" in request.headers.get("accept", ""):
+            stream = "ndjson"
+        if stream is not None:
+            if stream not in ("ndjson", "json"):
+                raise HTTPError(400, "stream must be 'ndjson' or 'json'")
+            await self._stream_tasks(send, query, limit, ndjson=stream == "ndjson")
+            return
+
+        tasks = await self.dao.get_tasks(limit=limit, **query)
+        headers = []
+        next_after_id = next_cursor(tasks, limit, query["sort"])
+        if next_after_id is not None:
+            next_args = urlencode(dict(request.args, after_id=next_after_id))
+            headers.append(("link", f'</tasks?{next_args}>; rel="next"'))
+        await _send(send, 200, dumps_tasks(tasks), headers=headers)
+
+    async def _stream_tasks(self, send, query, limit, ndjson):
+        # NDJSON lines, or one JSON array written a chunk at a time (the same bytes as the Flask route's)
+        content_type = b"application/x-ndjson" if ndjson else b"application/json"
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type)]}) # chunked, no content-length
+        chunk = []
+        sent = 0
+        separator = b"" if ndjson else b"["
+        tasks = self.dao.iter_tasks(**query)
+        try:
+            async for task in tasks:
+                chunk.append(task.to_json_bytes())
+                sent += 1
+                if len(chunk) == STREAM_CHUNK_SIZE:
+                    await send({"type": "http.response.body", "body": self._join(chunk, separator, ndjson), "more_body": True})
+                    chunk = []
+                    separator = b"" if ndjson else b","
+                if limit is not None and sent == limit:
+                    break
+        finally:
+            await tasks.aclose() # releases the DB cursor when stopping early
+        body = self._join(chunk, separator, ndjson) if chunk else b""
+        if not ndjson:
+            body += b"]" if sent else b"[]"
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _join(chunk, separator, ndjson):
+        if ndjson:
+            return b"".join(task + b"\n" for task in chunk)
+        return separator + b",".join(chunk)
+
+    async def _send_task(self, send, status, task):
+        etag = task_etag(task)
+        await _send(send, status, task.to_json_bytes(), headers=[] if etag is None else [("etag", f'"{etag}"')])
+
+    async def get_task(self, request, send, task_id):
+        await self._send_task(send, 200, await self.dao.get_task(task_id))
+
+    async def create_task(self, request, send):
+        data = request.json()
+        if not isinstance(data, dict):
+            raise HTTPError(415, "Invalid request format")
+        if "title" not in data:
+            raise HTTPError(400, "Title is required")
+        task = Task(data["title"], data.get("description", ""), data.get("status", "Pending"))
+        check_task_fields(task)
+        task = await self.dao.create_task(task)
+        await self._send_task(send, 201, task)
+
+    async def update_task(self, request, send, task_id):
+        data = request.json()
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must contain JSON data")
+        partial_task = Task.from_json(data)
+        check_task_fields(partial_task)
+        partial_task.id = task_id
+        partial_task.version = parse_if_match(request.headers.get("if-match"))
+        await self._send_task(send, 200, await self.dao.update_task(partial_task))
+
+    async def delete_task(self, request, send, task_id):
+        await self.dao.delete_task(task_id)
+        await _send(send, 204, content_type="text/plain")
+
+    async def _bulk(self, request, send, parse, dao_batch, success_status):
+        try:
+            results, parsed = prepare_bulk(request.json(), parse)
+        except ValueError as error:
+            raise HTTPError(400, str(error))
+        body, status = finish_bulk(results, parsed, await dao_batch([item for _, item in parsed]), success_status)
+        await _send(send, status, json.dumps(body).encode())
+
+    async def create_tasks(self, request, send):
+        await self._bulk(request, send, parse_bulk_create, self.dao.create_tasks, 201)
+
+    async def update_tasks(self, request, send):
+        await self._bulk(request, send, parse_bulk_update, self.dao.update_tasks, 200)
+
+    async def delete_tasks(self, request, send):
+        await self._bulk(request, send, parse_bulk_delete, self.dao.delete_tasks, 200)
+
+
+def create_asgi_app(dao=None):
+    return TaskApp(dao if dao is not None else AsyncInMemoryDAO())
+
+
+app = create_asgi_app()
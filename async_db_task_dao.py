@@ -0,0 +1,71 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from async_task_dao import AsyncTaskDAO
+from db_task_dao import DBTask, row_to_task, select_tasks, update_task_query, update_miss
+from errors import TaskNotFoundError, InvalidTaskError
+
+
+class AsyncDBTaskDAO(AsyncTaskDAO):
+    # The tasks table through SQLAlchemy's asyncio engine, e.g. "sqlite+aiosqlite:///tasks.db" (needs aiosqlite).
+    # Shares the table, FTS5 triggers and query building with DBTaskDAO; runs Core statements without Flask.
+    def __init__(self, url, **engine_options):
+        self.engine = create_async_engine(url, **engine_options)
+
+    async def create_all(self):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(DBTask.__table__.create, checkfirst=True)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    def _select_tasks(self, **query):
+        return select_tasks(self.engine.dialect.name, **query)
+
+    async def count(self):
+        async with self.engine.connect() as connection:
+            return (await connection.execute(select(func.count()).select_from(DBTask))).scalar_one()
+
+    async def get_tasks(self, limit=None, **query):
+        query = self._select_tasks(**query)
+        if limit is not None:
+            query = query.limit(limit)
+        async with self.engine.connect() as connection:
+            return [row_to_task(row) for row in await connection.execute(query)]
+
+    async def iter_tasks(self, **query):
+        async with self.engine.connect() as connection:
+            result = await connection.stream(self._select_tasks(**query)) # server-side cursor, rows fetched as consumed
+            async for row in result:
+                yield row_to_task(row)
+
+    async def get_task(self, task_id):
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(self._select_tasks().where(DBTask.id == task_id))).first()
+        if row is None:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return row_to_task(row)
+
+    async def create_task(self, task):
+        if not task.title:
+            raise InvalidTaskError("Task must have a title")
+        async with self.engine.begin() as connection:
+            result = await connection.execute(insert(DBTask).values(
+                title=task.get_title(), description=task.get_description(), status=task.get_status()))
+        task.id = result.inserted_primary_key[0]
+        task.version = 1
+        return task
+
+    async def update_task(self, partial_task):
+        async with self.engine.begin() as connection: # one UPDATE ... RETURNING round trip
+            row = (await connection.execute(update_task_query(partial_task))).first()
+            if row is None:
+                raise update_miss(partial_task, (await connection.execute(
+                    select(DBTask.version).where(DBTask.id == partial_task.id))).scalar())
+        return row_to_task(row)
+
+    async def delete_task(self, task_id):
+        async with self.engine.begin() as connection:
+            result = await connection.execute(delete(DBTask).where(DBTask.id == task_id))
+        if result.rowcount == 0:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return True
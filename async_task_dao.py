@@ -0,0 +1,90 @@
+import asyncio
+from itertools import islice
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+from in_memory_task_dao import InMemoryDAO
+
+ITER_CHUNK_SIZE = 256 # tasks yielded between event-loop yields when streaming
+
+
+class AsyncTaskDAO:
+    # Coroutine twin of TaskDAO for the ASGI serving mode (asgi_app.py): same arguments, results and errors.
+    # len() cannot await, so the count is count().
+    async def count(self):
+        raise NotImplementedError
+
+    async def get_tasks(self, limit=None, **query):
+        raise NotImplementedError
+
+    async def iter_tasks(self, **query): # async generator
+        raise NotImplementedError
+
+    async def get_task(self, task_id):
+        raise NotImplementedError
+
+    async def create_task(self, task):
+        raise NotImplementedError
+
+    async def update_task(self, task):
+        raise NotImplementedError
+
+    async def delete_task(self, task_id):
+        raise NotImplementedError
+
+    async def create_tasks(self, tasks):
+        return [await self._try(self.create_task, task) for task in tasks]
+
+    async def update_tasks(self, partial_tasks):
+        return [await self._try(self.update_task, partial_task) for partial_task in partial_tasks]
+
+    async def delete_tasks(self, task_ids):
+        return [await self._try(self.delete_task, task_id) for task_id in task_ids]
+
+    @staticmethod
+    async def _try(operation, item):
+        try:
+            return await operation(item)
+        except (TaskNotFoundError, InvalidTaskError, VersionConflictError) as error:
+            return error
+
+
+class AsyncInMemoryDAO(AsyncTaskDAO):
+    # InMemoryDAO never blocks on I/O, so its calls run inline on the event loop; long streams yield between chunks
+    def __init__(self, dao=None):
+        self.dao = dao if dao is not None else InMemoryDAO()
+
+    async def count(self):
+        return len(self.dao)
+
+    async def get_tasks(self, limit=None, **query):
+        return self.dao.get_tasks(limit=limit, **query)
+
+    async def iter_tasks(self, **query):
+        tasks = self.dao.iter_tasks(**query)
+        while True:
+            chunk = list(islice(tasks, ITER_CHUNK_SIZE))
+            if not chunk:
+                return
+            for task in chunk:
+                yield task
+            await asyncio.sleep(0)
+
+    async def get_task(self, task_id):
+        return self.dao.get_task(task_id)
+
+    async def create_task(self, task):
+        return self.dao.create_task(task)
+
+    async def update_task(self, task):
+        return self.dao.update_task(task)
+
+    async def delete_task(self, task_id):
+        return self.dao.delete_task(task_id)
+
+    async def create_tasks(self, tasks):
+        return self.dao.create_tasks(tasks)
+
+    async def update_tasks(self, partial_tasks):
+        return self.dao.update_tasks(partial_tasks)
+
+    async def delete_tasks(self, task_ids):
+        return self.dao.delete_tasks(task_ids)
@@ -0,0 +1,45 @@
+# Throughput of importing tasks one POST /tasks at a time versus POST /tasks/bulk.
+# Run from the repo root: python -m benchmarks.bench_bulk [--count 10000] [--backends memory sqlite-file]
+import argparse
+import time
+
+from benchmarks.common import BACKENDS, make_app
+
+
+def per_item(client, count):
+    for i in range(count):
+        client.post('/tasks', json={"title": f"Task {i}", "description": "imported"})
+
+
+def bulk(client, count, batch_size):
+    for start in range(0, count, batch_size):
+        batch = [{"title": f"Task {i}", "description": "imported"} for i in range(start, min(start + batch_size, count))]
+        client.post('/tasks/bulk', json=batch)
+
+
+def measure(backend, count, load):
+    app, dao = make_app(backend)
+    client = app.test_client()
+    start = time.perf_counter()
+    load(client, count)
+    elapsed = time.perf_counter() - start
+    assert len(dao) == count
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-item versus bulk task import throughput")
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':>14} {'per-item':>14} {'bulk':>14} {'speedup':>8}")
+    for backend in args.backends:
+        single_rate = measure(backend, args.count, per_item)
+        bulk_rate = measure(backend, args.count, lambda client, count: bulk(client, count, args.batch_size))
+        print(f"{backend:>14} {single_rate:>10.0f}/s {bulk_rate:>10.0f}/s {bulk_rate / single_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
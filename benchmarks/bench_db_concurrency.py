@@ -0,0 +1,84 @@
+# Concurrent readers and writers on a file-backed SQLite DBTaskDAO: default engine versus the init_db profile
+# (WAL, synchronous=NORMAL, mmap, busy_timeout, pooled connections) with and without the read-only pool.
+# Run from the repo root: python -m benchmarks.bench_db_concurrency [--readers 8 --writers 2 --duration 5]
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from db_task_dao import db, DBTaskDAO, init_db, READ_ONLY_BIND
+from task import Task
+
+
+def make_app(mode):
+    path = os.path.join(tempfile.mkdtemp(prefix="taskmanager-bench-"), "tasks.db")
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    if mode == "default":
+        db.init_app(app)
+    else:
+        read_only_uri = f"sqlite:///file:{path}?mode=ro&uri=true" if mode == "profile+readonly" else None
+        init_db(app, db, {"read_only_uri": read_only_uri})
+    with app.app_context():
+        db.create_all()
+        DBTaskDAO(db).create_tasks([Task(f"Task {i}", "seed", "Pending") for i in range(10_000)])
+    return app, READ_ONLY_BIND if mode == "profile+readonly" else None
+
+
+def worker(app, read_bind, role, deadline, counts, lock):
+    done = errors = 0
+    rng = random.Random()
+    with app.app_context():
+        dao = DBTaskDAO(db, read_bind=read_bind)
+        while time.monotonic() < deadline:
+            try:
+                if role == "writer":
+                    dao.create_task(Task("Written", "", "Pending"))
+                elif rng.random() < 0.5:
+                    dao.get_task(rng.randint(1, 10_000))
+                else:
+                    dao.get_tasks(limit=50, after_id=rng.randint(0, 9_950))
+                done += 1
+            except OperationalError: # "database is locked"
+                errors += 1
+            finally:
+                db.session.remove()
+    with lock:
+        counts[role] += done
+        counts["errors"] += errors
+
+
+def run(mode, readers, writers, duration):
+    app, read_bind = make_app(mode)
+    counts = {"reader": 0, "writer": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=worker, args=(app, read_bind, role, deadline, counts, lock))
+               for role in ["reader"] * readers + ["writer"] * writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {name: value / duration for name, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite engine profile concurrency benchmark")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'engine':>18} {'reads/s':>10} {'writes/s':>10} {'errors/s':>10}")
+    for mode in ["default", "profile", "profile+readonly"]:
+        r = run(mode, args.readers, args.writers, args.duration)
+        print(f"{mode:>18} {r['reader']:>10.0f} {r['writer']:>10.0f} {r['errors']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# DBTaskDAO read paths over a large SQLite table: ORM hydration (the old get_tasks) against column rows.
+# Run from the repo root: python -m benchmarks.bench_db_reads [--rows 1000000]
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+
+from db_task_dao import db, DBTask, DBTaskDAO
+from task import Task
+
+
+def orm_get_tasks(): # get_tasks as it was: full ORM instances, then a copy into Task
+    tasks = []
+    for db_task in DBTask.query.all():
+        task = Task(title=db_task.title, description=db_task.description, status=db_task.status)
+        task.id = db_task.id
+        tasks.append(task)
+    return tasks
+
+
+def populate(path, rows):
+    connection = sqlite3.connect(path)
+    connection.executemany("INSERT INTO tasks (title, description, status) VALUES (?, ?, ?)",
+                           ((f"Task {i}", "Description", "Pending") for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+def timed(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>32}: {elapsed:>8.3f}s  peak {peak / 2**20:>8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DBTaskDAO read path benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="taskmanager-bench-"), "tasks.db")
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        populate(path, args.rows)
+        dao = DBTaskDAO(db)
+        timed("ORM query.all() + copy", orm_get_tasks)
+        db.session.remove()
+        timed("get_tasks (column rows)", dao.get_tasks)
+        timed("iter_tasks (yield_per stream)", lambda: sum(1 for _ in dao.iter_tasks()))
+        timed("query(DBTask).count()", lambda: db.session.query(DBTask).count())
+        timed("len(dao) (SELECT count(*))", lambda: len(dao))
+
+
+if __name__ == "__main__":
+    main()
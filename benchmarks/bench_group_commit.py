@@ -0,0 +1,88 @@
+# DBTaskDAO writes under many concurrent clients: one commit per write versus GroupCommitWriter batches, on a
+# file-backed SQLite database with the init_db profile. --synchronous FULL fsyncs every commit (the case group
+# commit helps most); the profile default NORMAL only fsyncs at checkpoints.
+# Run from the repo root: python -m benchmarks.bench_group_commit [--clients 64] [--delays 0 0.002] [--synchronous FULL]
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from db_task_dao import db, DBTaskDAO, GroupCommitWriter, init_db, PRODUCTION_ENGINE_PROFILE
+from task import Task
+
+SEED_TASKS = 1000
+
+
+def run(clients, duration, delay, batch, synchronous):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='taskmanager-bench-'), 'tasks.db')}"
+    pragmas = dict(PRODUCTION_ENGINE_PROFILE["sqlite_pragmas"], synchronous=synchronous)
+    init_db(app, db, {"pool_size": clients + 1, "sqlite_pragmas": pragmas})
+    with app.app_context():
+        db.create_all(bind_key=None)
+        DBTaskDAO(db).create_tasks([Task(f"Task {i}", "seed", "Pending") for i in range(SEED_TASKS)])
+    writer = GroupCommitWriter(app, db, max_delay=delay, max_batch=batch) if delay is not None else None
+    dao = DBTaskDAO(db, group_commit=writer)
+    latencies, errors = [], []
+    barrier = threading.Barrier(clients + 1)
+    deadline = None
+
+    def client():
+        rng = random.Random()
+        with app.app_context():
+            barrier.wait()
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    if rng.random() < 0.5:
+                        dao.create_task(Task("Written", "by a client", "Pending"))
+                    else:
+                        partial_task = Task(status=rng.choice(["Pending", "Done"]))
+                        partial_task.id = rng.randint(1, SEED_TASKS)
+                        dao.update_task(partial_task)
+                    latencies.append(time.perf_counter() - start)
+                except OperationalError: # "database is locked" past busy_timeout
+                    db.session.rollback()
+                    errors.append(1)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    if writer is not None:
+        writer.close()
+    with app.app_context():
+        db.engine.dispose()
+    latencies.sort()
+    return {"wps": len(latencies) / duration, "errors": len(errors),
+            "p50_ms": latencies[len(latencies) // 2] * 1000, "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+            "per_commit": writer.writes / max(1, writer.batches) if writer is not None else 1.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DBTaskDAO group commit under concurrent writers")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.0, 0.002], help="group commit max_delay values")
+    parser.add_argument("--batch", type=int, default=256, help="group commit max_batch")
+    parser.add_argument("--synchronous", choices=["NORMAL", "FULL"], default="NORMAL")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, synchronous={args.synchronous}")
+    print(f"{'mode':>20} {'writes/s':>10} {'p50':>10} {'p99':>10} {'per commit':>11} {'errors':>7}")
+    for delay in [None] + args.delays:
+        r = run(args.clients, args.duration, delay, args.batch, args.synchronous)
+        mode = "commit per write" if delay is None else f"group {delay * 1000:g}ms"
+        print(f"{mode:>20} {r['wps']:>10.0f} {r['p50_ms']:>8.1f}ms {r['p99_ms']:>8.1f}ms {r['per_commit']:>11.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
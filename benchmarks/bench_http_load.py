@@ -0,0 +1,111 @@
+# Load test: the Flask app (threaded werkzeug server) against the ASGI app (uvicorn) over real sockets.
+# Reports requests/s and p50/p99 latency for a read-heavy mix at a given number of concurrent clients.
+# Run from the repo root: python -m benchmarks.bench_http_load [--servers flask asgi] [--concurrency 64]
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+
+SEED_TASKS = 1000
+
+
+def serve(kind, port):
+    if kind == "flask":
+        from flask import Flask
+        from werkzeug.serving import run_simple
+        from task_resource import TaskResource
+        app = Flask(__name__)
+        TaskResource(app)
+        run_simple("127.0.0.1", port, app, threaded=True)
+    else:
+        import uvicorn
+        from asgi_app import app
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = b"" if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def wait_until_up(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await request(port, "GET", "/tasks?limit=1")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def client(port, deadline, latencies, write_ratio):
+    while time.monotonic() < deadline:
+        roll = random.random()
+        start = time.perf_counter()
+        if roll < write_ratio:
+            await request(port, "PATCH", f"/tasks/{random.randint(1, SEED_TASKS)}", {"status": "Completed"})
+        elif roll < 0.5:
+            await request(port, "GET", "/tasks?limit=20")
+        else:
+            await request(port, "GET", f"/tasks/{random.randint(1, SEED_TASKS)}")
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(port, concurrency, duration, write_ratio):
+    await wait_until_up(port)
+    await request(port, "POST", "/tasks/bulk", [{"title": f"Task {i}"} for i in range(SEED_TASKS)])
+    latencies = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client(port, deadline, latencies, write_ratio) for _ in range(concurrency)))
+    latencies.sort()
+    return {"rps": len(latencies) / duration,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs ASGI serving load test")
+    parser.add_argument("--servers", nargs="+", choices=["flask", "asgi"], default=["flask", "asgi"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per server")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--serve", choices=["flask", "asgi"], help=argparse.SUPPRESS) # child process mode
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    print(f"{'server':>8} {'req/s':>10} {'p50':>10} {'p99':>10}   ({args.concurrency} clients)")
+    for kind in args.servers:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_http_load", "--serve", kind, "--port", str(port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            r = asyncio.run(load(port, args.concurrency, args.duration, args.write_ratio))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{kind:>8} {r['rps']:>10.0f} {r['p50_ms']:>8.1f}ms {r['p99_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
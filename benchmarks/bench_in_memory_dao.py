@@ -0,0 +1,58 @@
+# Per-request latency of InMemoryDAO single-task operations at growing store sizes.
+# Run from the repo root: python -m benchmarks.bench_in_memory_dao [--sizes 1000 10000 ...]
+import argparse
+import random
+import time
+
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+
+STATUSES = ["Pending", "In Progress", "Completed"]
+
+
+def fill(dao, size):
+    for i in range(size):
+        dao.create_task(Task(f"Task {i}", f"Description of task {i}", STATUSES[i % len(STATUSES)]))
+
+
+def time_op(op, ids):
+    start = time.perf_counter()
+    for task_id in ids:
+        op(task_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6 # microseconds per call
+
+
+def run(size, ops):
+    dao = InMemoryDAO()
+    fill(dao, size)
+    ids = random.sample(range(1, size + 1), min(ops, size))
+
+    def update(task_id):
+        partial_task = Task(status="Completed")
+        partial_task.id = task_id
+        dao.update_task(partial_task)
+
+    return {
+        "size": size,
+        "get_task_us": time_op(dao.get_task, ids),
+        "update_task_us": time_op(update, ids),
+        "get_tasks_by_status_ms": time_op(lambda _: dao.get_tasks(status="Pending"), ids[:10]) / 1000,
+        "delete_task_us": time_op(dao.delete_task, ids),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="InMemoryDAO per-request latency by store size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=1_000, help="single-task operations timed per size")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'get_task':>12} {'update_task':>12} {'delete_task':>12} {'by_status':>12}")
+    for size in args.sizes:
+        r = run(size, args.ops)
+        print(f"{r['size']:>10} {r['get_task_us']:>10.2f}us {r['update_task_us']:>10.2f}us "
+              f"{r['delete_task_us']:>10.2f}us {r['get_tasks_by_status_ms']:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Throughput of a shared InMemoryDAO as request threads are added (80% get_task, 20% update_task).
+# On a GIL build of CPython the gain is bounded by the interpreter lock; the figures show the locking adds
+# no contention collapse, and free-threaded builds can scale across the stripes.
+# Run from the repo root: python -m benchmarks.bench_in_memory_threads [--threads 1 2 4 8]
+import argparse
+import random
+import threading
+import time
+
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+
+
+def worker(dao, size, ops, start_barrier):
+    rng = random.Random()
+    start_barrier.wait()
+    for _ in range(ops):
+        task_id = rng.randint(1, size)
+        if rng.random() < 0.2:
+            partial_task = Task(status=rng.choice(["Pending", "Done"]))
+            partial_task.id = task_id
+            dao.update_task(partial_task)
+        else:
+            dao.get_task(task_id)
+
+
+def run(threads_count, size, ops):
+    dao = InMemoryDAO()
+    for i in range(size):
+        dao.create_task(Task(f"Task {i}", "", "Pending"))
+    barrier = threading.Barrier(threads_count + 1)
+    threads = [threading.Thread(target=worker, args=(dao, size, ops, barrier)) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return threads_count * ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="InMemoryDAO multi-threaded throughput")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=100_000, help="operations per thread")
+    args = parser.parse_args()
+
+    baseline = None
+    for threads_count in args.threads:
+        rate = run(threads_count, args.size, args.ops)
+        baseline = baseline or rate
+        print(f"{threads_count:>3} threads: {rate:>12,.0f} ops/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
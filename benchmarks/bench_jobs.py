@@ -0,0 +1,76 @@
+# Interactive latency while a background import runs: --clients threads read single tasks through the test
+# client while POST /jobs imports --size tasks, for each --pauses value between chunks, against no job at all.
+# Also reports how long the import took, so the cost of pausing is visible.
+# Run from the repo root: python -m benchmarks.bench_jobs [--size 200000] [--chunk-size 500] [--pauses 0 0.005]
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from in_memory_task_dao import InMemoryDAO
+from jobs import install_jobs
+from task import Task
+from task_resource import TaskResource
+
+SEED_TASKS = 1000
+
+
+def run(size, chunk_size, pause, clients):
+    directory = tempfile.mkdtemp(prefix="taskmanager-bench-")
+    app = Flask(__name__)
+    dao = InMemoryDAO()
+    dao.create_tasks([Task(f"Task {i}", "seed", "Pending") for i in range(SEED_TASKS)])
+    runner = install_jobs(app, TaskResource(app, dao), directory, chunk_size=chunk_size, pause=pause)
+    latencies = []
+    done = threading.Event()
+
+    def client():
+        rng = random.Random()
+        test_client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            test_client.get(f"/tasks/{rng.randint(1, SEED_TASKS)}")
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    if pause is None: # baseline: the clients alone for a second
+        time.sleep(1.0)
+    else:
+        location = app.test_client().post('/jobs', json={"type": "import", "tasks": [{"title": f"Imported {i}"} for i in range(size)]}).headers["Location"]
+        while app.test_client().get(location).get_json()["status"] not in ("succeeded", "failed"):
+            time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in threads:
+        thread.join()
+    runner.close()
+    shutil.rmtree(directory)
+    latencies = sorted(latencies) or [float("nan")] # --clients 0 times the import alone
+    return elapsed, len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GET /tasks/<id> latency during a background import job")
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--pauses", type=float, nargs="+", default=[0.0, 0.005])
+    parser.add_argument("--clients", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"import of {args.size:,} tasks in chunks of {args.chunk_size}, {args.clients} reading clients")
+    print(f"{'job':>14} {'import':>9} {'reads/s':>9} {'p50':>8} {'p99':>8}")
+    for pause in [None] + args.pauses:
+        elapsed, reads, p50, p99 = run(args.size, args.chunk_size, pause, args.clients)
+        label = "none" if pause is None else f"pause {pause:g}s"
+        print(f"{label:>14} {'' if pause is None else f'{elapsed:.2f}s':>9} {reads:>9,.0f} {p50:>6.2f}ms {p99:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
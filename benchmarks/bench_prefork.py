@@ -0,0 +1,76 @@
+# Pre-fork scaling: python -m prefork with 1..N workers over one shared in-memory store, driven by several load
+# generator processes so the client is not the bottleneck. Reports requests/s and p50/p99 latency per worker count;
+# throughput should grow with workers up to the core count, then flatten where the store process saturates.
+# Run from the repo root: python -m benchmarks.bench_prefork [--workers 1 2 4 8] [--clients 4] [--concurrency 64]
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.bench_http_load import SEED_TASKS, client, free_port, request, wait_until_up
+
+
+def start_server(workers, port):
+    server = subprocess.Popen([sys.executable, "-m", "prefork", "--workers", str(workers), "--port", str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    line = server.stderr.readline() # "serving on http://host:port with N workers"
+    if not re.search(r":\d+ with", line):
+        server.kill()
+        raise RuntimeError(f"prefork did not start: {line!r}")
+    # keep draining the workers' request log, a full pipe would block them
+    threading.Thread(target=server.stderr.read, daemon=True).start()
+    return server
+
+
+def generate_load(port, concurrency, duration, write_ratio):
+    async def run():
+        latencies = []
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(client(port, deadline, latencies, write_ratio) for _ in range(concurrency)))
+        return latencies
+    return asyncio.run(run())
+
+
+def measure(port, clients, concurrency, duration, write_ratio):
+    async def seed():
+        await wait_until_up(port)
+        await request(port, "POST", "/tasks/bulk", [{"title": f"Task {i}"} for i in range(SEED_TASKS)])
+    asyncio.run(seed())
+    per_client = max(1, concurrency // clients)
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(generate_load, [(port, per_client, duration, write_ratio)] * clients)
+    latencies = sorted(latency for result in results for latency in result)
+    return {"rps": len(latencies) / duration,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork worker scaling")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent connections across all clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.clients} client processes, {args.concurrency} connections")
+    print(f"{'workers':>8} {'req/s':>10} {'p50':>10} {'p99':>10}")
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(workers, port)
+        try:
+            r = measure(port, args.clients, args.concurrency, args.duration, args.write_ratio)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{workers:>8} {r['rps']:>10.0f} {r['p50_ms']:>8.1f}ms {r['p99_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Write throughput of ShardedTaskDAO by shard count: --clients threads creating and updating tasks for --duration
+# seconds. One shard is a single SQLite write lock, like DBTaskDAO; each added shard adds a lock and a file that
+# commits on its own. --synchronous FULL fsyncs every commit, which is where parallel commits pay off most.
+# Run from the repo root: python -m benchmarks.bench_sharded [--shards 1 2 4 8] [--clients 16] [--synchronous FULL]
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from db_task_dao import PRODUCTION_ENGINE_PROFILE
+from sharded_task_dao import ShardedTaskDAO
+from task import Task
+
+SEED_TASKS = 1000
+
+
+def run(shards, clients, duration, synchronous):
+    directory = tempfile.mkdtemp(prefix="taskmanager-bench-")
+    dao = ShardedTaskDAO(directory, shards, dict(PRODUCTION_ENGINE_PROFILE["sqlite_pragmas"], synchronous=synchronous))
+    dao.create_tasks([Task(f"Task {i}", "seed", "Pending") for i in range(SEED_TASKS)])
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+    deadline = None
+
+    def client(n):
+        rng = random.Random(n)
+        barrier.wait()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            if rng.random() < 0.5:
+                dao.create_task(Task("Written", "by a client", "Pending"))
+            else:
+                partial_task = Task(status=rng.choice(["Pending", "Done"]))
+                partial_task.id = rng.randint(1, SEED_TASKS)
+                dao.update_task(partial_task)
+            latencies[n].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    start = time.perf_counter()
+    dao.get_tasks(status="Done", limit=1000)
+    list_ms = (time.perf_counter() - start) * 1000
+    dao.close()
+    shutil.rmtree(directory)
+    latencies = sorted(latency for per_client in latencies for latency in per_client)
+    return len(latencies) / duration, latencies[int(len(latencies) * 0.99)] * 1000, list_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShardedTaskDAO write throughput by shard count")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.duration:g}s, synchronous={args.synchronous}")
+    print(f"{'shards':>7} {'writes/s':>10} {'scaling':>8} {'p99 write':>10} {'list 1000':>10}")
+    baseline = None
+    for shards in args.shards:
+        rate, p99_ms, list_ms = run(shards, args.clients, args.duration, args.synchronous)
+        baseline = baseline or rate
+        print(f"{shards:>7} {rate:>10,.0f} {rate / baseline:>7.2f}x {p99_ms:>8.1f}ms {list_ms:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# GET /tasks/stats: status counts over --size tasks per backend, for every task, one status, and a title filter,
+# against the full scan (TaskDAO.status_counts' default) that a client had to do through GET /tasks before.
+# Each backend loads in its own subprocess so the reported peak RSS is its own.
+# Run from the repo root: python -m benchmarks.bench_stats [--size 1000000] [--backends memory columnar sqlite-file]
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKENDS, make_app
+from benchmarks.suite import peak_rss_mb
+
+STATUSES = ["Pending", "In progress", "Blocked", "Done"]
+BATCH = 10_000
+
+
+def best_ms(operation, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_backend(backend, size, repeat):
+    from task import Task
+    from task_dao import TaskDAO
+    rng = random.Random(0)
+    app, dao = make_app(backend)
+    for start in range(0, size, BATCH):
+        dao.create_tasks([Task(f"Task {i}" + (" report" if i % 10 == 0 else ""), "Description", rng.choice(STATUSES))
+                          for i in range(start, min(start + BATCH, size))])
+    return {
+        "all_ms": best_ms(lambda: dao.status_counts(), repeat),
+        "status_ms": best_ms(lambda: dao.status_counts(status="Done"), repeat),
+        "title_ms": best_ms(lambda: dao.status_counts(title="report"), repeat),
+        "scan_ms": best_ms(lambda: TaskDAO.status_counts(dao), 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Status count aggregates per backend")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["memory", "columnar", "sqlite-file"])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query, the best one is reported")
+    parser.add_argument("--run-backend", help=argparse.SUPPRESS) # child process mode
+    args = parser.parse_args()
+    if args.run_backend:
+        print(json.dumps(run_backend(args.run_backend, args.size, args.repeat)))
+        return
+
+    print(f"{args.size:,} tasks")
+    print(f"{'backend':>14} {'all':>10} {'status':>10} {'title':>10} {'full scan':>10} {'peak rss':>10}")
+    for backend in args.backends:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_stats", "--run-backend", backend,
+                                 "--size", str(args.size), "--repeat", str(args.repeat)],
+                                check=True, capture_output=True, text=True).stdout
+        r = json.loads(output)
+        print(f"{backend:>14} {r['all_ms']:>8.2f}ms {r['status_ms']:>8.2f}ms {r['title_ms']:>8.1f}ms "
+              f"{r['scan_ms']:>8.0f}ms {r['peak_rss_mb']:>7.0f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Memory footprint and list serialization throughput of the slotted Task against the original dict-backed class.
+# Run from the repo root: python -m benchmarks.bench_task_model [--count 1000000]
+import argparse
+import json
+import time
+import tracemalloc
+
+import task_json
+from task import Task
+
+
+class DictTask: # Task as it was before __slots__, serialized through to_json() + the stdlib encoder like jsonify
+    def __init__(self, title=None, description=None, status=None):
+        self.id = None
+        self.title = title
+        self.description = description
+        self.status = status
+
+    def to_json(self):
+        return {"id": self.id, "title": self.title, "description": self.description, "status": self.status}
+
+
+def build(task_class, count):
+    tasks = []
+    for i in range(count):
+        task = task_class(f"Task {i}", "Description", "Pending")
+        task.id = i
+        tasks.append(task)
+    return tasks
+
+
+def bytes_per_task(task_class, count):
+    tracemalloc.start()
+    tasks = build(task_class, count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return current / count
+
+
+def tasks_per_second(encode, tasks, repeat=3):
+    best = min(timed(encode, tasks) for _ in range(repeat))
+    return len(tasks) / best
+
+
+def timed(encode, tasks):
+    start = time.perf_counter()
+    encode(tasks)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slotted Task memory and serialization benchmark")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"bytes/task  dict-backed: {bytes_per_task(DictTask, args.count):.0f}  slotted: {bytes_per_task(Task, args.count):.0f}")
+
+    legacy = build(DictTask, args.count)
+    slotted = build(Task, args.count)
+    encoders = [
+        ("to_json + json.dumps", legacy, lambda tasks: json.dumps([task.to_json() for task in tasks], sort_keys=True).encode()),
+        ("hand-written encoder", slotted, lambda tasks: ("[" + ",".join(map(task_json._encode_task, tasks)) + "]").encode()),
+        ("dumps_tasks" + (" (orjson)" if task_json.orjson else ""), slotted, task_json.dumps_tasks),
+    ]
+    for name, tasks, encode in encoders:
+        print(f"{name:>28}: {tasks_per_second(encode, tasks):>12,.0f} tasks/s")
+
+
+if __name__ == "__main__":
+    main()
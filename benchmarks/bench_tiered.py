@@ -0,0 +1,85 @@
+# TieredTaskDAO over a file-backed SQLite database of --size tasks, against DBTaskDAO alone, for working sets of
+# --ratios of the database. The workload is single-task: skewed reads (Zipf-like, --skew) with --write-ratio of
+# them updates, the pattern a working set is meant for. Listings go to the database either way and are not timed.
+# Run from the repo root: python -m benchmarks.bench_tiered [--size 100000] [--ratios 0.01 0.1 0.5 1.0]
+import argparse
+import bisect
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+
+from db_task_dao import db, DBTaskDAO, init_db
+from tiered_task_dao import TieredTaskDAO
+from task import Task
+
+STATUSES = ["Pending", "In progress", "Blocked", "Done"]
+BATCH = 10_000
+
+
+def make_db(size):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='taskmanager-bench-'), 'tasks.db')}"
+    init_db(app, db)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        dao = DBTaskDAO(db)
+        for start in range(0, size, BATCH):
+            dao.create_tasks([Task(f"Task {i}", "Description", STATUSES[i % 4]) for i in range(start, min(start + BATCH, size))])
+    return app
+
+
+def zipf_ids(size, skew, count, seed=0):
+    # Task ids drawn with probability proportional to 1 / rank ** skew, ranks shuffled over the ids
+    rng = random.Random(seed)
+    ranked = list(range(1, size + 1))
+    rng.shuffle(ranked)
+    cumulative = list(itertools.accumulate(1.0 / rank ** skew for rank in range(1, size + 1)))
+    return [ranked[bisect.bisect(cumulative, rng.random() * cumulative[-1])] for _ in range(count)]
+
+
+def run(dao, ids, write_ratio):
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for task_id in ids:
+        if rng.random() < write_ratio:
+            partial_task = Task(status=rng.choice(STATUSES))
+            partial_task.id = task_id
+            dao.update_task(partial_task)
+        else:
+            dao.get_task(task_id)
+    return len(ids) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiered working set over SQLite versus SQLite alone")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.01, 0.1, 0.5, 1.0], help="working set / database size")
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--skew", type=float, default=0.99)
+    parser.add_argument("--max-staleness", type=float, default=1.0)
+    args = parser.parse_args()
+
+    app = make_db(args.size)
+    ids = zipf_ids(args.size, args.skew, args.operations)
+    print(f"{args.size:,} tasks, {args.operations:,} operations, {args.write_ratio:.0%} updates, skew {args.skew}")
+    print(f"{'store':>16} {'ops/s':>10} {'hit rate':>9} {'flushes':>8} {'close':>9}")
+    with app.app_context():
+        print(f"{'sqlite-file':>16} {run(DBTaskDAO(db), ids, args.write_ratio):>10,.0f} {'':>9} {'':>8} {'':>9}")
+        for ratio in args.ratios:
+            dao = TieredTaskDAO(app, DBTaskDAO(db), capacity=max(1, int(args.size * ratio)), max_staleness=args.max_staleness)
+            ops = run(dao, ids, args.write_ratio)
+            stats = dao.stats()
+            start = time.perf_counter()
+            dao.close() # the final flush
+            close_ms = (time.perf_counter() - start) * 1000
+            print(f"{f'tiered {ratio:g}':>16} {ops:>10,.0f} {stats['hits'] / max(1, stats['hits'] + stats['misses']):>9.1%} "
+                  f"{stats['flushes']:>8} {close_ms:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# WALTaskDAO durability costs: write throughput as writer threads are added (group commit shares each fsync
+# between every writer waiting on it), bulk load rate, and recovery time at --size tasks from the log alone
+# versus from a compacted snapshot plus a short log tail.
+# Run from the repo root: python -m benchmarks.bench_wal [--size 1000000] [--threads 1 4 16 64]
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from task import Task
+from wal_task_dao import WALTaskDAO
+
+BATCH = 10_000
+
+
+def write_throughput(directory, threads_count, ops):
+    dao = WALTaskDAO(directory)
+    barrier = threading.Barrier(threads_count + 1)
+
+    def writer():
+        barrier.wait()
+        for i in range(ops):
+            dao.create_task(Task(f"Task {i}", "written one at a time", "Pending"))
+
+    threads = [threading.Thread(target=writer) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    records_per_sync = dao.log.appended / max(1, dao.log.syncs)
+    dao.close()
+    return threads_count * ops / elapsed, records_per_sync
+
+
+def reopen(directory):
+    start = time.perf_counter()
+    dao = WALTaskDAO(directory)
+    elapsed = time.perf_counter() - start
+    count = len(dao)
+    dao.close()
+    return elapsed, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WALTaskDAO write throughput and recovery time")
+    parser.add_argument("--size", type=int, default=1_000_000, help="tasks for the recovery benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ops", type=int, default=500, help="single-task writes per thread")
+    args = parser.parse_args()
+
+    for threads_count in args.threads:
+        directory = tempfile.mkdtemp(prefix="taskmanager-wal-")
+        try:
+            rate, per_sync = write_throughput(directory, threads_count, args.ops)
+        finally:
+            shutil.rmtree(directory)
+        print(f"{threads_count:>3} writers: {rate:>10,.0f} writes/s  ({per_sync:.1f} records per fsync)")
+
+    directory = tempfile.mkdtemp(prefix="taskmanager-wal-")
+    try:
+        dao = WALTaskDAO(directory, compact_bytes=2**40) # compaction only when asked below
+        start = time.perf_counter()
+        for offset in range(0, args.size, BATCH):
+            dao.create_tasks([Task(f"Task {i}", "Description of the task", "Pending")
+                              for i in range(offset, min(offset + BATCH, args.size))])
+        elapsed = time.perf_counter() - start
+        dao.close()
+        print(f"bulk load: {args.size:,} tasks in {elapsed:.2f}s ({args.size / elapsed:,.0f} tasks/s)")
+
+        elapsed, count = reopen(directory)
+        print(f"recovery from log only:        {elapsed:.2f}s ({count:,} tasks)")
+
+        dao = WALTaskDAO(directory, compact_bytes=2**40)
+        start = time.perf_counter()
+        dao.compact()
+        compact_elapsed = time.perf_counter() - start
+        dao.update_tasks([_partial(task_id) for task_id in range(1, min(args.size, BATCH) + 1)]) # the log tail
+        dao.close()
+        print(f"compaction: {compact_elapsed:.2f}s")
+
+        elapsed, count = reopen(directory)
+        print(f"recovery from snapshot + tail: {elapsed:.2f}s ({count:,} tasks)")
+    finally:
+        shutil.rmtree(directory)
+
+
+def _partial(task_id):
+    partial_task = Task(status="Completed")
+    partial_task.id = task_id
+    return partial_task
+
+
+if __name__ == "__main__":
+    main()
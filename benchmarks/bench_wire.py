@@ -0,0 +1,54 @@
+# Wire formats and response compression for task lists (task_formats): encoded size and encode time for --sizes
+# tasks in every format, then compressed size and compress time per Accept-Encoding the server can offer.
+# Run from the repo root: python -m benchmarks.bench_wire [--sizes 10000 100000]
+import argparse
+import random
+import time
+
+import task_formats
+from task import Task
+
+STATUSES = ["Pending", "In progress", "Blocked", "Done"]
+WORDS = "write review plan ship report budget sprint customer invoice release fix migrate".split()
+
+
+def make_tasks(size):
+    rng = random.Random(0)
+    tasks = []
+    for i in range(size):
+        task = Task(" ".join(rng.choices(WORDS, k=3)).capitalize(), " ".join(rng.choices(WORDS, k=8)), rng.choice(STATUSES))
+        task.id = i + 1
+        tasks.append(task)
+    return tasks
+
+
+def best_ms(operation, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = operation()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task list payload size and encode time per format and encoding")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'format':<44} {'encoding':>9} {'bytes':>12} {'ratio':>6} {'encode':>10} {'compress':>10}")
+    for size in args.sizes:
+        tasks = make_tasks(size)
+        baseline = len(task_formats.encode_tasks(tasks, task_formats.JSON))
+        for mimetype in task_formats.LIST_FORMATS:
+            body, encode_ms = best_ms(lambda: task_formats.encode_tasks(tasks, mimetype), args.repeat)
+            for encoding in ["identity"] + task_formats.ENCODINGS:
+                compressed, compress_ms = (body, 0.0) if encoding == "identity" else \
+                    best_ms(lambda: task_formats.compress(body, encoding), args.repeat)
+                print(f"{size:>8} {mimetype:<44} {encoding:>9} {len(compressed):>12,} {len(compressed) / baseline:>6.2f} "
+                      f"{encode_ms:>8.1f}ms {compress_ms:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Shared setup for the benchmark scripts: a Flask app wired to the requested DAO backend.
+import importlib.util
+import os
+import tempfile
+
+BACKENDS = ["memory", "wal", "sqlite-memory", "sqlite-file", "tiered", "sharded"]
+if importlib.util.find_spec("numpy") is not None: # the columnar backend is optional
+    BACKENDS.insert(1, "columnar")
+
+
+def make_app(backend):
+    # Returns (app, dao); sqlite and tiered backends get their tables created and an app context pushed for the caller
+    from flask import Flask
+    from task_resource import TaskResource
+    app = Flask(__name__)
+    if backend == "memory":
+        from in_memory_task_dao import InMemoryDAO
+        dao = InMemoryDAO()
+    elif backend == "columnar":
+        from columnar_task_dao import ColumnarTaskDAO
+        dao = ColumnarTaskDAO()
+    elif backend == "wal":
+        from wal_task_dao import WALTaskDAO
+        dao = WALTaskDAO(tempfile.mkdtemp(prefix="taskmanager-bench-"))
+    elif backend == "sharded":
+        from sharded_task_dao import ShardedTaskDAO
+        dao = ShardedTaskDAO(tempfile.mkdtemp(prefix="taskmanager-bench-"))
+    else:
+        from db_task_dao import db, DBTaskDAO
+        if backend in ("sqlite-file", "tiered"): # the tiered write-behind needs a file-backed database
+            path = os.path.join(tempfile.mkdtemp(prefix="taskmanager-bench-"), "tasks.db")
+            app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+        else:
+            app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        app.app_context().push()
+        db.create_all()
+        dao = DBTaskDAO(db)
+        if backend == "tiered":
+            from tiered_task_dao import TieredTaskDAO
+            dao = TieredTaskDAO(app, dao)
+    TaskResource(app, dao)
+    return app, dao
+
+
+def startup_config(backend):
+    # create_app() config selecting the same backend as make_app
+    if backend in ("memory", "columnar"):
+        return {"TASK_BACKEND": backend}
+    if backend in ("wal", "sharded"):
+        return {"TASK_BACKEND": backend, "TASK_DATA_DIR": tempfile.mkdtemp(prefix="taskmanager-bench-")}
+    if backend in ("sqlite-file", "tiered"):
+        path = os.path.join(tempfile.mkdtemp(prefix="taskmanager-bench-"), "tasks.db")
+        return {"TASK_BACKEND": "db" if backend == "sqlite-file" else "tiered", "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"}
+    return {"TASK_BACKEND": "db", "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}
@@ -0,0 +1,193 @@
+# Benchmark suite over every TaskDAO backend, called directly ("dao") and through the TaskResource routes with
+# the Flask test client ("http"), at several data sizes and read/write mixes. Each case runs in a fresh
+# subprocess so its peak RSS is its own. Results are JSON; --baseline compares against an earlier run and exits
+# non-zero when a case regresses by more than --threshold. Startup cases ("startup/<backend>") time a cold
+# process: importing the app module and serving the first request through create_app().
+#
+# Run from the repo root:
+#   python -m benchmarks.suite --output bench.json
+#   python -m benchmarks.suite --baseline bench.json --threshold 0.15
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKENDS, make_app, startup_config
+
+TARGETS = ["dao", "http"]
+MIXES = {"read-heavy": 0.95, "balanced": 0.5, "write-heavy": 0.1} # fraction of operations that are reads
+# Metric -> True if bigger is better; used by the regression check
+METRICS = {"ops_per_sec": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False,
+           "import_ms": False, "first_request_ms": False}
+
+
+def case_key(case):
+    if case["target"] == "startup":
+        return f"startup/{case['backend']}"
+    return f"{case['target']}/{case['backend']}/{case['size']}/{case['mix']}"
+
+
+def build_operations(target, app, dao, rng, size):
+    # Returns (read, write) callables, each performing one random operation
+    from task import Task
+    if target == "dao":
+        def read():
+            if rng.random() < 0.8:
+                dao.get_task(rng.randint(1, size))
+            else:
+                dao.get_tasks(limit=20, after_id=rng.randint(0, max(0, size - 20)))
+
+        def write():
+            if rng.random() < 0.8:
+                partial_task = Task(status=rng.choice(["Pending", "Completed"]))
+                partial_task.id = rng.randint(1, size)
+                dao.update_task(partial_task)
+            else:
+                dao.create_task(Task("Benchmark task", "created", "Pending"))
+    else:
+        client = app.test_client()
+
+        def read():
+            if rng.random() < 0.8:
+                client.get(f"/tasks/{rng.randint(1, size)}")
+            else:
+                client.get(f"/tasks?limit=20&after_id={rng.randint(0, max(0, size - 20))}")
+
+        def write():
+            if rng.random() < 0.8:
+                client.patch(f"/tasks/{rng.randint(1, size)}", json={"status": rng.choice(["Pending", "Completed"])})
+            else:
+                client.post("/tasks", json={"title": "Benchmark task", "description": "created"})
+    return read, write
+
+
+def run_startup_case(case):
+    # Must run first thing in a fresh process, nothing of the app may be imported yet
+    started = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    response = create_app(startup_config(case["backend"])).test_client().get("/tasks")
+    served = time.perf_counter()
+    assert response.status_code == 200
+    return {"import_ms": (imported - started) * 1000, "first_request_ms": (served - started) * 1000,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def run_case(case):
+    if case["target"] == "startup":
+        return run_startup_case(case)
+    from task import Task
+    rng = random.Random(case.get("seed", 0))
+    app, dao = make_app(case["backend"])
+    for start in range(0, case["size"], 10_000):
+        dao.create_tasks([Task(f"Task {i}", "Description", "Pending") for i in range(start, min(start + 10_000, case["size"]))])
+    read, write = build_operations(case["target"], app, dao, rng, case["size"])
+    read_ratio = MIXES[case["mix"]]
+
+    for _ in range(min(100, case["ops"])): # warm-up
+        read()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(case["ops"]):
+        operation = read if rng.random() < read_ratio else write
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "ops_per_sec": case["ops"] / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10 # bytes on macOS, KiB on Linux
+
+
+def run_in_subprocess(case):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--run-case", json.dumps(case)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def compare(results, baseline, threshold):
+    # Returns a list of human-readable regressions beyond threshold (a fraction, 0.1 = 10%)
+    previous = {result["case"]: result["metrics"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["case"])
+        if before is None:
+            continue
+        for metric, bigger_is_better in METRICS.items():
+            old, new = before.get(metric), result["metrics"].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if bigger_is_better else change) > threshold:
+                regressions.append(f"{result['case']} {metric}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskManager benchmark suite")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--mixes", nargs="+", choices=list(MIXES), default=list(MIXES))
+    parser.add_argument("--no-startup", action="store_true", help="skip the cold start cases")
+    parser.add_argument("--ops", type=int, default=2_000, help="timed operations per case")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression as a fraction")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS) # child process mode
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+
+    results = []
+    for backend in [] if args.no_startup else args.backends:
+        case = {"target": "startup", "backend": backend}
+        metrics = run_in_subprocess(case)
+        results.append({"case": case_key(case), "params": case, "metrics": metrics})
+        print(f"{case_key(case):>40}  import {metrics['import_ms']:.1f}ms  first request {metrics['first_request_ms']:.1f}ms  "
+              f"rss {metrics['peak_rss_mb']:.0f}MiB", file=sys.stderr)
+    for target in args.targets:
+        for backend in args.backends:
+            for size in args.sizes:
+                for mix in args.mixes:
+                    case = {"target": target, "backend": backend, "size": size, "mix": mix, "ops": args.ops}
+                    metrics = run_in_subprocess(case)
+                    results.append({"case": case_key(case), "params": case, "metrics": metrics})
+                    print(f"{case_key(case):>40}  {metrics['ops_per_sec']:>10,.0f} ops/s  p50 {metrics['p50_ms']:.3f}ms  "
+                          f"p99 {metrics['p99_ms']:.3f}ms  rss {metrics['peak_rss_mb']:.0f}MiB", file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(), "timestamp": time.time()},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
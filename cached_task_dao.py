@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from task_dao import DelegatingTaskDAO, next_cursor, task_etag
+from task_json import dumps_task, dumps_tasks
+
+# A serialized response body, its ETag, and for list pages the cursor of the next page (None on the last page)
+CachedBody = namedtuple("CachedBody", ["body", "etag", "next_after_id"])
+
+
+class ResponseCache:
+    # LRU of serialized response bodies with an optional TTL (seconds). Safe to share between request threads.
+    def __init__(self, max_entries=10000, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict() # {key: (expires_at, CachedBody)}, least recently used first
+        self.lock = threading.Lock()
+        self.generation = 0 # bumped by every invalidation, see put()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > self.clock()):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None: # expired
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, body, next_after_id=None, generation=None, etag=None):
+        # generation is the value read before loading from the DAO: if a write invalidated anything since, the
+        # body may already be stale, so it is returned to the caller but not stored. etag defaults to a body hash.
+        cached = CachedBody(body, etag if etag is not None else hashlib.blake2b(body, digest_size=8).hexdigest(), next_after_id)
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return cached
+            expires_at = None if self.ttl is None else self.clock() + self.ttl
+            self.entries[key] = (expires_at, cached)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return cached
+
+    def invalidate(self, keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations, "entries": len(self.entries)}
+
+
+class CachingTaskDAO(DelegatingTaskDAO):
+    # Read-through cache of serialized GET /tasks and GET /tasks/<id> bodies in front of any TaskDAO.
+    # Writes go through to the wrapped DAO and drop exactly what they can change: the task's own entry, and the
+    # list pages (any write can move page boundaries), which live in their own cache so dropping them is O(pages).
+    def __init__(self, dao, task_cache=None, list_cache=None):
+        super().__init__(dao)
+        self.task_cache = task_cache if task_cache is not None else ResponseCache()
+        self.list_cache = list_cache if list_cache is not None else ResponseCache(max_entries=1000)
+
+    def stats(self):
+        return {"tasks": self.task_cache.stats(), "lists": self.list_cache.stats()}
+
+    def get_task_body(self, task_id):
+        cached = self.task_cache.get(task_id)
+        if cached is None:
+            generation = self.task_cache.generation
+            task = self.dao.get_task(task_id) # TaskNotFoundError propagates, misses are not cached
+            # the version as ETag, the same one uncached responses carry, so If-Match works whichever served the GET
+            cached = self.task_cache.put(task_id, dumps_task(task), generation=generation, etag=task_etag(task))
+        return cached
+
+    def get_tasks_body(self, limit=None, **query):
+        key = (limit, tuple(sorted(query.items())))
+        cached = self.list_cache.get(key)
+        if cached is None:
+            generation = self.list_cache.generation
+            tasks = self.dao.get_tasks(limit=limit, **query)
+            next_after_id = next_cursor(tasks, limit, query.get("sort", "id"))
+            cached = self.list_cache.put(key, dumps_tasks(tasks), next_after_id, generation)
+        return cached
+
+    def _invalidate(self, task_ids=()):
+        if task_ids:
+            self.task_cache.invalidate(task_ids)
+        self.list_cache.clear()
+
+    def create_task(self, task):
+        try:
+            return self.dao.create_task(task)
+        finally:
+            self._invalidate()
+
+    def update_task(self, task):
+        try:
+            return self.dao.update_task(task)
+        finally:
+            self._invalidate([task.id])
+
+    def delete_task(self, task_id):
+        try:
+            return self.dao.delete_task(task_id)
+        finally:
+            self._invalidate([task_id])
+
+    def create_tasks(self, tasks):
+        try:
+            return self.dao.create_tasks(tasks)
+        finally:
+            self._invalidate()
+
+    def update_tasks(self, partial_tasks):
+        try:
+            return self.dao.update_tasks(partial_tasks)
+        finally:
+            self._invalidate([partial_task.id for partial_task in partial_tasks])
+
+    def delete_tasks(self, task_ids):
+        try:
+            return self.dao.delete_tasks(task_ids)
+        finally:
+            self._invalidate(task_ids)
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import deque, namedtuple
+from itertools import islice
+from flask import Response, abort, request, stream_with_context
+from task_dao import DelegatingTaskDAO
+from task_json import dumps_task, dumps_tasks
+from task_resource import parse_int_arg
+
+# Change feed over any TaskDAO: every create/update/delete is published with a monotonic sequence number into a
+# bounded ring buffer, so clients can fetch deltas (GET /tasks/changes?since=<seq>) or have them pushed
+# (GET /tasks/changes/stream, server-sent events) instead of re-downloading GET /tasks. A cursor older than the
+# buffer gets a full resync. Racing writes to one task may reach the feed out of order; each change carries the
+# task version, so consumers keep the highest version they have seen (ids are never reused by any backend, even
+# across restarts, so a delete is final).
+
+DEFAULT_MAX_CHANGES = 10000
+MAX_CHANGES_PER_RESPONSE = 1000
+HEARTBEAT_SECONDS = 15.0 # SSE comment line sent when idle, keeps proxies from closing the connection
+
+# seq, "create" | "update" | "delete", task id, and the change serialized once for every client that reads it
+Change = namedtuple("Change", ["seq", "op", "task_id", "body"])
+
+
+def encode_change(seq, op, task_id, task):
+    return b'{"seq":%d,"op":"%s","id":%d,"version":%s,"task":%s}' % (
+        seq, op.encode(), task_id, b"null" if task is None or task.version is None else str(task.version).encode(),
+        b"null" if task is None else dumps_task(task))
+
+
+class ChangeFeed:
+    # Ring buffer of the last max_changes changes. Sequence numbers start at 1 and have no gaps, so the position
+    # of a cursor in the buffer is arithmetic. Safe to share between request threads.
+    def __init__(self, max_changes=DEFAULT_MAX_CHANGES):
+        self.changes = deque(maxlen=max_changes)
+        self.seq = 0 # last published
+        self.condition = threading.Condition()
+
+    def publish(self, op, task_id, task=None):
+        with self.condition:
+            self.seq += 1
+            self.changes.append(Change(self.seq, op, task_id, encode_change(self.seq, op, task_id, task)))
+            self.condition.notify_all()
+            return self.seq
+
+    def since(self, seq, limit=None):
+        # Changes after seq, oldest first; None when seq is no longer covered (evicted, or from before a restart)
+        with self.condition:
+            first = self.changes[0].seq if self.changes else self.seq + 1
+            if seq < first - 1 or seq > self.seq:
+                return None
+            return list(islice(self.changes, seq - first + 1, None if limit is None else seq - first + 1 + limit))
+
+    def wait(self, seq, timeout):
+        # Blocks until something is published after seq or timeout passes; returns whether there is news
+        with self.condition:
+            return self.condition.wait_for(lambda: self.seq > seq, timeout)
+
+
+class ChangeFeedTaskDAO(DelegatingTaskDAO):
+    # Publishes every successful write of the wrapped DAO to `feed`
+    def __init__(self, dao, feed=None):
+        super().__init__(dao)
+        self.feed = feed if feed is not None else ChangeFeed()
+
+    def create_task(self, task):
+        task = self.dao.create_task(task)
+        self.feed.publish("create", task.id, task)
+        return task
+
+    def update_task(self, task):
+        task = self.dao.update_task(task)
+        self.feed.publish("update", task.id, task)
+        return task
+
+    def delete_task(self, task_id):
+        result = self.dao.delete_task(task_id)
+        self.feed.publish("delete", task_id)
+        return result
+
+    def create_tasks(self, tasks):
+        results = self.dao.create_tasks(tasks)
+        for result in results:
+            if not isinstance(result, Exception):
+                self.feed.publish("create", result.id, result)
+        return results
+
+    def update_tasks(self, partial_tasks):
+        results = self.dao.update_tasks(partial_tasks)
+        for result in results:
+            if not isinstance(result, Exception):
+                self.feed.publish("update", result.id, result)
+        return results
+
+    def delete_tasks(self, task_ids):
+        results = self.dao.delete_tasks(task_ids)
+        for task_id, result in zip(task_ids, results):
+            if result is True:
+                self.feed.publish("delete", task_id)
+        return results
+
+
+def install_change_feed(app, resource, max_changes=DEFAULT_MAX_CHANGES):
+    # Publishes the writes of `resource` (a TaskResource) and adds:
+    #   GET /tasks/changes?since=<seq>[&limit=]  {"changes": [...], "next": seq}, or when since is too old
+    #                                            {"resync": true, "tasks": [every task], "next": seq}
+    #   GET /tasks/changes/stream?since=<seq>    the same changes as server-sent events (id: seq, event: op); a
+    #                                            reconnect resumes from Last-Event-ID, a too-old cursor gets a
+    #                                            "resync" event naming the seq to resume from after re-reading GET /tasks
+    feed = ChangeFeed(max_changes)
+    resource.wrap_dao(lambda dao: ChangeFeedTaskDAO(dao, feed))
+
+    def int_arg(args, name, minimum, default):
+        try:
+            value = parse_int_arg(args, name, minimum)
+        except ValueError as error:
+            abort(400, description=str(error))
+        return default if value is None else value
+
+    @app.route('/tasks/changes', methods=['GET'])
+    def get_changes():
+        since = int_arg(request.args, "since", 0, 0)
+        limit = min(int_arg(request.args, "limit", 1, MAX_CHANGES_PER_RESPONSE), MAX_CHANGES_PER_RESPONSE)
+        changes = feed.since(since, limit)
+        if changes is None:
+            # The cursor is read before the listing, so replaying changes from it over the listing is safe
+            seq = feed.seq
+            body = b'{"resync":true,"next":%d,"tasks":%s}' % (seq, dumps_tasks(resource.dao.get_tasks()))
+        else:
+            next_seq = changes[-1].seq if changes else since
+            body = b'{"changes":[%s],"next":%d}' % (b",".join(change.body for change in changes), next_seq)
+        return Response(body, 200, mimetype="application/json")
+
+    @app.route('/tasks/changes/stream', methods=['GET'])
+    def stream_changes():
+        since = int_arg({"since": request.headers.get("Last-Event-ID", request.args.get("since"))}, "since", 0, 0)
+        return Response(stream_with_context(_events(feed, since)), 200, mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    return feed
+
+
+def _events(feed, since):
+    last_sent = time.monotonic()
+    while True:
+        changes = feed.since(since, MAX_CHANGES_PER_RESPONSE)
+        if changes is None:
+            since = feed.seq
+            yield b'event: resync\ndata: {"next":%d}\n\n' % since
+            continue
+        if changes:
+            yield b"".join(b"id: %d\nevent: %s\ndata: %s\n\n" % (change.seq, change.op.encode(), change.body)
+                           for change in changes)
+            since = changes[-1].seq
+            last_sent = time.monotonic()
+            continue
+        if not feed.wait(since, max(0.0, HEARTBEAT_SECONDS - (time.monotonic() - last_sent))):
+            yield b": keepalive\n\n"
+            last_sent = time.monotonic()
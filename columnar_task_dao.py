@@ -0,0 +1,323 @@
+import threading
+from itertools import islice
+from task import Task
+from task_dao import TaskDAO, check_task_fields, parse_sort, task_stats, tokenize
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+
+try:
+    import numpy as np
+except ImportError: # optional dependency, only this backend needs it
+    np = None
+
+INITIAL_CAPACITY = 1024
+COMPACT_MIN_ROWS = 1024 # dead rows (or arena garbage bytes) tolerated before compaction is considered
+ITER_CHUNK_SIZE = 256 # tasks per locked page when streaming
+CANDIDATE_WINDOW = 4096 # rows masked at a time for a limited id-ordered page
+MATCH_CHUNK_SIZE = 1024 # rows decoded at a time by the title and full-text filters
+
+
+class _StringColumn:
+    # Strings of one column in a single UTF-8 arena: row i is arena[offsets[i]:offsets[i] + lengths[i]],
+    # length -1 for None. Overwritten and cleared values stay in the arena as garbage until the next repack.
+    def __init__(self, capacity):
+        self.arena = bytearray()
+        self.offsets = np.zeros(capacity, np.int64)
+        self.lengths = np.full(capacity, -1, np.int64)
+        self.garbage = 0
+
+    def grow(self, capacity, size):
+        offsets, lengths = self.offsets, self.lengths
+        self.offsets = np.zeros(capacity, np.int64)
+        self.lengths = np.full(capacity, -1, np.int64)
+        self.offsets[:size] = offsets[:size]
+        self.lengths[:size] = lengths[:size]
+
+    def get(self, row):
+        length = int(self.lengths[row])
+        if length < 0:
+            return None
+        offset = int(self.offsets[row])
+        return self.arena[offset:offset + length].decode()
+
+    def set(self, row, value):
+        self.clear(row)
+        if value is not None:
+            data = value.encode()
+            self.offsets[row] = len(self.arena)
+            self.lengths[row] = len(data)
+            self.arena += data
+
+    def clear(self, row):
+        if self.lengths[row] > 0:
+            self.garbage += int(self.lengths[row])
+        self.lengths[row] = -1
+
+    def values(self, rows):
+        # The strings of `rows`, fetching offsets and lengths in one vectorized step
+        arena = self.arena
+        return [None if length < 0 else arena[offset:offset + length].decode()
+                for offset, length in zip(self.offsets[rows].tolist(), self.lengths[rows].tolist())]
+
+    def take(self, rows, capacity):
+        # A new column holding `rows` (in that order) as rows 0..len(rows)-1, with no garbage
+        column = _StringColumn(capacity)
+        arena = self.arena
+        position = 0
+        for new_row, (offset, length) in enumerate(zip(self.offsets[rows].tolist(), self.lengths[rows].tolist())):
+            if length >= 0:
+                column.arena += arena[offset:offset + length]
+                column.offsets[new_row] = position
+                column.lengths[new_row] = length
+                position += length
+        return column
+
+
+class ColumnarTaskDAO(TaskDAO):
+    # Tasks stored column-wise in NumPy arrays rather than one Task object each, for aggregate queries (status_counts)
+    # over millions of tasks as vectorized operations, at a fraction of the memory:
+    #  - rows are appended in id order, so ids stays sorted: get_task is a binary search, after_id a slice
+    #  - status is dictionary-encoded: codes index self.statuses, code 0 is None
+    #  - title and description live in string arenas (see _StringColumn)
+    #  - deletes clear alive; dead rows and arena garbage are dropped once they make up half the table
+    # Task objects are built on read. Title and full-text filters decode the rows left after the vectorized
+    # status/id filtering; there is no inverted index, so search is a scan.
+    # One lock guards everything (arrays are replaced when they grow or compact), so it is safe to share
+    # between request threads and every read is a consistent snapshot.
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        if np is None:
+            raise ImportError("ColumnarTaskDAO requires numpy")
+        self.lock = threading.RLock()
+        self.size = 0 # rows in use, dead ones included
+        self.count = 0 # live rows
+        self.next_id = 1
+        self.ids = np.zeros(capacity, np.int64)
+        self.versions = np.zeros(capacity, np.int64)
+        self.codes = np.zeros(capacity, np.int32)
+        self.alive = np.zeros(capacity, bool)
+        self.titles = _StringColumn(capacity)
+        self.descriptions = _StringColumn(capacity)
+        self.statuses = [None] # code -> status
+        self.status_codes = {None: 0} # status -> code
+
+    def __len__(self):
+        return self.count
+
+    def _code(self, status):
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return code
+
+    def _row(self, task_id):
+        row = int(np.searchsorted(self.ids[:self.size], task_id))
+        if row == self.size or self.ids[row] != task_id or not self.alive[row]:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return row
+
+    def _task(self, row):
+        task = Task(self.titles.get(row), self.descriptions.get(row), self.statuses[self.codes[row]])
+        task.id = int(self.ids[row])
+        task.version = int(self.versions[row])
+        return task
+
+    def _tasks(self, rows):
+        # _task for many rows, reading each column once
+        rows = np.asarray(rows, np.int64)
+        statuses = self.statuses
+        tasks = []
+        for task_id, version, code, title, description in zip(
+                self.ids[rows].tolist(), self.versions[rows].tolist(), self.codes[rows].tolist(),
+                self.titles.values(rows), self.descriptions.values(rows)):
+            task = Task(title, description, statuses[code])
+            task.id = task_id
+            task.version = version
+            tasks.append(task)
+        return tasks
+
+    def _resize(self, rows, capacity):
+        # Keeps `rows` (ascending) as rows 0..len(rows)-1 in arrays of `capacity`
+        for name in ("ids", "versions", "codes", "alive"):
+            column = getattr(self, name)
+            resized = np.zeros(capacity, column.dtype)
+            resized[:len(rows)] = column[rows]
+            setattr(self, name, resized)
+        self.titles = self.titles.take(rows, capacity)
+        self.descriptions = self.descriptions.take(rows, capacity)
+        self.size = len(rows)
+
+    def _maybe_compact(self):
+        dead = self.size - self.count
+        garbage = self.titles.garbage + self.descriptions.garbage
+        arena = len(self.titles.arena) + len(self.descriptions.arena)
+        if (dead > COMPACT_MIN_ROWS and dead * 2 > self.size) or (garbage > COMPACT_MIN_ROWS and garbage * 2 > arena):
+            self._resize(np.flatnonzero(self.alive[:self.size]), len(self.ids))
+
+    def _append(self, task):
+        if self.size == len(self.ids):
+            capacity = len(self.ids) * 2
+            for name in ("ids", "versions", "codes", "alive"):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+            self.titles.grow(capacity, self.size)
+            self.descriptions.grow(capacity, self.size)
+        row = self.size
+        self.ids[row] = task.id
+        self.versions[row] = task.version
+        self.codes[row] = self._code(task.status)
+        self.alive[row] = True
+        self.titles.set(row, task.title)
+        self.descriptions.set(row, task.description)
+        self.size += 1
+        self.count += 1
+
+    def _candidates(self, status=None, after_id=None, descending=False, limit=None):
+        # Rows passing the vectorized filters (alive, status, keyset) in id order. With a limit, the mask is built
+        # over growing windows from the keyset position on, so a page costs its window, not the whole table.
+        lo, hi = 0, self.size
+        if after_id is not None:
+            if descending:
+                hi = int(np.searchsorted(self.ids[:hi], after_id, side="left"))
+            else:
+                lo = int(np.searchsorted(self.ids[:hi], after_id, side="right"))
+        code = None if status is None else self.status_codes.get(status, -1)
+        window = hi - lo if limit is None else max(CANDIDATE_WINDOW, limit)
+        found, count = [], 0
+        while lo < hi and (limit is None or count < limit):
+            start, end = (max(lo, hi - window), hi) if descending else (lo, min(hi, lo + window))
+            mask = self.alive[start:end] if code is None else self.alive[start:end] & (self.codes[start:end] == code)
+            rows = np.flatnonzero(mask) + start
+            found.append(rows[::-1] if descending else rows)
+            count += len(rows)
+            hi, lo = (start, lo) if descending else (hi, end)
+            window *= 2 # sparse matches: widen instead of taking many small steps
+        rows = np.concatenate(found) if found else np.zeros(0, np.int64)
+        return rows if limit is None else rows[:limit]
+
+    def _matches(self, rows, title=None, search=None):
+        # Lazily applies the title and full-text filters, decoding chunk by chunk only the strings they need
+        needle = title.lower() if title is not None else None
+        tokens = set(tokenize(search)) if search is not None else None
+        for start in range(0, len(rows), MATCH_CHUNK_SIZE):
+            chunk = rows[start:start + MATCH_CHUNK_SIZE]
+            titles = self.titles.values(chunk)
+            descriptions = self.descriptions.values(chunk) if tokens is not None else None
+            for i, row in enumerate(chunk.tolist()):
+                if needle is not None and needle not in (titles[i] or "").lower():
+                    continue
+                if tokens is not None and not (tokens and tokens <= set(tokenize(titles[i])) | set(tokenize(descriptions[i]))):
+                    continue
+                yield row
+
+    def _query(self, status=None, after_id=None, title=None, search=None, sort="id", limit=None):
+        # Matching rows in result order; callers hold the lock while consuming it
+        field, descending = parse_sort(sort)
+        text_filters = title is not None or search is not None
+        rows = self._candidates(status, after_id, descending, limit if field == "id" and not text_filters else None)
+        if text_filters:
+            rows = self._matches(rows, title, search)
+            if field == "id":
+                return rows
+            rows = np.fromiter(rows, np.int64)
+        if field == "status": # rank the codes by status name, a stable sort keeps id order among equals
+            ranks = np.zeros(len(self.statuses), np.int64)
+            ranks[sorted(range(len(self.statuses)), key=lambda code: self.statuses[code] or "")] = np.arange(len(self.statuses))
+            keys = ranks[self.codes[rows]]
+            rows = rows[np.argsort(-keys if descending else keys, kind="stable")]
+        elif field == "title":
+            rows = [row for _, row in sorted(zip(self.titles.values(rows), rows.tolist()),
+                                             key=lambda pair: pair[0] or "", reverse=descending)]
+        return iter(rows.tolist() if isinstance(rows, np.ndarray) else rows)
+
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        with self.lock:
+            return self._tasks(list(islice(self._query(status, after_id, title, search, sort, limit), limit)))
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id"):
+        # Keyset pages of ITER_CHUNK_SIZE, each a snapshot, so a slow consumer never holds the lock
+        query = {"status": status, "title": title, "search": search, "sort": sort}
+        if search is not None or parse_sort(sort)[0] != "id":
+            yield from self.get_tasks(after_id=after_id, **query)
+            return
+        while True:
+            tasks = self.get_tasks(limit=ITER_CHUNK_SIZE, after_id=after_id, **query)
+            yield from tasks
+            if len(tasks) < ITER_CHUNK_SIZE:
+                return
+            after_id = tasks[-1].id
+
+    def status_counts(self, status=None, title=None, search=None):
+        # One bincount over the status codes of the matching rows
+        with self.lock:
+            if title is None and search is None:
+                codes = self.codes[:self.size][self.alive[:self.size]]
+            else:
+                codes = self.codes[np.fromiter(self._matches(self._candidates(status), title, search), np.int64)]
+            counts = np.bincount(codes, minlength=len(self.statuses)).tolist()
+            return task_stats({self.statuses[code]: count for code, count in enumerate(counts)
+                               if status is None or self.statuses[code] == status})
+
+    def get_task(self, task_id):
+        with self.lock:
+            return self._task(self._row(task_id))
+
+    def create_task(self, task):
+        if not task.title:
+            raise InvalidTaskError("Task must have a title")
+        check_task_fields(task)
+        with self.lock:
+            task.id = self.next_id
+            self.next_id += 1
+            task.version = 1
+            self._append(task)
+        return task
+
+    def create_tasks(self, tasks):
+        # One lock acquisition for the whole batch
+        results = []
+        with self.lock:
+            for task in tasks:
+                if not task.title:
+                    results.append(InvalidTaskError("Task must have a title"))
+                    continue
+                try:
+                    check_task_fields(task)
+                except InvalidTaskError as error:
+                    results.append(error)
+                    continue
+                task.id = self.next_id
+                self.next_id += 1
+                task.version = 1
+                self._append(task)
+                results.append(task)
+        return results
+
+    def update_task(self, partial_task):
+        check_task_fields(partial_task) # before any column is written
+        with self.lock:
+            row = self._row(partial_task.id)
+            version = int(self.versions[row])
+            if partial_task.version is not None and partial_task.version != version:
+                raise VersionConflictError(f"Task with ID {partial_task.id} is at version {version}, not {partial_task.version}")
+            self.versions[row] = version + 1
+            if partial_task.title is not None:
+                self.titles.set(row, partial_task.title)
+            if partial_task.description is not None:
+                self.descriptions.set(row, partial_task.description)
+            if partial_task.status is not None:
+                self.codes[row] = self._code(partial_task.status)
+            task = self._task(row)
+            self._maybe_compact()
+            return task
+
+    def delete_task(self, task_id):
+        with self.lock:
+            row = self._row(task_id)
+            self.alive[row] = False
+            self.titles.clear(row)
+            self.descriptions.clear(row)
+            self.count -= 1
+            self._maybe_compact()
+        return True
@@ -1,78 +1,494 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from flask_sqlalchemy import SQLAlchemy
-from task_dao import TaskDAO
-from errors import *
-from task_resource import Task
+from sqlalchemy import DDL, and_, bindparam, delete, event, false, func, insert, or_, select, text, update
+from task_dao import TaskDAO, parse_sort, task_stats, tokenize
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+from task import Task
 db = SQLAlchemy()
 
+IN_CLAUSE_CHUNK = 500 # stays under SQLite's bound-parameter limit
+READ_ONLY_BIND = "readonly" # SQLALCHEMY_BINDS key of the optional read-only pool
+
+# Production engine profile for init_db(). Pool settings apply to file-backed databases; the pragmas run on every
+# new SQLite connection. WAL lets readers proceed while a writer commits, synchronous=NORMAL fsyncs at checkpoints
+# instead of every commit (still durable against application crashes), mmap_size serves reads from the page cache
+# and busy_timeout makes writers wait for the lock instead of failing with "database is locked".
+PRODUCTION_ENGINE_PROFILE = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_pre_ping": True,
+    "sqlite_pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 256 * 2**20, "busy_timeout": 5000},
+    "read_only_uri": None, # e.g. "sqlite:///file:/var/lib/tasks.db?mode=ro&uri=true", used by DBTaskDAO(read_bind=...)
+}
+
 
 class DBTask(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = {"sqlite_autoincrement": True} # ids are never reused, so an id and version (the ETag) name one state
+
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, default="")
-    status = db.Column(db.String(50), default="Pending")
+    status = db.Column(db.String(50), default="Pending", index=True) # SQLite appends the rowid, so this also serves status + keyset scans
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1") # bumped by every update, see update_task_query
 
     def __repr__(self):
         return f"<Task id={self.id} title={self.title}>"
 
 
+# Full-text search on SQLite: an external-content FTS5 table over tasks(title, description), kept in sync by triggers.
+# It stores only the index, the text itself stays in tasks.
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+):
+    event.listen(DBTask.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(DBTask.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+
+TASK_COLUMNS = (DBTask.id, DBTask.title, DBTask.description, DBTask.status, DBTask.version)
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def row_to_task(row):
+    task = Task(title=row.title, description=row.description, status=row.status)
+    task.id = row.id
+    task.version = row.version
+    return task
+
+
+def _has_id_sequence(connection):
+    # sqlite_sequence holds the AUTOINCREMENT counter; files created before DBTask used AUTOINCREMENT have none
+    return connection.dialect.name == "sqlite" and connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'")).first() is not None
+
+
+def id_high_water(connection):
+    # The highest task id ever stored, including tasks deleted since, so stores that assign ids themselves never reuse one
+    top = connection.execute(select(func.max(DBTask.id))).scalar() or 0
+    if _has_id_sequence(connection):
+        top = max(top, connection.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'")).scalar() or 0)
+    return top
+
+
+def raise_id_high_water(connection, task_id):
+    # Records task_id as assigned even if no row with it was ever inserted (created and deleted between two flushes)
+    if not _has_id_sequence(connection):
+        return
+    if connection.execute(text("UPDATE sqlite_sequence SET seq = :id WHERE name = 'tasks' AND seq < :id"), {"id": task_id}).rowcount == 0:
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', :id WHERE NOT EXISTS "
+                                "(SELECT 1 FROM sqlite_sequence WHERE name = 'tasks')"), {"id": task_id})
+
+
+def update_task_query(partial_task):
+    # UPDATE tasks SET <non-None fields>, version = version + 1 WHERE id = ? [AND version = ?] RETURNING the row:
+    # the whole PATCH in one statement, shared by the sync and async DB DAOs. No row back means see update_miss.
+    changes = {field: getattr(partial_task, field) for field in ("title", "description", "status")
+               if getattr(partial_task, field) is not None}
+    query = update(DBTask).where(DBTask.id == partial_task.id)
+    if partial_task.version is not None:
+        query = query.where(DBTask.version == partial_task.version)
+    return query.values(**changes, version=DBTask.version + 1).returning(*TASK_COLUMNS)
+
+
+# Executemany form of update_task_query for DBTaskDAO.update_tasks: full new values, guarded by the version read
+BULK_UPDATE_QUERY = (update(DBTask)
+                     .where(DBTask.id == bindparam("b_id"), DBTask.version == bindparam("b_expected"))
+                     .values(title=bindparam("b_title"), description=bindparam("b_description"),
+                             status=bindparam("b_status"), version=bindparam("b_version")))
+
+
+def update_miss(partial_task, stored_version):
+    # The error for an update_task_query that matched no row, given the task's current version (None if it is gone)
+    if stored_version is None:
+        return TaskNotFoundError(f"Task with ID {partial_task.id} not found")
+    return VersionConflictError(f"Task with ID {partial_task.id} is at version {stored_version}, not {partial_task.version}")
+
+
+def task_filters(dialect_name, status=None, title=None, search=None):
+    # WHERE clauses for the status/title/search listing filters
+    filters = []
+    if status is not None:
+        filters.append(DBTask.status == status)
+    if title is not None:
+        filters.append(DBTask.title.ilike(f"%{_escape_like(title)}%", escape="\\"))
+    if search is not None:
+        filters.append(_search_clause(dialect_name, search))
+    return filters
+
+
+def select_tasks(dialect_name, status=None, after_id=None, title=None, search=None, sort="id"):
+    # SELECT of TASK_COLUMNS for a listing query (see TaskDAO), shared by the sync and async DB DAOs
+    field, descending = parse_sort(sort)
+    query = select(*TASK_COLUMNS).where(*task_filters(dialect_name, status=status, title=title, search=search))
+    if after_id is not None: # keyset seek on the primary key, never OFFSET
+        query = query.where(DBTask.id < after_id if descending else DBTask.id > after_id)
+    order = [getattr(DBTask, field), DBTask.id] if field != "id" else [DBTask.id]
+    return query.order_by(*(column.desc() if descending else column for column in order))
+
+
+def _search_clause(dialect_name, search):
+    tokens = tokenize(search)
+    if not tokens:
+        return false()
+    if dialect_name != "sqlite": # no FTS5 shadow table, fall back to matching every token
+        return and_(*(or_(DBTask.title.ilike(f"%{_escape_like(token)}%", escape="\\"),
+                          DBTask.description.ilike(f"%{_escape_like(token)}%", escape="\\"))
+                      for token in tokens))
+    match = " ".join(f'"{token}"' for token in tokens) # quoted tokens, implicitly ANDed by FTS5
+    return DBTask.id.in_(text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH :match").bindparams(match=match))
+
+
+def is_memory_uri(uri):
+    return uri.startswith("sqlite") and (":memory:" in uri or uri.rstrip("/") in ("sqlite:", "sqlite://"))
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def init_db(app, db_instance=None, profile=None):
+    # db.init_app(app) with an engine profile: PRODUCTION_ENGINE_PROFILE updated with `profile`
+    db_instance = db_instance if db_instance is not None else db
+    profile = {**PRODUCTION_ENGINE_PROFILE, **(profile or {})}
+    pool_options = {"pool_pre_ping": profile["pool_pre_ping"]}
+    if not is_memory_uri(app.config.get("SQLALCHEMY_DATABASE_URI", "")): # :memory: keeps a single static connection
+        pool_options.update(pool_size=profile["pool_size"], max_overflow=profile["max_overflow"])
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {}).update(pool_options)
+    if profile["read_only_uri"]:
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[READ_ONLY_BIND] = {"url": profile["read_only_uri"], **pool_options}
+    db_instance.init_app(app)
+
+    with app.app_context():
+        for bind_key, engine in db_instance.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            pragmas = dict(profile["sqlite_pragmas"])
+            if bind_key == READ_ONLY_BIND: # the primary pool owns the journal mode; this side never writes
+                pragmas.pop("journal_mode", None)
+                pragmas["query_only"] = "ON"
+            apply_sqlite_pragmas(engine, pragmas)
+    return db_instance
+
+
+class GroupCommitWriter:
+    # Opt-in group commit for DBTaskDAO: single-task writes from any number of request threads are queued to one
+    # writer thread, which runs them in a single transaction per batch, so concurrent writers share one commit
+    # (and one fsync) instead of queueing on SQLite's write lock one by one.
+    #  - a batch closes after max_batch writes, or max_delay seconds after its first write (0: just the writes
+    #    that queued up while the previous batch committed, so a lone writer pays no extra latency)
+    #  - every caller gets its own result or error; a database error rolls back the batch, which is then retried
+    #    one write per transaction, so only the write that failed reports it
+    # The writer runs inside an app context of `app` with its own session, so the database must be file-backed:
+    # a :memory: database is a single connection shared by every session. close() (also run at exit) commits what
+    # is queued.
+    def __init__(self, app, db_instance, max_delay=0.0, max_batch=256):
+        if is_memory_uri(app.config.get("SQLALCHEMY_DATABASE_URI", "")):
+            raise ValueError("group commit needs a file-backed database, not :memory:")
+        self.app = app
+        self.db = db_instance
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.batches = 0 # committed batches, with writes: writes per commit
+        self.writes = 0
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, operation, item):
+        # Runs operation(item) in the next batch; returns its result, or the TaskNotFoundError/InvalidTaskError/
+        # VersionConflictError it raised. Any other error is raised, as is RuntimeError once the writer has stopped.
+        if not self.thread.is_alive():
+            raise RuntimeError("group commit writer is not running")
+        future = Future()
+        self.queue.put((operation, item, future))
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except FutureTimeoutError:
+                if not self.thread.is_alive() and not future.done(): # died (or was closed) without reaching this write
+                    raise RuntimeError("group commit writer stopped before committing this write")
+
+    def close(self):
+        # Commits what is queued, then stops the writer
+        atexit.unregister(self.close)
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def _next_batch(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                write = self.queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    write = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if write is None:
+                self.queue.put(None) # stop after this batch
+                break
+            batch.append(write)
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    self.db.session.remove()
+                    return
+                self._commit(batch)
+
+    def _commit(self, batch):
+        session = self.db.session
+        try:
+            results = [TaskDAO._try(operation, item) for operation, item, _ in batch]
+            session.commit()
+        except Exception:
+            session.rollback()
+            for operation, item, future in batch:
+                try:
+                    result = TaskDAO._try(operation, item)
+                    session.commit()
+                except Exception as error:
+                    session.rollback()
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
 class DBTaskDAO(TaskDAO):
-    def __init__(self, db_instance):
+    # Read paths select plain column rows and map them straight to Task: no ORM instances, identity map or
+    # change tracking. Creates and deletes still go through DBTask; update_task is one UPDATE ... RETURNING.
+    # With read_bind (see init_db), listing and single task reads run on that engine's pool instead of the primary one.
+    # With group_commit (a GroupCommitWriter), single-task writes are committed in batches on the writer's thread.
+    def __init__(self, db_instance, read_bind=None, group_commit=None):
         self.db = db_instance
+        self.read_bind = read_bind
+        self.group_commit = group_commit
+
+    def _read(self, query):
+        if self.read_bind is None:
+            return self.db.session.execute(query)
+        return self.db.session.execute(query, bind_arguments={"bind": self.db.engines[self.read_bind]})
 
     def __len__(self):
-        return self.db.session.query(DBTask).count()
+        return self.db.session.execute(self.db.select(self.db.func.count()).select_from(DBTask)).scalar_one() # SELECT count(*) FROM tasks
+
+    def _select_tasks(self, **query):
+        return select_tasks(self.db.engine.dialect.name, **query)
+
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        query = self._select_tasks(status=status, after_id=after_id, title=title, search=search, sort=sort)
+        if limit is not None:
+            query = query.limit(limit)
+        return [row_to_task(row) for row in self._read(query)]
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id", batch_size=1000):
+        # Streams rows from one cursor, buffering batch_size at a time, so memory stays flat for any table size
+        query = self._select_tasks(status=status, after_id=after_id, title=title, search=search, sort=sort)
+        for row in self._read(query.execution_options(yield_per=batch_size)):
+            yield row_to_task(row)
 
-    def get_tasks(self):
-        db_tasks = DBTask.query.all()
-        tasks = []
-        for db_task in db_tasks:
-            task = Task(title=db_task.title, description=db_task.description, status=db_task.status)
-            task.id = db_task.id
-            tasks.append(task)
-        return tasks
+    def status_counts(self, status=None, title=None, search=None):
+        # SELECT status, count(*) ... GROUP BY status, served by the status index when there is no other filter
+        query = (select(DBTask.status, func.count())
+                 .where(*task_filters(self.db.engine.dialect.name, status=status, title=title, search=search))
+                 .group_by(DBTask.status))
+        return task_stats(dict(self._read(query).all()))
 
     def get_task(self, task_id):
-        db_task = self.db.session.get(DBTask, task_id)
-        if not db_task:
+        row = self._read(self._select_tasks().where(DBTask.id == task_id)).first()
+        if row is None:
             raise TaskNotFoundError(f"Task with ID {task_id} not found")
-        task = Task(title=db_task.title, description=db_task.description, status=db_task.status)
-        task.id = db_task.id
-        return task
+        return row_to_task(row)
 
     def create_task(self, task):
         if not task.title:
             raise InvalidTaskError("Task must have a title")
-        new_task = DBTask(
-            title=task.get_title(),
-            description=task.get_description(),
-            status=task.get_status(),
-        )
-        self.db.session.add(new_task)
-        self.db.session.commit()
-        task.id = new_task.id
+        task.id = self._write(self._insert, task)
+        task.version = 1
         return task
 
     def update_task(self, partial_task):
-        db_task = self.db.session.get(DBTask, partial_task.get_id())
-        if not db_task:
-            raise TaskNotFoundError(f"Task with ID {partial_task.get_id()} not found")
-        if partial_task.title is not None:
-            db_task.title = partial_task.title
-        if partial_task.description is not None:
-            db_task.description = partial_task.description
-        if partial_task.status is not None:
-            db_task.status = partial_task.status
-        self.db.session.commit()
-        updated_task = Task(title=db_task.title, description=db_task.description, status=db_task.status)
-        updated_task.id = db_task.id
-        return updated_task
+        return self._write(self._update, partial_task)
 
     def delete_task(self, task_id):
-        db_task = self.db.session.get(DBTask, task_id)
-        if not db_task:
+        return self._write(self._delete, task_id)
+
+    def _write(self, operation, item):
+        # Runs one write and commits it: inline, or queued to the group commit writer, which commits it
+        # together with other callers' writes
+        if self.group_commit is not None:
+            result = self.group_commit.submit(operation, item)
+        else:
+            result = self._try(operation, item)
+        self.db.session.commit() # group commit: ends this session's read snapshot, so later reads see the write
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    # Single-task write statements, Core on the session's connection (no ORM execution layer); the caller commits (see _write)
+    def _insert(self, task):
+        values = {field: getattr(task, field) for field in ("title", "description", "status")
+                  if getattr(task, field) is not None} # None takes the column default
+        return self.db.session.connection().execute(insert(DBTask).values(**values).returning(DBTask.id)).scalar_one()
+
+    def _update(self, partial_task):
+        row = self.db.session.connection().execute(update_task_query(partial_task)).first()
+        if row is None: # only a failed update pays a second round trip, to tell a missing task from a stale version
+            raise update_miss(partial_task, self.db.session.connection().execute(
+                select(DBTask.version).where(DBTask.id == partial_task.id)).scalar())
+        return row_to_task(row)
+
+    def _delete(self, task_id):
+        if self.db.session.connection().execute(delete(DBTask).where(DBTask.id == task_id)).rowcount == 0:
             raise TaskNotFoundError(f"Task with ID {task_id} not found")
-        self.db.session.delete(db_task)
-        self.db.session.commit()
         return True
+
+    def max_id(self):
+        return id_high_water(self.db.session.connection())
+
+    def write_back(self, changes):
+        # Stores {id: Task, or None to delete} as given, ids and versions included, in one transaction: the rows are
+        # deleted and reinserted, so a task is written whole whether or not it exists yet. Used by TieredTaskDAO.
+        session = self.db.session
+        try:
+            connection = session.connection()
+            task_ids = list(changes)
+            for start in range(0, len(task_ids), IN_CLAUSE_CHUNK):
+                connection.execute(delete(DBTask).where(DBTask.id.in_(task_ids[start:start + IN_CLAUSE_CHUNK])))
+            rows = [{"id": task.id, "title": task.title, "description": task.description, "status": task.status,
+                     "version": task.version} for task in changes.values() if task is not None]
+            if rows:
+                connection.execute(insert(DBTask), rows) # executemany
+            if task_ids:
+                raise_id_high_water(connection, max(task_ids))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def _select_in(self, columns, task_ids):
+        task_ids = list(set(task_ids))
+        for start in range(0, len(task_ids), IN_CLAUSE_CHUNK):
+            query = self.db.select(*columns).where(DBTask.id.in_(task_ids[start:start + IN_CLAUSE_CHUNK]))
+            yield from self.db.session.execute(query)
+
+    def create_tasks(self, tasks):
+        results = []
+        mappings = []
+        for task in tasks:
+            if not task.title:
+                results.append(InvalidTaskError("Task must have a title"))
+                continue
+            results.append(task)
+            mappings.append({"title": task.get_title(), "description": task.get_description(), "status": task.get_status()})
+        if mappings:
+            self.db.session.bulk_insert_mappings(DBTask, mappings, return_defaults=True) # one executemany, ids written back
+            self.db.session.commit()
+            created = iter(mappings)
+            for task in results:
+                if not isinstance(task, Exception):
+                    task.id = next(created)["id"]
+        return results
+
+    def update_tasks(self, partial_tasks):
+        # One SELECT for the current rows, then one executemany UPDATE ... WHERE id = ? AND version = <the version read>.
+        # If any row changed in between, the batch is rolled back and redone one update_task_query at a time.
+        rows = {row.id: row._asdict() for row in self._select_in(TASK_COLUMNS, [partial_task.get_id() for partial_task in partial_tasks])}
+        results = []
+        params = []
+        for partial_task in partial_tasks:
+            row = rows.get(partial_task.get_id())
+            if row is None or (partial_task.version is not None and partial_task.version != row["version"]):
+                results.append(update_miss(partial_task, row and row["version"]))
+                continue
+            expected_version = row["version"]
+            if partial_task.title is not None:
+                row["title"] = partial_task.title
+            if partial_task.description is not None:
+                row["description"] = partial_task.description
+            if partial_task.status is not None:
+                row["status"] = partial_task.status
+            row["version"] += 1
+            params.append({"b_id": row["id"], "b_expected": expected_version, "b_title": row["title"],
+                           "b_description": row["description"], "b_status": row["status"], "b_version": row["version"]})
+            updated_task = Task(title=row["title"], description=row["description"], status=row["status"])
+            updated_task.id = row["id"]
+            updated_task.version = row["version"]
+            results.append(updated_task)
+        if not params:
+            return results
+        try:
+            if self.db.session.connection().execute(BULK_UPDATE_QUERY, params).rowcount == len(params):
+                self.db.session.commit()
+                return results
+            self.db.session.rollback() # lost a race with another writer
+        except Exception:
+            self.db.session.rollback()
+            raise
+        return self._update_each(partial_tasks)
+
+    def _update_each(self, partial_tasks):
+        connection = self.db.session.connection()
+        results = []
+        for partial_task in partial_tasks:
+            row = connection.execute(update_task_query(partial_task)).first()
+            if row is None:
+                results.append(update_miss(partial_task, connection.execute(
+                    select(DBTask.version).where(DBTask.id == partial_task.id)).scalar()))
+            else:
+                results.append(row_to_task(row))
+        self.db.session.commit()
+        return results
+
+    def delete_tasks(self, task_ids):
+        existing = {row.id for row in self._select_in((DBTask.id,), task_ids)}
+        results = []
+        for task_id in task_ids:
+            if task_id in existing:
+                existing.discard(task_id) # a repeated id is already gone the second time
+                results.append(True)
+            else:
+                results.append(TaskNotFoundError(f"Task with ID {task_id} not found"))
+        deleted = [task_id for task_id, result in zip(task_ids, results) if result is True]
+        for start in range(0, len(deleted), IN_CLAUSE_CHUNK):
+            self.db.session.execute(self.db.delete(DBTask).where(DBTask.id.in_(deleted[start:start + IN_CLAUSE_CHUNK])))
+        if deleted:
+            self.db.session.commit()
+        return results
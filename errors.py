@@ -5,3 +5,7 @@ class TaskNotFoundError(Exception):
 class InvalidTaskError(Exception):
     """Raised when a task is invalid (e.g., missing title)."""
     pass
+
+class VersionConflictError(Exception):
+    """Raised when an update expects a version of the task that is no longer current."""
+    pass
@@ -1,44 +1,80 @@
-from flask import Flask, render_template, request, redirect, url_for
-from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, abort
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+from errors import TaskNotFoundError, InvalidTaskError
 
+PAGE_SIZE = 50 # tasks rendered per index page
+TEMPLATES = ("index.html", "add_task.html", "edit_task.html", "_task_item.html")
 
-app = Flask(__name__)
-#tasks = []
-tasks = {}
 
-@app.route('/')
-def index():
-    return render_template('index.html', tasks=tasks)
+def create_html_app(dao=None, page_size=PAGE_SIZE):
+    # HTML frontend over any TaskDAO. The index renders one keyset page at a time, and add/edit/delete answer a
+    # fetch() carrying "X-Fragment: 1" with just the changed <li> (empty for deletes) instead of a redirect, so
+    # neither costs more as the task list grows.
+    app = Flask(__name__)
+    app.jinja_env.auto_reload = False # templates are compiled once below and never re-checked on disk
+    templates = {name: app.jinja_env.get_template(name) for name in TEMPLATES}
+    dao = dao if dao is not None else InMemoryDAO()
 
+    def wants_fragment():
+        return request.headers.get("X-Fragment") == "1"
 
-@app.route('/add', methods=['GET', 'POST'])
-def add_task():
-    if request.method == 'POST':
-        title = request.form['title']
-        description = request.form['description']
-        assignee = request.form['assignee']
-        status = request.form['status']
-        tasks.append({'title': title, 'description': description, 'assignee': assignee, 'status': status})
-        return redirect(url_for('index'))
-    return render_template('add_task.html')
-
-@app.route('/edit/<int:task_id>', methods=['GET', 'POST'])
-def edit_task(task_id):
-    if request.method == 'POST':
-        title = request.form['title']
-        description = request.form['description']
-        assignee = request.form['assignee']
-        status = request.form['status']
-        tasks[task_id] = {'title': title, 'description': description, 'assignee': assignee, 'status': status}
+    def task_from_form():
+        return Task(request.form['title'], request.form.get('description', ""), request.form.get('status', "Pending"))
+
+    def get_task_or_404(task_id):
+        try:
+            return dao.get_task(task_id)
+        except TaskNotFoundError:
+            abort(404)
+
+    @app.route('/')
+    def index():
+        after_id = request.args.get('after_id', type=int)
+        tasks = dao.get_tasks(limit=page_size, after_id=after_id)
+        next_after_id = tasks[-1].id if len(tasks) == page_size else None
+        return render_template(templates["index.html"], tasks=tasks, next_after_id=next_after_id)
+
+    @app.route('/add', methods=['GET', 'POST'])
+    def add_task():
+        if request.method == 'POST':
+            try:
+                task = dao.create_task(task_from_form())
+            except InvalidTaskError as error:
+                return render_template(templates["add_task.html"], error=str(error)), 400
+            if wants_fragment():
+                return render_template(templates["_task_item.html"], task=task), 201
+            return redirect(url_for('index'))
+        return render_template(templates["add_task.html"])
+
+    @app.route('/edit/<int:task_id>', methods=['GET', 'POST'])
+    def edit_task(task_id):
+        if request.method == 'POST':
+            partial_task = task_from_form()
+            partial_task.id = task_id
+            try:
+                task = dao.update_task(partial_task)
+            except TaskNotFoundError:
+                abort(404)
+            if wants_fragment():
+                return render_template(templates["_task_item.html"], task=task)
+            return redirect(url_for('index'))
+        return render_template(templates["edit_task.html"], task=get_task_or_404(task_id))
+
+    @app.route('/delete/<int:task_id>', methods=['GET', 'POST'])
+    def delete_task(task_id):
+        try:
+            dao.delete_task(task_id)
+        except TaskNotFoundError:
+            abort(404)
+        if wants_fragment():
+            return ''
         return redirect(url_for('index'))
-    task = tasks[task_id]
-    return render_template('edit_task.html', task=task, task_id=task_id)
 
-@app.route('/delete/<int:task_id>')
-def delete_task(task_id):
-    tasks.pop(task_id)
-    return redirect(url_for('index'))
+    return app
+
+
+app = create_html_app()
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5001)
-
@@ -1,52 +1,243 @@
-from task_dao import TaskDAO
-from errors import *
-class InMemoryDAO(TaskDAO):
+import copy
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import islice
+from task_dao import TaskDAO, check_task_fields, parse_sort, task_stats, tokenize
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+
+
+class _SortedIds:
+    # Ids in ascending order with lazy removal, so keyset seeks (id > after_id) are a bisect instead of a scan.
+    # Ids are handed out in increasing order, so adds are appends except when a task moves between status buckets.
     def __init__(self):
-        self.tasks = []
+        self.ids = []
+        self.removed = set() # tombstones, compacted once they make up half the list
+
+    def __len__(self):
+        return len(self.ids) - len(self.removed)
+
+    def add(self, task_id):
+        if task_id in self.removed: # still sitting at its sorted position, just revive it
+            self.removed.discard(task_id)
+        elif not self.ids or task_id > self.ids[-1]:
+            self.ids.append(task_id)
+        else:
+            insort(self.ids, task_id)
+
+    def discard(self, task_id):
+        self.removed.add(task_id)
+        if len(self.removed) > 64 and len(self.removed) * 2 > len(self.ids):
+            self.ids = [i for i in self.ids if i not in self.removed]
+            self.removed = set()
+
+    def iter_after(self, after_id=None, descending=False, chunk_size=256):
+        # Re-seek by key for every chunk so concurrent adds/removes never shift us onto the wrong element.
+        # Descending walks ids below after_id from the top.
+        last_id = after_id
+        while True:
+            ids = self.ids
+            if descending:
+                end = len(ids) if last_id is None else bisect_left(ids, last_id)
+                chunk = ids[max(0, end - chunk_size):end][::-1]
+            else:
+                start = 0 if last_id is None else bisect_right(ids, last_id)
+                chunk = ids[start:start + chunk_size]
+            if not chunk:
+                return
+            for task_id in chunk:
+                if task_id not in self.removed:
+                    yield task_id
+            last_id = chunk[-1]
+
+
+ITER_CHUNK_SIZE = 256 # tasks per locked page when streaming
+
+
+class InMemoryDAO(TaskDAO):
+    # Safe to share between request threads:
+    #  - ids come from a locked counter, so they are never handed out twice
+    #  - updates and deletes take the lock stripe of their id, so writes to unrelated tasks don't serialize;
+    #    an update swaps in an updated copy of the task, so readers only ever see whole tasks; the expected version
+    #    of a compare-and-set update is checked under the same stripe lock
+    #  - index_lock guards the id/status/token indexes and is held briefly (always after a stripe lock);
+    #    get_tasks reads under it, so each result is a consistent snapshot
+    def __init__(self, stripes=64):
+        self.tasks = {} # {id: Task}
+        self.ids = _SortedIds() # keyset order for GET /tasks
+        self.ids_by_status = {} # secondary index {status: _SortedIds}
+        self.ids_by_token = {} # inverted index {token: set of ids} over title and description
         self.next_id = 1
+        self.id_lock = threading.Lock()
+        self.index_lock = threading.RLock()
+        self.stripe_locks = [threading.Lock() for _ in range(stripes)]
 
     def __len__(self):
         return len(self.tasks)
 
+    def _before_publish(self, task_id, task):
+        # Called under the write's locks just before it becomes visible (task is None for a delete). A no-op here;
+        # WALTaskDAO appends the write to its log, so log order always matches the order readers see writes in.
+        pass
+
     def _get_unique_id(self):
-        unique_id = self.next_id
-        self.next_id += 1
+        with self.id_lock:
+            unique_id = self.next_id
+            self.next_id += 1
         return unique_id
 
-    def get_tasks(self):
-        return self.tasks
+    def _stripe(self, task_id):
+        return self.stripe_locks[hash(task_id) % len(self.stripe_locks)]
+
+    def _index(self, task):
+        ids = self.ids_by_status.get(task.status)
+        if ids is None:
+            ids = self.ids_by_status[task.status] = _SortedIds()
+        ids.add(task.id)
+
+    def _unindex(self, task):
+        ids = self.ids_by_status.get(task.status)
+        if ids is not None:
+            ids.discard(task.id)
+            if not ids:
+                del self.ids_by_status[task.status]
+
+    @staticmethod
+    def _tokens(task):
+        return set(tokenize(task.title)) | set(tokenize(task.description))
+
+    def _index_text(self, task, tokens):
+        for token in tokens:
+            self.ids_by_token.setdefault(token, set()).add(task.id)
+
+    def _unindex_text(self, task, tokens):
+        for token in tokens:
+            ids = self.ids_by_token.get(token)
+            if ids is not None:
+                ids.discard(task.id)
+                if not ids:
+                    del self.ids_by_token[token]
+
+    def _search_ids(self, search):
+        # Intersect postings smallest first, so the cost follows the rarest token's matches, not the table size
+        postings = sorted((self.ids_by_token.get(token, set()) for token in set(tokenize(search))), key=len)
+        if not postings:
+            return set()
+        ids = set(postings[0])
+        for other in postings[1:]:
+            ids &= other
+        return ids
+
+    def _query(self, status=None, after_id=None, title=None, search=None, sort="id"):
+        # Lazily walks the indexes; callers hold index_lock while consuming it
+        field, descending = parse_sort(sort)
+        if search is not None:
+            ids = sorted(self._search_ids(search), reverse=descending)
+            if after_id is not None:
+                ids = [i for i in ids if (i < after_id if descending else i > after_id)]
+        elif status is not None:
+            bucket = self.ids_by_status.get(status)
+            ids = bucket.iter_after(after_id, descending) if bucket is not None else ()
+            status = None # the bucket already applied it
+        else:
+            ids = self.ids.iter_after(after_id, descending)
+
+        needle = title.lower() if title is not None else None
+        tasks = (self.tasks.get(task_id) for task_id in ids)
+        tasks = (task for task in tasks if task is not None
+                 and (status is None or task.status == status)
+                 and (needle is None or needle in (task.title or "").lower()))
+        if field != "id": # needs the whole match set, sorted by the field with ids (already ordered) as tie-break
+            tasks = iter(sorted(tasks, key=lambda task: getattr(task, field) or "", reverse=descending))
+        return tasks
+
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        with self.index_lock:
+            return list(islice(self._query(status=status, after_id=after_id, title=title, search=search, sort=sort), limit))
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id"):
+        # Keyset pages of ITER_CHUNK_SIZE, each a snapshot, so a slow consumer never holds index_lock.
+        # Search and non-id sorts build their full match set anyway and are returned as one snapshot.
+        query = {"status": status, "title": title, "search": search, "sort": sort}
+        if search is not None or parse_sort(sort)[0] != "id":
+            yield from self.get_tasks(after_id=after_id, **query)
+            return
+        while True:
+            tasks = self.get_tasks(limit=ITER_CHUNK_SIZE, after_id=after_id, **query)
+            yield from tasks
+            if len(tasks) < ITER_CHUNK_SIZE:
+                return
+            after_id = tasks[-1].id
+
+    def status_counts(self, status=None, title=None, search=None):
+        # Status-only queries are answered from the status index without touching a task
+        with self.index_lock:
+            if title is None and search is None:
+                return task_stats({bucket_status: len(ids) for bucket_status, ids in self.ids_by_status.items()
+                                   if status is None or bucket_status == status})
+            return task_stats(Counter(task.status for task in self._query(status=status, title=title, search=search)))
 
     def get_task(self, task_id):
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        task = self.tasks.get(task_id)
+        if task is None:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return task
 
 
     def create_task(self, task):
         if not task.title:
             raise InvalidTaskError("Task must have a title")
+        check_task_fields(task)
         task.id = self._get_unique_id()  # Assign new ID
-        self.tasks.append(task)
+        task.version = 1
+        tokens = self._tokens(task)
+        with self.index_lock:
+            self._before_publish(task.id, task)
+            self.tasks[task.id] = task
+            self.ids.add(task.id)
+            self._index(task)
+            self._index_text(task, tokens)
         return task
 
     def update_task(self, partial_task):
-        existing_task = self.get_task(partial_task.id)
-        if not existing_task:
-            return TaskNotFoundError(f"Task with ID {partial_task.id} not found")  # Explicitly handle non-existent task
-        if partial_task.title is not None:
-            existing_task.title = partial_task.title
-        if partial_task.description is not None:
-            existing_task.description = partial_task.description
-        if partial_task.status is not None:
-            existing_task.status = partial_task.status
-        return existing_task
+        check_task_fields(partial_task)
+        with self._stripe(partial_task.id):
+            existing_task = self.get_task(partial_task.id) # raises TaskNotFoundError for non-existent task
+            if partial_task.version is not None and partial_task.version != existing_task.version:
+                raise VersionConflictError(f"Task with ID {partial_task.id} is at version {existing_task.version}, not {partial_task.version}")
+            updated_task = copy.copy(existing_task)
+            updated_task.version = existing_task.version + 1
+            if partial_task.title is not None:
+                updated_task.title = partial_task.title
+            if partial_task.description is not None:
+                updated_task.description = partial_task.description
+            if partial_task.status is not None:
+                updated_task.status = partial_task.status
+
+            old_tokens = self._tokens(existing_task)
+            new_tokens = self._tokens(updated_task)
+            self._before_publish(updated_task.id, updated_task)
+            if old_tokens == new_tokens and updated_task.status == existing_task.status:
+                self.tasks[updated_task.id] = updated_task # nothing indexed changed, a single atomic swap
+                return updated_task
+            with self.index_lock:
+                self.tasks[updated_task.id] = updated_task
+                self._unindex_text(existing_task, old_tokens - new_tokens)
+                self._index_text(updated_task, new_tokens - old_tokens)
+                if updated_task.status != existing_task.status:
+                    self._unindex(existing_task)
+                    self._index(updated_task)
+            return updated_task
 
     def delete_task(self, task_id):
-        task = self.get_task(task_id)
-        if not task:
-            raise TaskNotFoundError(f"Task with ID {task_id} not found")
-        self.tasks.remove(task)
+        with self._stripe(task_id):
+            with self.index_lock:
+                task = self.tasks.get(task_id)
+                if task is None:
+                    raise TaskNotFoundError(f"Task with ID {task_id} not found")
+                self._before_publish(task_id, None)
+                del self.tasks[task_id]
+                self.ids.discard(task_id)
+                self._unindex(task)
+                self._unindex_text(task, self._tokens(task))
         return True
-
-
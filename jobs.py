@@ -0,0 +1,377 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import abort, jsonify, request, send_file, url_for
+from admission import OverloadedError, retry_after_header
+from errors import InvalidTaskError
+from task import Task
+from task_resource import parse_bulk_create, parse_task_query
+
+# Background jobs for operations too long for a request: POST /jobs queues one and answers 202 at once, a small
+# worker pool runs it in chunks of chunk_size tasks and GET /jobs/<id> reports its progress.
+#   {"type": "import", "tasks": [...]}            or multipart with type=import and a file of JSON objects, as an
+#                                                 array or one per line (NDJSON); items as in POST /tasks/bulk
+#   {"type": "status_change", "status": "Done", "filter": {"status": "Pending", "title": ..., "q": ...}}
+#   {"type": "export", "filter": {...}}           NDJSON of the matching tasks, downloaded from GET /jobs/<id>/result
+# Jobs and their input are kept in SQLite, and every chunk commits a checkpoint, so a job interrupted by a restart
+# resumes where it left off: a chunk in flight when the process died may be applied twice (an import may create
+# those tasks again), nothing earlier is. Jobs never take over the interactive path: at most `workers` run at once,
+# each DAO call covers one chunk, workers sleep `pause` seconds between chunks and back off when admission control
+# sheds them (see install_admission), and POST /jobs answers 503 past max_queued waiting jobs.
+
+JOB_TYPES = ("import", "status_change", "export")
+MAX_REPORTED_ERRORS = 10 # per import, the rest are only counted
+JOB_COLUMNS = ("id", "type", "params", "input", "status", "done", "total", "checkpoint", "error", "created_at",
+               "started_at", "finished_at")
+
+
+class JobStore:
+    # The jobs table in a SQLite file, one connection shared under a lock: job bookkeeping is a few small
+    # statements per chunk
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None) # autocommit
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, "
+                "params TEXT NOT NULL, input BLOB, status TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, total INTEGER, "
+                "checkpoint TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["checkpoint"] = json.loads(job["checkpoint"]) if job["checkpoint"] else None
+        return job
+
+    def create(self, job_type, params, data=None):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (type, params, input, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_type, json.dumps(params), data, time.time()))
+        return self.get(cursor.lastrowid)
+
+    def get(self, job_id):
+        with self.lock:
+            return self._job(self.connection.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def count(self, status):
+        with self.lock:
+            return self.connection.execute("SELECT count(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def claim(self):
+        # The oldest queued job, now marked running; None if there is none
+        with self.lock:
+            row = self.connection.execute(
+                "UPDATE jobs SET status = 'running', started_at = coalesce(started_at, ?) "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+                f"RETURNING {', '.join(JOB_COLUMNS)}", (time.time(),)).fetchone()
+        return self._job(row)
+
+    def requeue_running(self):
+        # At startup: jobs a previous process was running resume from their checkpoint
+        with self.lock:
+            return self.connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def progress(self, job_id, done, total, checkpoint):
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET done = ?, total = ?, checkpoint = ? WHERE id = ?",
+                                    (done, total, json.dumps(checkpoint), job_id))
+
+    def finish(self, job_id, status, error=None):
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, input = NULL WHERE id = ?",
+                                    (status, error, time.time(), job_id))
+
+    def requeue(self, job_id):
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class _Stopping(Exception):
+    pass
+
+
+class JobRunner:
+    def __init__(self, app, store, get_dao, export_dir, workers=1, chunk_size=500, pause=0.0):
+        self.app = app
+        self.store = store
+        self.get_dao = get_dao # the current TaskResource.dao, so caches and change feeds see job writes
+        self.export_dir = export_dir
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.stopping = False
+        self.wake = threading.Condition()
+        self.handlers = {"import": self._import, "status_change": self._status_change, "export": self._export}
+        store.requeue_running()
+        self.threads = [threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True) for n in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job_type, params, data=None):
+        job = self.store.create(job_type, params, data)
+        with self.wake:
+            self.wake.notify()
+        return job
+
+    def close(self):
+        # Stops after the chunk each worker is on, then closes the store; those jobs are queued again and resume
+        # on the next start
+        with self.wake:
+            self.stopping = True
+            self.wake.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.store.close()
+
+    def _work(self):
+        while True:
+            with self.wake:
+                if self.stopping:
+                    return
+            job = self.store.claim()
+            if job is None:
+                with self.wake:
+                    if not self.stopping:
+                        self.wake.wait(1.0) # also picks up jobs queued by another process
+                continue
+            try:
+                with self.app.app_context():
+                    self.handlers[job["type"]](job)
+            except _Stopping:
+                self.store.requeue(job["id"])
+            except Exception as error:
+                self.store.finish(job["id"], "failed", f"{type(error).__name__}: {error}")
+            else:
+                self.store.finish(job["id"], "succeeded")
+
+    def _call(self, operation, *args, **kwargs):
+        # One chunk's DAO call, retried while admission control sheds it
+        while True:
+            try:
+                return operation(*args, **kwargs)
+            except OverloadedError as error:
+                self._sleep(error.retry_after)
+
+    def _sleep(self, seconds):
+        with self.wake:
+            if self.stopping:
+                raise _Stopping()
+            if seconds > 0:
+                self.wake.wait(seconds)
+
+    def _chunk_done(self, job, done, total, checkpoint):
+        self.store.progress(job["id"], done, total, checkpoint)
+        self._sleep(self.pause)
+
+    def _import(self, job):
+        items = parse_task_file(job["input"])
+        checkpoint = job["checkpoint"] or {"offset": 0, "created": 0, "failed": 0, "errors": []}
+        while checkpoint["offset"] < len(items):
+            offset = checkpoint["offset"]
+            chunk = items[offset:offset + self.chunk_size]
+            tasks, positions = [], []
+            for position, item in enumerate(chunk, offset):
+                try:
+                    tasks.append(parse_bulk_create(item))
+                    positions.append(position)
+                except InvalidTaskError as error:
+                    self._import_error(checkpoint, position, error)
+            for position, result in zip(positions, self._create(tasks) if tasks else []):
+                if isinstance(result, Exception):
+                    self._import_error(checkpoint, position, result)
+                else:
+                    checkpoint["created"] += 1
+            checkpoint["offset"] = offset + len(chunk)
+            self._chunk_done(job, checkpoint["offset"], len(items), checkpoint)
+        self.store.progress(job["id"], len(items), len(items), checkpoint)
+
+    def _create(self, tasks):
+        # create_tasks, where an error the batch did not turn into a per-item result fails only its own item: the
+        # tasks the batch created have their id, the rest are created one at a time
+        dao = self.get_dao()
+        try:
+            return self._call(dao.create_tasks, tasks)
+        except Exception:
+            return [task if task.id is not None else self._create_one(dao, task) for task in tasks]
+
+    def _create_one(self, dao, task):
+        try:
+            return self._call(dao.create_task, task)
+        except _Stopping:
+            raise
+        except Exception as error:
+            return error
+
+    @staticmethod
+    def _import_error(checkpoint, position, error):
+        checkpoint["failed"] += 1
+        if len(checkpoint["errors"]) < MAX_REPORTED_ERRORS:
+            checkpoint["errors"].append({"index": position, "message": str(error)})
+
+    def _matching(self, job, checkpoint):
+        # Keyset pages of the job's filter after checkpoint["after_id"], one chunk each
+        query = dict(job["params"]["query"], sort="id")
+        while True:
+            tasks = self._call(self.get_dao().get_tasks, limit=self.chunk_size, after_id=checkpoint["after_id"], **query)
+            if not tasks:
+                return
+            yield tasks
+            if len(tasks) < self.chunk_size:
+                return
+
+    def _total(self, job):
+        if job["total"] is not None:
+            return job["total"]
+        query = job["params"]["query"]
+        return self._call(self.get_dao().status_counts, status=query["status"], title=query["title"], search=query["search"])["total"]
+
+    def _status_change(self, job):
+        total = self._total(job)
+        checkpoint = job["checkpoint"] or {"after_id": None, "updated": 0, "missing": 0}
+        for tasks in self._matching(job, checkpoint):
+            partial_tasks = []
+            for task in tasks:
+                partial_task = Task(status=job["params"]["status"])
+                partial_task.id = task.id
+                partial_tasks.append(partial_task)
+            for result in self._call(self.get_dao().update_tasks, partial_tasks):
+                checkpoint["missing" if isinstance(result, Exception) else "updated"] += 1 # deleted meanwhile
+            checkpoint["after_id"] = tasks[-1].id
+            self._chunk_done(job, checkpoint["updated"] + checkpoint["missing"], total, checkpoint)
+        done = checkpoint["updated"] + checkpoint["missing"]
+        self.store.progress(job["id"], done, done, checkpoint) # the total counted up front is only an estimate
+
+    def export_path(self, job_id):
+        return os.path.join(self.export_dir, f"job-{job_id}.ndjson")
+
+    def _export(self, job):
+        total = self._total(job)
+        checkpoint = job["checkpoint"] or {"after_id": None, "exported": 0, "bytes": 0}
+        with open(self.export_path(job["id"]), "ab") as output:
+            output.truncate(checkpoint["bytes"]) # drops a chunk written after the last checkpoint
+            output.seek(checkpoint["bytes"])
+            for tasks in self._matching(job, checkpoint):
+                output.write(b"".join(task.to_json_bytes() + b"\n" for task in tasks))
+                output.flush()
+                os.fsync(output.fileno()) # the checkpoint must not get ahead of the file
+                checkpoint.update(after_id=tasks[-1].id, exported=checkpoint["exported"] + len(tasks), bytes=output.tell())
+                self._chunk_done(job, checkpoint["exported"], total, checkpoint)
+        self.store.progress(job["id"], checkpoint["exported"], checkpoint["exported"], checkpoint)
+
+
+def parse_task_file(data):
+    # A JSON array of task objects, or one object per line
+    text = data.decode("utf-8").strip()
+    if text.startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("Import file must hold a JSON array or one JSON object per line")
+        return items
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def job_json(job):
+    checkpoint = dict(job["checkpoint"] or {})
+    for key in ("offset", "after_id", "bytes"): # resume positions, not results
+        checkpoint.pop(key, None)
+    body = {
+        "id": job["id"], "type": job["type"], "status": job["status"],
+        "progress": {"done": job["done"], "total": job["total"]},
+        "result": checkpoint or None, "error": job["error"],
+        "created_at": job["created_at"], "started_at": job["started_at"], "finished_at": job["finished_at"],
+    }
+    if job["type"] == "export" and job["status"] == "succeeded":
+        body["result"]["url"] = url_for("get_job_result", job_id=job["id"])
+    return body
+
+
+def install_jobs(app, resource, directory, workers=1, chunk_size=500, pause=0.0, max_queued=100):
+    # Adds the /jobs routes over `resource` (a TaskResource), keeping jobs.db and exports in `directory`
+    os.makedirs(os.path.join(directory, "exports"), exist_ok=True)
+    store = JobStore(os.path.join(directory, "jobs.db"))
+    runner = JobRunner(app, store, lambda: resource.dao, os.path.join(directory, "exports"), workers, chunk_size, pause)
+
+    def bad_request(message):
+        abort(400, description=message)
+
+    def job_request():
+        # (type, params, input) from a JSON body, or a multipart form with a type field and a file
+        if request.files:
+            upload = request.files.get("file")
+            if request.form.get("type") != "import" or upload is None:
+                bad_request("A file upload must be an import: type=import and a file field")
+            data = upload.read()
+            try:
+                parse_task_file(data)
+            except ValueError as error: # json.JSONDecodeError and UnicodeDecodeError are ValueErrors
+                bad_request(f"Invalid import file: {error}")
+            return "import", {}, data
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or body.get("type") not in JOB_TYPES:
+            bad_request(f"type must be one of {', '.join(JOB_TYPES)}")
+        job_type = body["type"]
+        if job_type == "import":
+            if not isinstance(body.get("tasks"), list):
+                bad_request("An import needs a tasks array, or a file upload")
+            return job_type, {}, json.dumps(body["tasks"]).encode() # like an uploaded file, dropped once the job ends
+        job_filter = body.get("filter", {})
+        if not isinstance(job_filter, dict):
+            bad_request("filter must be an object of GET /tasks query parameters")
+        job_filter = {key: value for key, value in job_filter.items() if key in ("status", "title", "q")}
+        for key, value in job_filter.items():
+            if not isinstance(value, str):
+                bad_request(f"filter {key} must be a string")
+        try:
+            query = parse_task_query(job_filter)
+        except ValueError as error:
+            bad_request(str(error))
+        query.pop("after_id")
+        query.pop("sort")
+        params = {"query": query}
+        if job_type == "status_change":
+            if not isinstance(body.get("status"), str) or not body["status"]:
+                bad_request("A status change needs the new status")
+            params["status"] = body["status"]
+        return job_type, params, None
+
+    @app.route('/jobs', methods=['POST'])
+    def create_job():
+        job_type, params, data = job_request()
+        if store.count("queued") >= max_queued:
+            response = jsonify({"message": "Too many queued jobs, retry later"})
+            response.status_code = 503
+            response.headers["Retry-After"] = retry_after_header(1)
+            return response
+        job = runner.submit(job_type, params, data)
+        response = jsonify(job_json(job))
+        response.status_code = 202
+        response.headers["Location"] = url_for("get_job", job_id=job["id"])
+        return response
+
+    @app.route('/jobs/<int:job_id>', methods=['GET'])
+    def get_job(job_id):
+        job = store.get(job_id)
+        if job is None:
+            abort(404, description="Job not found")
+        return jsonify(job_json(job))
+
+    @app.route('/jobs/<int:job_id>/result', methods=['GET'])
+    def get_job_result(job_id):
+        job = store.get(job_id)
+        if job is None or job["type"] != "export" or job["status"] != "succeeded":
+            abort(404, description="No export result for this job")
+        return send_file(runner.export_path(job_id), mimetype="application/x-ndjson", as_attachment=True,
+                         download_name=f"tasks-job-{job_id}.ndjson")
+
+    return runner
@@ -0,0 +1,242 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from flask import Response, g, has_request_context, request
+from cached_task_dao import CachingTaskDAO
+from task_dao import DelegatingTaskDAO
+
+# Hot-path instrumentation for TaskResource: per-route and per-DAO-method latency histograms, call counts, rows
+# returned and DB queries issued, served in Prometheus text format at /metrics. Nothing here runs unless
+# install_metrics() is called; the sampling profiler only hooks requests when enabled.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRICS_ENDPOINTS = ("metrics", "metrics_profile") # not timed or profiled themselves
+DAO_METHODS = ("get_tasks", "get_task", "create_task", "update_task", "delete_task",
+               "create_tasks", "update_tasks", "delete_tasks", "status_counts")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                          for name, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            position = len(self.buckets)
+        self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    # Counters and histograms keyed by (name, labels); callers hold no locks, every update takes the registry lock
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {} # {name: (type, help text)}
+        self.counters = {} # {(name, labels): value}
+        self.histograms = {} # {(name, labels): Histogram}
+        self.collectors = [] # callables returning [(name, type, help, labels, value)] at render time
+
+    def describe(self, name, metric_type, text):
+        self.help[name] = (metric_type, text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        samples = {} # {name: [line, ...]}
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    samples.setdefault(name, []).append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                samples[name].append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                samples[name].append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+            help_texts = dict(self.help)
+        for collector in self.collectors:
+            for name, metric_type, text, labels, value in collector():
+                help_texts.setdefault(name, (metric_type, text))
+                samples.setdefault(name, []).append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+        for name in sorted(samples):
+            metric_type, text = help_texts.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedTaskDAO(DelegatingTaskDAO):
+    # Times every TaskDAO call and counts calls, errors and rows returned. Inside a request the DAO time is also
+    # added to g so the request hook can split handler time into DAO versus everything else (serialization).
+    def __init__(self, dao, registry):
+        super().__init__(dao)
+        self.registry = registry
+        for method in DAO_METHODS:
+            setattr(self, method, self._instrument(method, getattr(dao, method)))
+
+    def _record(self, method, elapsed, outcome, rows=None):
+        self.registry.observe("taskmanager_dao_seconds", elapsed, method=method)
+        self.registry.inc("taskmanager_dao_calls_total", method=method, outcome=outcome)
+        if rows is not None:
+            self.registry.inc("taskmanager_dao_rows_total", rows, method=method)
+        if has_request_context():
+            g.dao_seconds = g.get("dao_seconds", 0.0) + elapsed
+
+    def _instrument(self, method, call):
+        def instrumented(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = call(*args, **kwargs)
+            except Exception:
+                self._record(method, time.perf_counter() - start, "error")
+                raise
+            self._record(method, time.perf_counter() - start, "ok", len(result) if isinstance(result, list) else None)
+            return result
+        return instrumented
+
+    def iter_tasks(self, **query):
+        # Counted when the stream finishes; time is spent while the response is written, so it is not attributed
+        rows = 0
+        for task in self.dao.iter_tasks(**query):
+            rows += 1
+            yield task
+        self.registry.inc("taskmanager_dao_calls_total", method="iter_tasks", outcome="ok")
+        self.registry.inc("taskmanager_dao_rows_total", rows, method="iter_tasks")
+
+
+class SamplingProfiler:
+    # Runs cProfile on every Nth request and accumulates the stats until dumped
+    def __init__(self, every):
+        self.every = every
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.stats = None
+        self.profiled = 0
+
+    def should_profile(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests % self.every == 0
+
+    def add(self, profile):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+            self.profiled += 1
+
+    def dump(self, sort="cumulative", limit=50, reset=False):
+        with self.lock:
+            if self.stats is None:
+                return "no requests profiled yet\n"
+            output = io.StringIO()
+            self.stats.stream = output
+            output.write(f"{self.profiled} profiled requests (1 in {self.every})\n")
+            self.stats.sort_stats(sort).print_stats(limit)
+            if reset:
+                self.stats = None
+                self.profiled = 0
+            return output.getvalue()
+
+
+def _count_queries(registry):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        registry.inc("taskmanager_db_queries_total", executemany=str(executemany).lower())
+    return before_cursor_execute
+
+
+def install_metrics(app, resource, profile_every=None):
+    # Instruments `resource` (a TaskResource) on `app` and adds GET /metrics; with profile_every=N also samples
+    # one request in N with cProfile, dumped by GET /metrics/profile (?sort=, ?limit=, ?reset=1).
+    registry = MetricsRegistry()
+    registry.describe("taskmanager_http_request_seconds", "histogram", "Route handler latency")
+    registry.describe("taskmanager_http_requests_total", "counter", "Requests by route and status")
+    registry.describe("taskmanager_request_phase_seconds", "histogram", "Request time in the DAO versus the rest (serialization, framework)")
+    registry.describe("taskmanager_dao_seconds", "histogram", "TaskDAO method latency")
+    registry.describe("taskmanager_dao_calls_total", "counter", "TaskDAO calls by method and outcome")
+    registry.describe("taskmanager_dao_rows_total", "counter", "Tasks returned by TaskDAO methods")
+    registry.describe("taskmanager_db_queries_total", "counter", "SQL statements executed")
+
+    resource.wrap_dao(lambda dao: InstrumentedTaskDAO(dao, registry)) # behind a cache, so only misses are timed
+    if isinstance(resource.dao, CachingTaskDAO):
+        cache = resource.dao
+        registry.collectors.append(lambda: [
+            (f"taskmanager_cache_{counter}_total", "counter", f"Response cache {counter}", {"cache": name}, value)
+            for name, stats in cache.stats().items() for counter, value in stats.items() if counter != "entries"])
+
+    backend = resource.dao
+    while isinstance(backend, DelegatingTaskDAO):
+        backend = backend.dao
+    if hasattr(backend, "db"): # DBTaskDAO: count every statement sent to its engines
+        from sqlalchemy import event
+        with app.app_context():
+            for engine in backend.db.engines.values():
+                event.listen(engine, "before_cursor_execute", _count_queries(registry))
+
+    profiler = SamplingProfiler(profile_every) if profile_every else None
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        if profiler is not None and request.endpoint not in METRICS_ENDPOINTS and profiler.should_profile():
+            g.profile = cProfile.Profile()
+            g.profile.enable()
+
+    @app.after_request
+    def record_request(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.disable()
+            profiler.add(profile)
+        started = g.pop("request_started", None)
+        if started is not None and request.endpoint not in METRICS_ENDPOINTS:
+            elapsed = time.perf_counter() - started
+            endpoint = request.endpoint or "unmatched"
+            dao_seconds = g.pop("dao_seconds", 0.0)
+            registry.observe("taskmanager_http_request_seconds", elapsed, endpoint=endpoint, method=request.method)
+            registry.inc("taskmanager_http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+            registry.observe("taskmanager_request_phase_seconds", dao_seconds, endpoint=endpoint, phase="dao")
+            registry.observe("taskmanager_request_phase_seconds", max(0.0, elapsed - dao_seconds), endpoint=endpoint, phase="other")
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), 200, mimetype="text/plain; version=0.0.4")
+
+    if profiler is not None:
+        @app.route('/metrics/profile', methods=['GET'])
+        def metrics_profile():
+            text = profiler.dump(sort=request.args.get("sort", "cumulative"), limit=request.args.get("limit", 50, type=int),
+                                 reset=request.args.get("reset") == "1")
+            return Response(text, 200, mimetype="text/plain")
+
+    return registry
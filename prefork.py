@@ -0,0 +1,116 @@
+# Multi-process serving: one store process owns the tasks and N pre-forked worker processes serve HTTP over them,
+# so the API scales across cores while every worker sees the same task set.
+#  - the store runs a TaskStoreServer over InMemoryDAO, or WALTaskDAO when --data-dir is given, on a Unix socket
+#  - the launcher binds the listening socket once and forks the workers, which all accept() on it (the kernel
+#    hands each connection to one of them) and run TaskResource over a RemoteTaskDAO
+#  - a worker that dies is replaced; SIGTERM/SIGINT stop everything
+# POSIX only (fork). Run from the repo root: python -m prefork --workers 4 --port 5000 [--data-dir DIR]
+import argparse
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from shared_store import TaskStoreServer
+
+
+def create_worker_app(address, authkey):
+    return create_app({"TASK_BACKEND": "remote", "TASK_STORE_ADDRESS": address, "TASK_STORE_AUTHKEY": authkey})
+
+
+def run_store(address, authkey, data_dir=None):
+    if data_dir is not None:
+        from wal_task_dao import WALTaskDAO
+        dao = WALTaskDAO(data_dir)
+    else:
+        from in_memory_task_dao import InMemoryDAO
+        dao = InMemoryDAO()
+    TaskStoreServer(dao, address, authkey).serve_forever()
+
+
+def run_worker(listen_fd, host, port, address, authkey):
+    server = make_server(host, port, create_worker_app(address, authkey), threaded=True, fd=listen_fd)
+    server.serve_forever()
+
+
+def bind(host, port, backlog=1024):
+    sock = socket.create_server((host, port), backlog=backlog, reuse_port=False)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn(target, *args):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            target(*args)
+        finally:
+            os._exit(1) # never fall back into the launcher's code
+    return pid
+
+
+def wait_for_store(address, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(address):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"task store did not start listening on {address}")
+        time.sleep(0.01)
+
+
+def serve(workers, host, port, data_dir=None, ready=None):
+    authkey = os.urandom(32)
+    address = os.path.join(tempfile.mkdtemp(prefix="taskmanager-store-"), "store.sock")
+    store_pid = spawn(run_store, address, authkey, data_dir) # forked before binding, so it holds no HTTP socket
+    wait_for_store(address)
+    sock = bind(host, port)
+    port = sock.getsockname()[1] # resolves port 0
+    worker_pids = {spawn(run_worker, sock.fileno(), host, port, address, authkey) for _ in range(workers)}
+    if ready is not None:
+        ready(port)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in worker_pids | ({store_pid} if store_pid is not None else set()):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while worker_pids or store_pid is not None:
+        pid, _ = os.wait()
+        if pid == store_pid:
+            store_pid = None
+            if not stopping: # without the store no worker can answer; take the whole group down
+                stop(signal.SIGTERM, None)
+            continue
+        worker_pids.discard(pid)
+        if not stopping:
+            worker_pids.add(spawn(run_worker, sock.fileno(), host, port, address, authkey))
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskManager pre-fork server")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--data-dir", help="persist tasks with WALTaskDAO in this directory (default: in memory)")
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port, args.data_dir,
+          ready=lambda port: print(f"serving on http://{args.host}:{port} with {args.workers} workers", file=sys.stderr, flush=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import heapq
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from sqlalchemy import create_engine, delete, func, insert, select, text
+from db_task_dao import (DBTask, PRODUCTION_ENGINE_PROFILE, apply_sqlite_pragmas, id_high_water, row_to_task, select_tasks,
+                         task_filters, update_task_query, update_miss)
+from task_dao import TaskDAO, parse_sort, task_stats
+from errors import TaskNotFoundError, InvalidTaskError
+
+# Tasks hash-partitioned by id over N SQLite files (tasks-000.db, ...), each with its own write lock, so writes to
+# different shards commit in parallel. Ids come from one counter and task id lives in shard id % N: creates spread
+# round-robin and every single-task call goes straight to its shard. Listings scatter the same query to every shard
+# and merge the ordered results (heapq.merge on the query's sort key); counts add up. Batches are split by shard
+# and the shards run in parallel, one transaction each. The shard count is stored in every file
+# (PRAGMA user_version) and cannot change once tasks are written.
+
+DIALECT = "sqlite"
+
+
+def shard_path(directory, shard):
+    return os.path.join(directory, f"tasks-{shard:03d}.db")
+
+
+def _sort_key(sort):
+    # Matches select_tasks' ORDER BY <field>, id on SQLite, where NULL sorts first
+    field, _ = parse_sort(sort)
+    if field == "id":
+        return lambda task: task.id
+    return lambda task: (getattr(task, field) is not None, getattr(task, field) or "", task.id)
+
+
+class ShardedTaskDAO(TaskDAO):
+    def __init__(self, directory, shards=4, pragmas=None):
+        os.makedirs(directory, exist_ok=True)
+        pragmas = pragmas if pragmas is not None else PRODUCTION_ENGINE_PROFILE["sqlite_pragmas"]
+        self.engines = []
+        for shard in range(shards):
+            engine = create_engine(f"sqlite:///{shard_path(directory, shard)}")
+            apply_sqlite_pragmas(engine, pragmas)
+            with engine.begin() as connection:
+                stored_shards = connection.execute(text("PRAGMA user_version")).scalar()
+                if stored_shards not in (0, shards):
+                    raise ValueError(f"{directory} holds {stored_shards} shards, not {shards}")
+                connection.execute(text(f"PRAGMA user_version = {shards}"))
+            DBTask.__table__.create(engine, checkfirst=True) # with the FTS5 table and triggers
+            self.engines.append(engine)
+        self.executor = ThreadPoolExecutor(max_workers=4 * shards, thread_name_prefix="shard")
+        self.id_lock = threading.Lock()
+        self.next_id = max(self._scatter(self._high_water)) + 1
+
+    @staticmethod
+    def _high_water(engine):
+        with engine.connect() as connection:
+            return id_high_water(connection)
+
+    def close(self):
+        self.executor.shutdown()
+        for engine in self.engines:
+            engine.dispose()
+
+    def _shard(self, task_id):
+        return self.engines[task_id % len(self.engines)]
+
+    def _scatter(self, call):
+        # call(engine) on every shard at once, results in shard order
+        return list(self.executor.map(call, self.engines))
+
+    @staticmethod
+    def _scalar(engine, query):
+        with engine.connect() as connection:
+            return connection.execute(query).scalar()
+
+    @staticmethod
+    def _rows(engine, query):
+        with engine.connect() as connection:
+            return [row_to_task(row) for row in connection.execute(query)]
+
+    def __len__(self):
+        return sum(self._scatter(lambda engine: self._scalar(engine, select(func.count()).select_from(DBTask))))
+
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        query = select_tasks(DIALECT, status=status, after_id=after_id, title=title, search=search, sort=sort)
+        if limit is not None:
+            query = query.limit(limit) # the first limit of the merge are among each shard's first limit
+        pages = self._scatter(lambda engine: self._rows(engine, query))
+        return list(islice(heapq.merge(*pages, key=_sort_key(sort), reverse=parse_sort(sort)[1]), limit))
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id", batch_size=1000):
+        # One cursor per shard, each buffering batch_size rows, merged lazily
+        query = select_tasks(DIALECT, status=status, after_id=after_id, title=title, search=search, sort=sort)
+        streams = [self._stream(engine, query, batch_size) for engine in self.engines]
+        yield from heapq.merge(*streams, key=_sort_key(sort), reverse=parse_sort(sort)[1])
+
+    @staticmethod
+    def _stream(engine, query, batch_size):
+        with engine.connect() as connection:
+            for row in connection.execution_options(yield_per=batch_size).execute(query):
+                yield row_to_task(row)
+
+    def status_counts(self, status=None, title=None, search=None):
+        query = (select(DBTask.status, func.count())
+                 .where(*task_filters(DIALECT, status=status, title=title, search=search))
+                 .group_by(DBTask.status))
+
+        def count(engine):
+            with engine.connect() as connection:
+                return dict(connection.execute(query).all())
+        totals = Counter()
+        for by_status in self._scatter(count):
+            totals.update(by_status)
+        return task_stats(totals)
+
+    def get_task(self, task_id):
+        with self._shard(task_id).connect() as connection:
+            row = connection.execute(select_tasks(DIALECT).where(DBTask.id == task_id)).first()
+        if row is None:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return row_to_task(row)
+
+    def _allocate_ids(self, count):
+        with self.id_lock:
+            first = self.next_id
+            self.next_id += count
+        return range(first, first + count)
+
+    @staticmethod
+    def _values(task):
+        values = {field: getattr(task, field) for field in ("title", "description", "status")
+                  if getattr(task, field) is not None} # None takes the column default
+        values["id"] = task.id
+        return values
+
+    def create_task(self, task):
+        if not task.title:
+            raise InvalidTaskError("Task must have a title")
+        task.id = self._allocate_ids(1)[0]
+        with self._shard(task.id).begin() as connection:
+            connection.execute(insert(DBTask).values(**self._values(task)))
+        task.version = 1
+        return task
+
+    @staticmethod
+    def _update(connection, partial_task):
+        row = connection.execute(update_task_query(partial_task)).first()
+        if row is None:
+            raise update_miss(partial_task, connection.execute(
+                select(DBTask.version).where(DBTask.id == partial_task.id)).scalar())
+        return row_to_task(row)
+
+    @staticmethod
+    def _delete(connection, task_id):
+        if connection.execute(delete(DBTask).where(DBTask.id == task_id)).rowcount == 0:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return True
+
+    def update_task(self, partial_task):
+        with self._shard(partial_task.id).begin() as connection:
+            return self._update(connection, partial_task)
+
+    def delete_task(self, task_id):
+        with self._shard(task_id).begin() as connection:
+            return self._delete(connection, task_id)
+
+    def _by_shard(self, items, task_id, run):
+        # Runs run(connection, [(position, item)]) -> [(position, result)] per shard, in parallel, one transaction
+        # each; returns the results in input order
+        groups = {}
+        for position, item in enumerate(items):
+            groups.setdefault(task_id(item) % len(self.engines), []).append((position, item))
+
+        def run_shard(shard):
+            with self.engines[shard].begin() as connection:
+                return run(connection, groups[shard])
+        results = [None] * len(items)
+        for shard_results in self.executor.map(run_shard, list(groups)):
+            for position, result in shard_results:
+                results[position] = result
+        return results
+
+    def create_tasks(self, tasks):
+        valid = [task for task in tasks if task.title]
+        for task, task_id in zip(valid, self._allocate_ids(len(valid))):
+            task.id = task_id
+            task.version = 1
+
+        def insert_shard(connection, group):
+            rows = [self._values(task) for _, task in group]
+            for keys in {tuple(row) for row in rows}: # executemany needs the same columns in every row
+                connection.execute(insert(DBTask), [row for row in rows if tuple(row) == keys])
+            return group
+        results = self._by_shard(valid, lambda task: task.id, insert_shard)
+        created = iter(results)
+        return [next(created) if task.title else InvalidTaskError("Task must have a title") for task in tasks]
+
+    def update_tasks(self, partial_tasks):
+        return self._by_shard(partial_tasks, lambda partial_task: partial_task.id, lambda connection, group: [
+            (position, self._try(lambda item: self._update(connection, item), partial_task)) for position, partial_task in group])
+
+    def delete_tasks(self, task_ids):
+        return self._by_shard(task_ids, lambda task_id: task_id, lambda connection, group: [
+            (position, self._try(lambda item: self._delete(connection, item), task_id)) for position, task_id in group])
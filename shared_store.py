@@ -0,0 +1,132 @@
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+from multiprocessing import AuthenticationError
+from in_memory_task_dao import ITER_CHUNK_SIZE
+from task_dao import TaskDAO, parse_sort
+
+# One task store shared by several worker processes (see prefork.py). TaskStoreServer owns a TaskDAO, usually an
+# InMemoryDAO or WALTaskDAO, and answers TaskDAO calls over a local socket; RemoteTaskDAO is the TaskDAO the
+# workers use. Every call is one pickled (method, args, kwargs) request and one (ok, result) reply on an
+# authenticated connection borrowed from a per-worker pool, so the store serializes nothing beyond what its own
+# DAO locks do. Werkzeug starts a thread per client connection, so connections are pooled rather than kept per
+# thread: a new one (a handshake, and a server thread) is opened only when every pooled one is in use.
+
+STORE_METHODS = frozenset(("__len__", "get_tasks", "get_task", "status_counts", "create_task", "update_task", "delete_task",
+                           "create_tasks", "update_tasks", "delete_tasks"))
+
+
+class TaskStoreServer:
+    # address is a Unix socket path (or a (host, port) pair); authkey guards the pickle protocol, keep it secret
+    def __init__(self, dao, address, authkey):
+        self.dao = dao
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+
+    def serve_forever(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except AuthenticationError:
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, args, kwargs = connection.recv()
+                except (EOFError, OSError): # the worker closed its end
+                    return
+                if method not in STORE_METHODS:
+                    connection.send((False, ValueError(f"{method} is not a TaskDAO method")))
+                    continue
+                try:
+                    reply = (True, getattr(self.dao, method)(*args, **kwargs))
+                except Exception as error: # TaskNotFoundError etc. are re-raised in the worker
+                    reply = (False, error)
+                connection.send(reply)
+
+    def close(self):
+        self.listener.close()
+
+
+class RemoteTaskDAO(TaskDAO):
+    def __init__(self, address, authkey, max_idle=8):
+        self.address = address
+        self.authkey = authkey
+        self.idle = queue.LifoQueue(maxsize=max_idle) # connections not in use; most recently used first
+        self.opened = 0
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, authkey=self.authkey)
+            self.opened += 1
+        try:
+            connection.send((method, args, kwargs))
+            ok, result = connection.recv()
+        except (EOFError, OSError):
+            # The store went away mid-call; never retried, a write may or may not have happened
+            connection.close()
+            raise
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full: # more threads than max_idle were calling at once
+            connection.close()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __len__(self):
+        return self._call("__len__")
+
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        return self._call("get_tasks", status=status, limit=limit, after_id=after_id, title=title, search=search, sort=sort)
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id"):
+        # Keyset pages of ITER_CHUNK_SIZE, one round trip each; search and non-id sorts come back in one reply
+        query = {"status": status, "title": title, "search": search, "sort": sort}
+        if search is not None or parse_sort(sort)[0] != "id":
+            yield from self.get_tasks(after_id=after_id, **query)
+            return
+        while True:
+            tasks = self.get_tasks(limit=ITER_CHUNK_SIZE, after_id=after_id, **query)
+            yield from tasks
+            if len(tasks) < ITER_CHUNK_SIZE:
+                return
+            after_id = tasks[-1].id
+
+    def get_task(self, task_id):
+        return self._call("get_task", task_id)
+
+    def status_counts(self, status=None, title=None, search=None):
+        return self._call("status_counts", status=status, title=title, search=search)
+
+    def create_task(self, task):
+        created = self._call("create_task", task)
+        task.id, task.version = created.id, created.version # callers keep using the object they passed in
+        return task
+
+    def update_task(self, task):
+        return self._call("update_task", task)
+
+    def delete_task(self, task_id):
+        return self._call("delete_task", task_id)
+
+    def create_tasks(self, tasks):
+        return self._call("create_tasks", tasks)
+
+    def update_tasks(self, partial_tasks):
+        return self._call("update_tasks", partial_tasks)
+
+    def delete_tasks(self, task_ids):
+        return self._call("delete_tasks", task_ids)
@@ -0,0 +1,28 @@
+from task_json import dumps_task
+
+# The task model, kept free of Flask so DAOs and tools can import it without pulling in the web stack
+
+class Task:
+    __slots__ = ("id", "title", "description", "status", "version") # no per-instance __dict__, a million resident tasks add up
+
+    def __init__(self, title=None, description=None, status=None):
+        self.id = None
+        self.version = None # set by the DAO; on a partial task, the version an update expects (see TaskDAO.update_task)
+        self.title = title
+        self.description = description
+        self.status = status
+    def get_id(self):
+        return self.id
+    def get_title(self):
+        return self.title
+    def get_description(self):
+        return self.description
+    def get_status(self):
+        return self.status
+    def to_json(self):
+        return {"id": self.id, "title": self.title, "description":self.description, "status":self.status}
+    def to_json_bytes(self): # serialized straight from the fields, see task_json
+        return dumps_task(self)
+    @staticmethod
+    def from_json(json_task):
+        return Task(json_task.get("title"), json_task.get("description"), json_task.get("status"))
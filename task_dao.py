@@ -1,15 +1,141 @@
+import re
+from collections import Counter
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+
+SORT_FIELDS = ("id", "title", "status") # sort="field" is ascending, sort="-field" descending; ties break on id
+
+
+def parse_sort(sort):
+    # Returns (field, descending); raises ValueError for anything outside SORT_FIELDS
+    descending = sort.startswith("-")
+    field = sort[1:] if descending else sort
+    if field not in SORT_FIELDS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}, optionally prefixed with '-'")
+    return field, descending
+
+
+def next_cursor(tasks, limit, sort):
+    # after_id for the page following a full page of tasks, None if this was the last page or the sort has no keyset
+    if limit is None or len(tasks) < limit or sort not in ("id", "-id"):
+        return None
+    return tasks[-1].id
+
+
+def tokenize(text):
+    # Word tokens for full-text search; every backend matches whole tokens, all query tokens required
+    return re.findall(r"[^\W_]+", text.lower()) if text else [] # letters and digits, like SQLite's unicode61 tokenizer
+
+
+def check_task_fields(task):
+    # Title, description and status are strings or None (not given); raised before any backend indexes or encodes them
+    for field in ("title", "description", "status"):
+        value = getattr(task, field)
+        if value is not None and not isinstance(value, str):
+            raise InvalidTaskError(f"{field} must be a string")
+
+
+def task_etag(task):
+    # Strong ETag value of a single task: its version, bumped by every update (None if the store has no versions)
+    return None if task.version is None else str(task.version)
+
+
+def task_stats(by_status):
+    # The status_counts() result: {"total": matching tasks, "by_status": {status: count}}, statuses with no tasks left out
+    by_status = {status: count for status, count in by_status.items() if count}
+    return {"total": sum(by_status.values()), "by_status": by_status}
+
+
 class TaskDAO:
-    def get_all_tasks(self):
+    # Listing query arguments, shared by get_tasks and iter_tasks:
+    #   status   exact status match
+    #   title    case-insensitive substring of the title
+    #   search   full-text query over title and description (see tokenize)
+    #   sort     one of SORT_FIELDS, "-" prefix for descending
+    #   after_id keyset cursor: the id of the last task already seen, only valid with sort="id" or "-id"
+    def get_tasks(self, status=None, limit=None, after_id=None, title=None, search=None, sort="id"):
+        raise NotImplementedError
+
+    def iter_tasks(self, status=None, after_id=None, title=None, search=None, sort="id"):
         raise NotImplementedError
 
     def get_task(self, task_id):
         raise NotImplementedError
 
+    def status_counts(self, status=None, title=None, search=None):
+        # Counts of the tasks matching the listing filters, grouped by status (see task_stats). This default counts
+        # a full iter_tasks pass; stores with a status index or GROUP BY override it.
+        return task_stats(Counter(task.status for task in self.iter_tasks(status=status, title=title, search=search)))
+
     def create_task(self, task):
         raise NotImplementedError
 
     def update_task(self, task):
+        # Applies the non-None fields and bumps the version. With task.version set it is a compare-and-set:
+        # VersionConflictError unless that is still the stored version.
         raise NotImplementedError
 
     def delete_task(self, task_id):
         raise NotImplementedError
+
+    # Batch operations return one result per input item, in order: the Task (or True for deletes) on success,
+    # or the TaskNotFoundError/InvalidTaskError/VersionConflictError raised for that item. One bad item never fails the batch.
+    # These defaults make a single pass over the single-item methods; stores with per-call overhead override them.
+    def create_tasks(self, tasks):
+        return [self._try(self.create_task, task) for task in tasks]
+
+    def update_tasks(self, partial_tasks):
+        return [self._try(self.update_task, partial_task) for partial_task in partial_tasks]
+
+    def delete_tasks(self, task_ids):
+        return [self._try(self.delete_task, task_id) for task_id in task_ids]
+
+    @staticmethod
+    def _try(operation, item):
+        try:
+            return operation(item)
+        except (TaskNotFoundError, InvalidTaskError, VersionConflictError) as error:
+            return error
+
+
+class DelegatingTaskDAO(TaskDAO):
+    # Base for layers that wrap another TaskDAO (caching, instrumentation, ...): forwards everything by default
+    def __init__(self, dao):
+        self.dao = dao
+
+    def __len__(self):
+        return len(self.dao)
+
+    def __getattr__(self, name): # backend-specific extras, e.g. DBTaskDAO.db
+        if name == "dao":
+            raise AttributeError(name)
+        return getattr(self.dao, name)
+
+    def get_tasks(self, **query):
+        return self.dao.get_tasks(**query)
+
+    def iter_tasks(self, **query):
+        return self.dao.iter_tasks(**query)
+
+    def get_task(self, task_id):
+        return self.dao.get_task(task_id)
+
+    def status_counts(self, **query):
+        return self.dao.status_counts(**query)
+
+    def create_task(self, task):
+        return self.dao.create_task(task)
+
+    def update_task(self, task):
+        return self.dao.update_task(task)
+
+    def delete_task(self, task_id):
+        return self.dao.delete_task(task_id)
+
+    def create_tasks(self, tasks):
+        return self.dao.create_tasks(tasks)
+
+    def update_tasks(self, partial_tasks):
+        return self.dao.update_tasks(partial_tasks)
+
+    def delete_tasks(self, task_ids):
+        return self.dao.delete_tasks(task_ids)
@@ -0,0 +1,91 @@
+# Wire formats and compression for the task routes, negotiated from Accept and Accept-Encoding (see TaskResource).
+#  - application/json (default) and application/msgpack: a task object, or a list of them
+#  - the columns layouts, lists only: {"id": [...], "title": [...], "description": [...], "status": [...],
+#    "statuses": [...]}, one array per field with status dictionary-encoded (status holds indexes into statuses),
+#    so field names and repeated status strings are sent once per response instead of once per task
+#  - gzip, and zstd and br when zstandard and brotli are installed, for bodies of at least COMPRESS_MIN_BYTES
+# msgpack, zstandard and brotli are optional dependencies; formats and encodings they provide are only offered
+# when installed.
+import gzip
+import json
+
+from task_json import dumps_task, dumps_tasks
+
+try:
+    import orjson
+except ImportError: # optional dependency
+    orjson = None
+try:
+    import msgpack
+except ImportError: # optional dependency
+    msgpack = None
+try:
+    import zstandard
+except ImportError: # optional dependency
+    zstandard = None
+try:
+    import brotli
+except ImportError: # optional dependency
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNS_JSON = "application/vnd.taskmanager.columns+json"
+COLUMNS_MSGPACK = "application/vnd.taskmanager.columns+msgpack"
+
+COMPRESS_MIN_BYTES = 1024 # smaller bodies gain too little to pay for the compressor
+# Levels for online compression: fast settings, not maximum ratio (brotli's default of 11 is for static assets)
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+BROTLI_QUALITY = 4
+
+TASK_FORMATS = [JSON] + ([MSGPACK] if msgpack is not None else []) # preference order, first wins a tie
+LIST_FORMATS = TASK_FORMATS + [COLUMNS_JSON] + ([COLUMNS_MSGPACK] if msgpack is not None else [])
+ENCODINGS = ((["zstd"] if zstandard is not None else []) + (["br"] if brotli is not None else []) + ["gzip"])
+
+if zstandard is not None:
+    _zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL) # thread-safe for one-shot compress()
+
+
+def _task_dict(task):
+    return {"id": task.id, "title": task.title, "description": task.description, "status": task.status}
+
+
+def task_columns(tasks):
+    columns = {"id": [], "title": [], "description": [], "status": [], "statuses": []}
+    codes = {}
+    for task in tasks:
+        columns["id"].append(task.id)
+        columns["title"].append(task.title)
+        columns["description"].append(task.description)
+        code = codes.get(task.status)
+        if code is None:
+            code = codes[task.status] = len(columns["statuses"])
+            columns["statuses"].append(task.status)
+        columns["status"].append(code)
+    return columns
+
+
+def encode_task(task, mimetype):
+    if mimetype == MSGPACK:
+        return msgpack.packb(_task_dict(task))
+    return dumps_task(task)
+
+
+def encode_tasks(tasks, mimetype):
+    if mimetype == MSGPACK:
+        return msgpack.packb([_task_dict(task) for task in tasks])
+    if mimetype == COLUMNS_MSGPACK:
+        return msgpack.packb(task_columns(tasks))
+    if mimetype == COLUMNS_JSON:
+        columns = task_columns(tasks)
+        return orjson.dumps(columns) if orjson is not None else json.dumps(columns, separators=(",", ":")).encode()
+    return dumps_tasks(tasks)
+
+
+def compress(body, encoding):
+    if encoding == "zstd":
+        return _zstd.compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -0,0 +1,44 @@
+# Fast Task -> JSON bytes encoding for the hot response paths, skipping Flask's generic JSON provider.
+# Uses orjson when it is installed, otherwise a hand-written encoder over the four task fields.
+import json
+import numbers
+from json.encoder import encode_basestring_ascii # C-accelerated string escaping from the stdlib
+
+try:
+    import orjson
+except ImportError: # optional dependency
+    orjson = None
+
+
+def _encode_value(value):
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, numbers.Integral): # also NumPy integers from the columnar backend
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        return json.dumps(float(value))
+    return json.dumps(value) # lists and dicts posted as a field
+
+
+def _encode_task(task):
+    return '{"id":%s,"title":%s,"description":%s,"status":%s}' % (
+        _encode_value(task.id), _encode_value(task.title), _encode_value(task.description), _encode_value(task.status))
+
+
+if orjson is not None:
+    def dumps_task(task):
+        return orjson.dumps({"id": task.id, "title": task.title, "description": task.description, "status": task.status})
+
+    def dumps_tasks(tasks):
+        return orjson.dumps([{"id": task.id, "title": task.title, "description": task.description, "status": task.status}
+                             for task in tasks])
+else:
+    def dumps_task(task):
+        return _encode_task(task).encode()
+
+    def dumps_tasks(tasks):
+        return ("[" + ",".join(map(_encode_task, tasks)) + "]").encode()
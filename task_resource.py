@@ -1,48 +1,199 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort
+import json
+from itertools import islice
+from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, Response, stream_with_context
 from in_memory_task_dao import InMemoryDAO
+from cached_task_dao import CachingTaskDAO
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+from task_formats import (JSON, TASK_FORMATS, LIST_FORMATS, ENCODINGS, COMPRESS_MIN_BYTES, compress, encode_task,
+                          encode_tasks)
+from task import Task # re-exported, Task used to live here
+from task_dao import check_task_fields, parse_sort, next_cursor, task_etag
+
+STREAM_CHUNK_SIZE = 100 # tasks serialized per chunk written to the client
+MAX_BULK_ITEMS = 10000 # per bulk request, keeps a single transaction bounded
+COMPRESSED_ENDPOINTS = ("get_tasks", "create_tasks", "update_tasks", "delete_tasks") # see setup_compression
+
+# Request parsing and bulk result shaping, shared by TaskResource and the ASGI app (asgi_app.py).
+# Parsers raise ValueError (or InvalidTaskError for a single bulk item) with the message sent back as the 400 body.
+
+def parse_int_arg(args, name, minimum):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return value
+
+
+def parse_task_query(args):
+    # GET /tasks query string -> TaskDAO listing arguments
+    query = {
+        "status": args.get("status"),
+        "title": args.get("title") or None, # substring match
+        "search": args.get("q") or None, # full-text over title and description
+        "sort": args.get("sort", "id"),
+        "after_id": parse_int_arg(args, "after_id", minimum=0),
+    }
+    field, _ = parse_sort(query["sort"])
+    if field != "id" and query["after_id"] is not None:
+        raise ValueError("after_id pagination requires sort=id or sort=-id")
+    return query
+
+
+def parse_if_match(header):
+    # If-Match header -> the task version an update expects, None for no header or "*". Task ETags are strong
+    # (see task_etag), so weak tags never match; a header naming no version of ours cannot match either.
+    if header is None or header.strip() == "*":
+        return None
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            return int(tag[1:-1])
+    raise VersionConflictError("If-Match does not name a current version of the task")
+
+
+def parse_bulk_create(item):
+    if not isinstance(item, dict):
+        raise InvalidTaskError("Each task must be a JSON object")
+    task = Task(item.get("title"), item.get("description", ""), item.get("status", "Pending"))
+    check_task_fields(task)
+    return task
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) # JSON true/false decode to bool, an int subclass
+
+
+def parse_bulk_update(item):
+    if not isinstance(item, dict) or not _is_int(item.get("id")):
+        raise InvalidTaskError("Each update must be a JSON object with an integer id")
+    if item.get("version") is not None and not _is_int(item["version"]):
+        raise InvalidTaskError("version must be an integer")
+    partial_task = Task.from_json(item)
+    check_task_fields(partial_task)
+    partial_task.id = item["id"]
+    partial_task.version = item.get("version") # optional compare-and-set, like If-Match on PATCH /tasks/<id>
+    return partial_task
+
+
+def parse_bulk_delete(item):
+    if not _is_int(item):
+        raise InvalidTaskError("Each task ID must be an integer")
+    return item
+
+
+def prepare_bulk(items, parse):
+    # Bulk bodies are JSON arrays. Returns (results, parsed): results holds the per-item parse errors and parsed
+    # the (position, item) pairs to hand to the DAO batch method
+    if not isinstance(items, list):
+        raise ValueError("Request body must be a JSON array")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} items per bulk request")
+    results = [None] * len(items)
+    parsed = []
+    for position, item in enumerate(items):
+        try:
+            parsed.append((position, parse(item)))
+        except InvalidTaskError as error:
+            results[position] = error
+    return results, parsed
+
+
+def finish_bulk(results, parsed, dao_results, success_status):
+    # Returns (body, status): one {"status", "task"|"id"|"message"} entry per item in request order,
+    # and 207 Multi-Status if any item failed
+    for (position, item), result in zip(parsed, dao_results):
+        results[position] = item if result is True else result # deletes report the id they removed
+    body = []
+    for result in results:
+        if isinstance(result, TaskNotFoundError):
+            body.append({"status": 404, "message": str(result)})
+        elif isinstance(result, InvalidTaskError):
+            body.append({"status": 400, "message": str(result)})
+        elif isinstance(result, VersionConflictError):
+            body.append({"status": 412, "message": str(result)})
+        elif isinstance(result, Task):
+            body.append({"status": success_status, "task": result.to_json()})
+        else:
+            body.append({"status": 204, "id": result})
+    failed = any(isinstance(result, Exception) for result in results)
+    return body, 207 if failed else success_status
 
-class Task:
-    def __init__(self, title=None, description=None, status=None):
-        self.id = None
-        self.title = title
-        self.description = description
-        self.status = status
-    def get_id(self):
-        return self.id
-    def get_title(self):
-        return self.title
-    def get_description(self):
-        return self.description
-    def get_status(self):
-        return self.status
-    def to_json(self):
-        return {"id": self.id, "title": self.title, "description":self.description, "status":self.status}
-    @staticmethod
-    def from_json(json_task):
-        return Task(json_task.get("title"), json_task.get("description"), json_task.get("status"))
 
 class TaskResource:
     def __init__(self, app, dao=None):
         self.app = app
-        if dao:
+        if dao is not None: # an empty DAO is falsy (__len__), so test identity instead
             self.dao = dao
         else:
             self.dao = InMemoryDAO()
         self.setup_endpoints()
+        self.setup_bulk_endpoints()
         self.setup_error_handlers()
+        self.setup_compression()
+
+    def wrap_dao(self, wrapper):
+        # Puts wrapper(dao) (a DelegatingTaskDAO) around the DAO. A CachingTaskDAO stays in front, so the cached
+        # GET paths keep working and the wrapper sees what actually reaches the store.
+        if isinstance(self.dao, CachingTaskDAO):
+            self.dao.dao = wrapper(self.dao.dao)
+        else:
+            self.dao = wrapper(self.dao)
 
     def setup_endpoints(self):
         @self.app.route('/tasks', methods=['GET'])
-        def get_tasks(): # provides list of all tasks in json format
-            tasks = self.dao.get_tasks() # gets list of task objects
-            list_tasks = [task.to_json() for task in tasks] # convert to list of jsons
-            return jsonify(list_tasks), 200 # return in a json format
+        def get_tasks(): # provides list of tasks in json format, optionally filtered, paginated or streamed
+            query = self._task_query() # filters, search and sort, pushed down into the DAO
+            limit = self._int_arg("limit", minimum=1)
+            stream = request.args.get("stream")
+            mimetype = request.accept_mimetypes.best_match(LIST_FORMATS + ["application/x-ndjson"], default=JSON)
+            if stream is None and mimetype == "application/x-ndjson":
+                stream = "ndjson"
+
+            if stream is not None: # constant memory: tasks are pulled from the DAO as the response is written
+                if stream not in ("ndjson", "json"):
+                    abort(400, description="stream must be 'ndjson' or 'json'")
+                tasks = islice(self.dao.iter_tasks(**query), limit)
+                if stream == "ndjson":
+                    return Response(stream_with_context(self._stream_ndjson(tasks)), 200, mimetype="application/x-ndjson")
+                return Response(stream_with_context(self._stream_json_array(tasks)), 200, mimetype="application/json")
+
+            if isinstance(self.dao, CachingTaskDAO) and mimetype == JSON: # serve pre-serialized bytes, 304 if the client's copy is current
+                cached = self.dao.get_tasks_body(limit=limit, **query)
+                response = self._cached_response(cached)
+                next_after_id = cached.next_after_id
+            else:
+                tasks = self.dao.get_tasks(limit=limit, **query) # gets list of task objects
+                response = Response(encode_tasks(tasks, mimetype), 200, mimetype=mimetype) # serialize to bytes, json unless Accept asks otherwise
+                next_after_id = next_cursor(tasks, limit, query["sort"])
+            response.vary.add("Accept")
+            if next_after_id is not None: # there may be more, point the client at the next page
+                next_args = dict(request.args, after_id=next_after_id)
+                response.headers["Link"] = f'<{url_for("get_tasks", **next_args)}>; rel="next"'
+            return response # return in a json format
+
+        @self.app.route('/tasks/stats', methods=['GET']) # counts by status, with the status/title/q filters of GET /tasks
+        def get_task_stats():
+            query = self._task_query()
+            stats = self.dao.status_counts(status=query["status"], title=query["title"], search=query["search"])
+            return Response(json.dumps(stats), 200, mimetype="application/json") # a task without a status counts under "null"
 
         @self.app.route('/tasks/<int:task_id>', methods=['GET'])  # get specific task
         def get_task(task_id):
+            mimetype = request.accept_mimetypes.best_match(TASK_FORMATS, default=JSON)
+            if isinstance(self.dao, CachingTaskDAO) and mimetype == JSON:
+                response = self._cached_response(self.dao.get_task_body(task_id))
+                response.vary.add("Accept")
+                return response
             task = self.dao.get_task(task_id) # provide ID to DAO, receive Task() object
             if task:
-                return jsonify(task.to_json()), 200 # convert to json and OK status code
+                response = self._task_response(task, 200, mimetype) # encode and OK status code
+                response.vary.add("Accept")
+                return response.make_conditional(request)
             else:
                 abort(404, description="Task not found")
 
@@ -62,19 +213,16 @@ class TaskResource:
             if 'title' not in request.json:  # title is required for creation of task
                 abort(400, description="Title is required")
 
-            new_task = Task(request.json["title"],request.json.get("description", ""), request.json.get("status", "")) # dissect and create Task()
+            new_task = Task(request.json["title"],request.json.get("description", ""), request.json.get("status", "Pending")) # dissect and create Task()
+            check_task_fields(new_task) # InvalidTaskError is a 400
             self.dao.create_task(new_task)
             # new_task = self.dao.create_task(request.json["title"],
             #                                 request.json.get("description", ""))  # Create task via DAO
 
-            return jsonify(new_task.to_json()), 201  # return json with CREATED
+            return self._task_response(new_task, 201)  # return json with CREATED
 
         @self.app.route('/tasks/<int:task_id>', methods=['PATCH'])  # Update task with specific task ID
-        def update_task(task_id):
-            task = self.dao.get_task(task_id) # check if task exists
-            if task is None:
-                abort(404, description="Task not found")
-
+        def update_task(task_id): # no read first: the DAO reports a missing task, and If-Match becomes a compare-and-set
             if request.content_type != 'application/json':
                 abort(415, description="Unsupported media type")
 
@@ -87,10 +235,104 @@ class TaskResource:
                 abort(400, description="Request body must contain JSON data")
 
             partial_task = Task.from_json(data) # create task object populated partially
+            check_task_fields(partial_task)
             partial_task.id = task_id # set ID of partial task
+            partial_task.version = parse_if_match(request.headers.get("If-Match"))
             updated_task = self.dao.update_task(partial_task) # send partial task data
 
-            return jsonify(updated_task.to_json()), 200
+            return self._task_response(updated_task, 200)
+
+    def setup_bulk_endpoints(self):
+        @self.app.route('/tasks/bulk', methods=['POST']) # create many tasks in one request
+        def create_tasks():
+            return self._bulk(parse_bulk_create, self.dao.create_tasks, 201)
+
+        @self.app.route('/tasks/bulk', methods=['PATCH']) # update many tasks, each item carries its id
+        def update_tasks():
+            return self._bulk(parse_bulk_update, self.dao.update_tasks, 200)
+
+        @self.app.route('/tasks/bulk', methods=['DELETE']) # delete many tasks by id
+        def delete_tasks():
+            return self._bulk(parse_bulk_delete, self.dao.delete_tasks, 200)
+
+    def _bulk(self, parse, dao_batch, success_status):
+        if request.content_type != 'application/json':
+            abort(415, description="Invalid request format")
+        try:
+            results, parsed = prepare_bulk(request.get_json(silent=True), parse)
+        except ValueError as error:
+            abort(400, description=str(error))
+        body, status = finish_bulk(results, parsed, dao_batch([item for _, item in parsed]), success_status)
+        return jsonify(body), status
+
+    @staticmethod
+    def _task_response(task, status, mimetype=JSON):
+        response = Response(encode_task(task, mimetype), status, mimetype=mimetype)
+        etag = task_etag(task)
+        if etag is not None:
+            response.set_etag(etag) # what If-Match on a later PATCH should send
+        return response
+
+    @staticmethod
+    def _cached_response(cached):
+        response = Response(cached.body, 200, mimetype="application/json")
+        response.set_etag(cached.etag)
+        return response.make_conditional(request) # turns into a bodiless 304 on an If-None-Match hit
+
+    def _task_query(self):
+        try:
+            return parse_task_query(request.args)
+        except ValueError as error:
+            abort(400, description=str(error))
+
+    @staticmethod
+    def _int_arg(name, minimum):
+        try:
+            return parse_int_arg(request.args, name, minimum)
+        except ValueError as error:
+            abort(400, description=str(error))
+
+    @staticmethod
+    def _stream_ndjson(tasks):
+        tasks = iter(tasks)
+        while True:
+            chunk = list(islice(tasks, STREAM_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield b"".join(task.to_json_bytes() + b"\n" for task in chunk)
+
+    @staticmethod
+    def _stream_json_array(tasks):
+        tasks = iter(tasks)
+        separator = b"["
+        while True:
+            chunk = list(islice(tasks, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield separator + b",".join(task.to_json_bytes() for task in chunk)
+            separator = b","
+        yield b"]" if separator == b"," else b"[]"
+
+    def setup_compression(self):
+        # Compresses list and bulk responses of at least COMPRESS_MIN_BYTES with the best encoding the client accepts.
+        # Their ETags turn weak, since the bytes now depend on the encoding; If-None-Match compares weakly, so 304s
+        # keep working. Single task responses are small and keep the strong ETag that If-Match needs.
+        @self.app.after_request
+        def compress_response(response):
+            if request.endpoint not in COMPRESSED_ENDPOINTS or response.status_code not in (200, 201, 207) \
+                    or response.is_streamed or "Content-Encoding" in response.headers:
+                return response
+            response.vary.add("Accept-Encoding")
+            encoding = request.accept_encodings.best_match(ENCODINGS)
+            body = response.get_data()
+            if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+                return response
+            response.set_data(compress(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+            etag, weak = response.get_etag()
+            if etag is not None and not weak:
+                response.set_etag(etag, weak=True)
+            return response
 
     def setup_error_handlers(self):
         @self.app.errorhandler(400)
@@ -110,3 +352,21 @@ class TaskResource:
             response = jsonify({"message": error.description})
             response.status_code = 415
             return response
+
+        @self.app.errorhandler(TaskNotFoundError) # DAOs raise instead of returning None
+        def handle_task_not_found(error):
+            response = jsonify({"message": str(error)})
+            response.status_code = 404
+            return response
+
+        @self.app.errorhandler(InvalidTaskError)
+        def handle_invalid_task(error):
+            response = jsonify({"message": str(error)})
+            response.status_code = 400
+            return response
+
+        @self.app.errorhandler(VersionConflictError) # If-Match no longer matches: re-read and retry
+        def handle_version_conflict(error):
+            response = jsonify({"message": str(error)})
+            response.status_code = 412
+            return response
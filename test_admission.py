@@ -0,0 +1,146 @@
+import threading
+import time
+import unittest
+from flask import Flask
+from admission import ConcurrencyLimiter, RateLimiter, install_admission
+from app import create_app
+from cached_task_dao import CachingTaskDAO
+from in_memory_task_dao import InMemoryDAO
+from metrics import install_metrics
+from task_dao import DelegatingTaskDAO
+from task_resource import TaskResource
+
+
+class GatedDAO(DelegatingTaskDAO):
+    # get_tasks holds its slot until the gate opens
+    def __init__(self, dao, gate):
+        super().__init__(dao)
+        self.gate = gate
+
+    def get_tasks(self, **query):
+        self.gate.wait()
+        return self.dao.get_tasks(**query)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=2.0, burst=3, route_limits={"create_tasks": (0.5, 1)})
+        self.assertEqual([limiter.acquire("a", now=0.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire("a", now=0.0), 0.5)
+        self.assertEqual(limiter.acquire("b", now=0.0), 0.0) # buckets are per client
+        self.assertEqual(limiter.acquire("a", now=0.5), 0.0) # refilled one token
+
+        self.assertEqual(limiter.acquire("c", "create_tasks", now=0.0), 0.0)
+        self.assertAlmostEqual(limiter.acquire("c", "create_tasks", now=0.0), 2.0)
+        self.assertEqual(limiter.buckets[("c", None)].tokens, 2.0) # a refused request takes no token at all
+
+    def test_forgets_least_recent_clients(self):
+        limiter = RateLimiter(rate=1.0, max_clients=2)
+        for client in ("a", "b", "a", "c"):
+            limiter.acquire(client, now=0.0)
+        self.assertEqual(list(limiter.buckets), [("a", None), ("c", None)])
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_queue_budget(self):
+        limiter = ConcurrencyLimiter(1, max_queue_time=0.05, max_waiting=1)
+        self.assertIsNone(limiter.acquire())
+        started = time.monotonic()
+        self.assertEqual(limiter.acquire(), "timeout")
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+        waiter = threading.Thread(target=limiter.acquire)
+        waiter.start()
+        while not limiter.waiting:
+            time.sleep(0.001)
+        self.assertEqual(limiter.acquire(), "queue_full")
+        limiter.release() # hands the slot to the waiter
+        waiter.join()
+        self.assertEqual((limiter.in_flight, limiter.waiting), (1, 0))
+
+
+class TestAdmission(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_rate_limited_requests_get_429(self):
+        resource = TaskResource(self.app, InMemoryDAO())
+        controller = install_admission(self.app, resource, rate=0.01, burst=2)
+        client = self.app.test_client()
+        self.assertEqual([client.get('/tasks').status_code for _ in range(3)], [200, 200, 429])
+        response = client.get('/tasks')
+        self.assertEqual(int(response.headers["Retry-After"]), 100)
+        self.assertEqual(response.get_json()["message"], "Too many requests")
+        other = self.app.test_client()
+        self.assertEqual(other.get('/tasks', environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code, 200)
+        self.assertEqual(controller.stats()["rate_limited"], 2)
+
+    def test_cache_hits_take_no_slot(self):
+        resource = TaskResource(self.app, CachingTaskDAO(InMemoryDAO()))
+        controller = install_admission(self.app, resource, max_in_flight=1)
+        self.assertIsInstance(resource.dao, CachingTaskDAO)
+        client = self.app.test_client()
+        client.post('/tasks', json={"title": "Task"})
+        client.get('/tasks/1') # fills the cache
+        controller.concurrency.in_flight = 1 # pretend the DAO is busy
+        self.assertEqual(client.get('/tasks/1').status_code, 200)
+        self.assertEqual(client.get('/tasks/2').status_code, 503)
+        controller.concurrency.in_flight = 0
+
+    def test_overload_keeps_goodput(self):
+        # The DAO is held on a gate instead of timed, so the outcome does not depend on how fast the machine is:
+        # admitted requests all succeed, the excess beyond slots + queue is shed at once, and a queued request that
+        # outlives its budget is shed rather than served late.
+        gate = threading.Event()
+        resource = TaskResource(self.app, GatedDAO(InMemoryDAO(), gate))
+        registry = install_metrics(self.app, resource)
+        controller = install_admission(self.app, resource, max_in_flight=2, max_queue_time=30, max_waiting=2, registry=registry)
+        concurrency = controller.concurrency
+        statuses = []
+
+        def request():
+            statuses.append(self.app.test_client().get('/tasks').status_code)
+
+        def wait_for(condition):
+            deadline = time.monotonic() + 10
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.001)
+            self.assertTrue(condition())
+
+        admitted = [threading.Thread(target=request) for _ in range(4)]
+        for count, thread in enumerate(admitted, 1):
+            thread.start()
+            wait_for(lambda: concurrency.in_flight + concurrency.waiting == count) # 2 in the DAO, then 2 queued
+        self.assertEqual((concurrency.in_flight, concurrency.waiting), (2, 2))
+        request() # slots and queue are full: shed without waiting for the gate
+        self.assertEqual(statuses, [503])
+        gate.set()
+        for thread in admitted:
+            thread.join()
+        self.assertEqual(sorted(statuses), [200] * 4 + [503])
+
+        gate.clear()
+        concurrency.max_queue_time = 0.01
+        holders = [threading.Thread(target=request) for _ in range(2)]
+        for thread in holders:
+            thread.start()
+        wait_for(lambda: concurrency.in_flight == 2)
+        request() # queued, then shed once its budget runs out
+        gate.set()
+        for thread in holders:
+            thread.join()
+        self.assertEqual(sorted(statuses), [200] * 6 + [503] * 2)
+
+        stats = controller.stats()
+        self.assertEqual((stats["shed_queue_full"], stats["shed_timeout"]), (1, 1))
+        self.assertEqual((stats["in_flight"], stats["waiting"]), (0, 0))
+        self.assertIn("taskmanager_admission_shed_timeout_total", self.app.test_client().get('/metrics').get_data(as_text=True))
+
+    def test_create_app_config(self):
+        client = create_app({"TASK_RATE_LIMIT": 0.01, "TASK_RATE_BURST": 1, "TASK_MAX_IN_FLIGHT": 4}).test_client()
+        self.assertEqual(client.post('/tasks', json={"title": "Task"}).status_code, 201)
+        self.assertEqual(client.get('/tasks/1').status_code, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,22 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from flask import Flask
 from in_memory_task_dao import InMemoryDAO
 from db_task_dao import db, DBTaskDAO, DBTask
 from task_resource import TaskResource
+from app import create_app
+from cached_task_dao import CachingTaskDAO
 from abc import ABC
 
 
 class TaskManagerBaseTestCase(unittest.TestCase):
     dao_class = None  # Default DAO class
+    cached = False  # wrap the DAO in CachingTaskDAO
 
     def setUp(self):
         if self.dao_class is None:
@@ -26,6 +35,8 @@ class TaskManagerBaseTestCase(unittest.TestCase):
                 db.session.commit()
         elif self.dao_class == InMemoryDAO:
             self.dao = InMemoryDAO()
+        if self.cached:
+            self.dao = CachingTaskDAO(self.dao)
 
         self.resource = TaskResource(self.app, self.dao)
 
@@ -49,30 +60,145 @@ class TaskManagerBaseTestCase(unittest.TestCase):
         self.assertEqual(data["description"], "")
         self.assertEqual(data["status"], "Pending")
 
-    # def test_get_task(self):
-    #     self.client.post('/tasks', json={"title": "Existing Task"})
-    #     response = self.client.get('/tasks/1')
-    #     self.assertEqual(response.status_code, 200)
-    #     self.assertEqual(response.get_json()["title"], "Existing Task")
-    #
-    # def test_update_task(self):
-    #     self.client.post('/tasks', json={"title": "Task to Update"})
-    #     response = self.client.patch('/tasks/1', json={"title": "Updated Task", "status": "Completed"})
-    #     self.assertEqual(response.status_code, 200)
-    #     data = response.get_json()
-    #     self.assertEqual(data["title"], "Updated Task")
-    #     self.assertEqual(data["status"], "Completed")
-    #
-    # def test_delete_task(self):
-    #     self.client.post('/tasks', json={"title": "Task to Delete"})
-    #     response = self.client.delete('/tasks/1')
-    #     self.assertEqual(response.status_code, 204)
-    #     get_response = self.client.get('/tasks/1')
-    #     self.assertEqual(get_response.status_code, 404)
-
-# class TestInMemoryDAO(TaskManagerBaseTestCase):
-#     dao_class = InMemoryDAO
+    def test_get_task(self):
+        self.client.post('/tasks', json={"title": "Existing Task"})
+        response = self.client.get('/tasks/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["title"], "Existing Task")
+
+    def test_update_task(self):
+        self.client.post('/tasks', json={"title": "Task to Update"})
+        response = self.client.patch('/tasks/1', json={"title": "Updated Task", "status": "Completed"})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["title"], "Updated Task")
+        self.assertEqual(data["status"], "Completed")
+
+    def test_task_stats(self):
+        self.client.post('/tasks/bulk', json=[{"title": "Write report"}, {"title": "Review report", "status": "Done"},
+                                              {"title": "Plan sprint"}])
+        with self.app.app_context():
+            self.assertEqual(self.client.get('/tasks/stats').get_json(), {"total": 3, "by_status": {"Pending": 2, "Done": 1}})
+            self.assertEqual(self.client.get('/tasks/stats?status=Pending&title=report').get_json(),
+                             {"total": 1, "by_status": {"Pending": 1}})
+            self.assertEqual(self.client.get('/tasks/stats?q=sprint').get_json()["total"], 1)
+
+    def test_conditional_update(self):
+        etag = self.client.post('/tasks', json={"title": "Versioned Task"}).headers["ETag"]
+        self.assertEqual(self.client.get('/tasks/1').headers["ETag"], etag)
+        response = self.client.patch('/tasks/1', json={"status": "Completed"}, headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.client.get('/tasks/1').headers["ETag"], response.headers["ETag"])
+
+        stale = self.client.patch('/tasks/1', json={"status": "Pending"}, headers={"If-Match": etag})
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(self.client.get('/tasks/1').get_json()["status"], "Completed")
+        self.assertEqual(self.client.patch('/tasks/1', json={"title": "Any"}, headers={"If-Match": "*"}).status_code, 200)
+        self.assertEqual(self.client.patch('/tasks/99', json={"title": "Missing"}, headers={"If-Match": etag}).status_code, 404)
+
+        response = self.client.patch('/tasks/bulk', json=[{"id": 1, "status": "Done", "version": 1}])
+        self.assertEqual([r["status"] for r in response.get_json()], [412])
+
+    def test_delete_task(self):
+        self.client.post('/tasks', json={"title": "Task to Delete"})
+        response = self.client.delete('/tasks/1')
+        self.assertEqual(response.status_code, 204)
+        get_response = self.client.get('/tasks/1')
+        self.assertEqual(get_response.status_code, 404)
+
+    def test_get_tasks_paginated(self):
+        for i in range(5):
+            self.client.post('/tasks', json={"title": f"Task {i}"})
+        response = self.client.get('/tasks?limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t["id"] for t in response.get_json()], [1, 2])
+        self.assertIn("after_id=2", response.headers["Link"])
+
+        response = self.client.get('/tasks?limit=2&after_id=4')
+        self.assertEqual([t["id"] for t in response.get_json()], [5])
+        self.assertNotIn("Link", response.headers)
+
+        self.assertEqual(self.client.get('/tasks?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/tasks?after_id=abc').status_code, 400)
+
+    def test_get_tasks_streamed(self):
+        for i in range(3):
+            self.client.post('/tasks', json={"title": f"Task {i}"})
+        response = self.client.get('/tasks?stream=ndjson&after_id=1')
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [2, 3])
+
+        response = self.client.get('/tasks', headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+
+        response = self.client.get('/tasks?stream=json')
+        self.assertEqual([t["id"] for t in json.loads(response.get_data(as_text=True))], [1, 2, 3])
+        response = self.client.get('/tasks?stream=json&status=Completed')
+        self.assertEqual(json.loads(response.get_data(as_text=True)), [])
+
+    def test_get_tasks_filtered_and_sorted(self):
+        self.client.post('/tasks', json={"title": "Write report", "description": "finance numbers"})
+        self.client.post('/tasks', json={"title": "Review report", "status": "Done"})
+        self.client.post('/tasks', json={"title": "Plan offsite", "description": "numbers"})
 
+        self.assertEqual([t["id"] for t in self.client.get('/tasks?title=report').get_json()], [1, 2])
+        self.assertEqual([t["id"] for t in self.client.get('/tasks?q=numbers&sort=-id').get_json()], [3, 1])
+        self.assertEqual([t["id"] for t in self.client.get('/tasks?status=Pending&sort=title').get_json()], [3, 1])
+        response = self.client.get('/tasks?sort=-id&limit=2')
+        self.assertIn("after_id=2", response.headers["Link"])
+        self.assertEqual([t["id"] for t in self.client.get('/tasks?sort=-id&after_id=2').get_json()], [1])
+
+        self.assertEqual(self.client.get('/tasks?sort=assignee').status_code, 400)
+        self.assertEqual(self.client.get('/tasks?sort=title&after_id=1').status_code, 400)
+
+    def test_bulk_create_update_delete(self):
+        response = self.client.post('/tasks/bulk', json=[{"title": "Task 1"}, {"description": "no title"}, {"title": "Task 2"}])
+        self.assertEqual(response.status_code, 207)
+        results = response.get_json()
+        self.assertEqual([r["status"] for r in results], [201, 400, 201])
+        self.assertEqual([results[0]["task"]["id"], results[2]["task"]["id"]], [1, 2])
+
+        response = self.client.patch('/tasks/bulk', json=[{"id": 1, "status": "Completed"}, {"id": 2, "title": "Renamed"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/tasks/1').get_json()["status"], "Completed")
+        self.assertEqual(self.client.get('/tasks/2').get_json()["title"], "Renamed")
+
+        response = self.client.patch('/tasks/bulk', json=[{"id": True, "status": "Blocked"}, {"id": 2, "version": False, "status": "Blocked"}])
+        self.assertEqual([r["status"] for r in response.get_json()], [400, 400]) # booleans are not ids or versions
+        self.assertEqual(self.client.get('/tasks/1').get_json()["status"], "Completed")
+        self.assertEqual([r["status"] for r in self.client.delete('/tasks/bulk', json=[True]).get_json()], [400])
+
+        response = self.client.delete('/tasks/bulk', json=[1, 99, 1])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r["status"] for r in response.get_json()], [204, 404, 404])
+        self.assertEqual([t["id"] for t in self.client.get('/tasks').get_json()], [2])
+
+        self.assertEqual(self.client.post('/tasks/bulk', json={"title": "not a list"}).status_code, 400)
+
+class TestInMemoryDAO(TaskManagerBaseTestCase):
+    dao_class = InMemoryDAO
+
+
+class TestCachedInMemoryDAO(TaskManagerBaseTestCase):
+    dao_class = InMemoryDAO
+    cached = True
+
+    def test_etag_and_invalidation(self):
+        self.client.post('/tasks', json={"title": "Cached Task"})
+        response = self.client.get('/tasks/1')
+        etag = response.headers["ETag"]
+        self.assertEqual(self.client.get('/tasks/1', headers={"If-None-Match": etag}).status_code, 304)
+        list_etag = self.client.get('/tasks').headers["ETag"]
+        self.assertEqual(self.client.get('/tasks', headers={"If-None-Match": list_etag}).status_code, 304)
+
+        self.client.patch('/tasks/1', json={"status": "Completed"})
+        response = self.client.get('/tasks/1', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "Completed")
+        self.assertEqual(self.client.get('/tasks', headers={"If-None-Match": list_etag}).status_code, 200)
+        self.assertGreater(self.dao.stats()["tasks"]["hits"], 0)
 
 class TestDBTaskDAO(TaskManagerBaseTestCase):
      dao_class = DBTaskDAO
@@ -87,6 +213,58 @@ class TestDBTaskDAO(TaskManagerBaseTestCase):
 #             self.dao = self.dao_class(db)
 #             print("3")
 
+class TestCreateApp(unittest.TestCase):
+    def test_backends(self):
+        data_dir = tempfile.mkdtemp()
+        for config in ({}, {"TASK_CACHE": True}, {"TASK_BACKEND": "wal", "TASK_DATA_DIR": data_dir},
+                       {"TASK_BACKEND": "db", "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"},
+                       {"TASK_BACKEND": "tiered", "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(data_dir, 'tasks.db')}"},
+                       {"TASK_BACKEND": "sharded", "TASK_DATA_DIR": os.path.join(data_dir, "shards"), "TASK_SHARDS": 2}):
+            client = create_app(config).test_client()
+            self.assertEqual(client.post('/tasks', json={"title": "Task"}).status_code, 201, config)
+            self.assertEqual(client.get('/tasks/1').get_json()["title"], "Task")
+        with self.assertRaises(ValueError):
+            create_app({"TASK_BACKEND": "nosql"})
+        for backend, option in (("db", "TASK_GROUP_COMMIT"), ("tiered", None)): # writer threads need a file database
+            with self.assertRaises(ValueError):
+                create_app({"TASK_BACKEND": backend, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", **({option: True} if option else {})})
+
+    def test_non_string_fields_rejected(self):
+        """Test every backend answers non-string title/description/status with the same 400."""
+        data_dir = tempfile.mkdtemp()
+        configs = [{}, {"TASK_BACKEND": "wal", "TASK_DATA_DIR": os.path.join(data_dir, "wal")},
+                   {"TASK_BACKEND": "db", "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"},
+                   {"TASK_BACKEND": "tiered", "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(data_dir, 'tasks.db')}"},
+                   {"TASK_BACKEND": "sharded", "TASK_DATA_DIR": os.path.join(data_dir, "shards"), "TASK_SHARDS": 2}]
+        if importlib.util.find_spec("numpy") is not None:
+            configs.append({"TASK_BACKEND": "columnar"})
+        for config in configs:
+            client = create_app(config).test_client()
+            for body in ({"title": 123}, {"title": "Task", "description": 1.5}, {"title": "Task", "status": ["Done"]}):
+                response = client.post('/tasks', json=body)
+                self.assertEqual(response.status_code, 400, (config, body))
+                self.assertIn("must be a string", response.get_json()["message"])
+            self.assertEqual(client.post('/tasks', json={"title": "Task"}).status_code, 201, config)
+            self.assertEqual(client.patch('/tasks/1', json={"status": 5}).status_code, 400, config)
+            response = client.post('/tasks/bulk', json=[{"title": "Task"}, {"title": True}])
+            self.assertEqual([item["status"] for item in response.get_json()], [201, 400], config)
+            response = client.patch('/tasks/bulk', json=[{"id": 1, "status": "Done"}, {"id": 2, "description": {}}])
+            self.assertEqual([item["status"] for item in response.get_json()], [200, 400], config)
+            self.assertEqual(client.get('/tasks/1').get_json()["status"], "Done", config)
+
+    def test_columnar_backend(self):
+        try:
+            client = create_app({"TASK_BACKEND": "columnar"}).test_client()
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        client.post('/tasks/bulk', json=[{"title": "Task", "status": status} for status in ("Pending", "Done", "Done")])
+        self.assertEqual(client.get('/tasks/stats').get_json(), {"total": 3, "by_status": {"Pending": 1, "Done": 2}})
+
+    def test_in_memory_app_does_not_import_sqlalchemy(self):
+        output = subprocess.run([sys.executable, "-c", "import sys, app; print('sqlalchemy' in sys.modules)"],
+                                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(output.stdout.strip(), "False")
+
 #
 if __name__ == '__main__':
     # unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import urlsplit
+from asgi_app import create_asgi_app
+from async_task_dao import AsyncInMemoryDAO
+
+try:
+    import aiosqlite
+    from async_db_task_dao import AsyncDBTaskDAO
+except ImportError: # optional: the async DB backend needs aiosqlite
+    aiosqlite = None
+
+
+def call(app, method, url, body=None, headers=None):
+    # Drives one request through the ASGI app, returns (status, headers, body bytes)
+    parts = urlsplit(url)
+    raw_body = b"" if body is None else json.dumps(body).encode()
+    raw_headers = [(b"content-type", b"application/json")] if body is not None else []
+    raw_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    scope = {"type": "http", "method": method, "path": parts.path, "query_string": parts.query.encode(), "headers": raw_headers}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw_body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+class AsgiAppBaseTestCase(unittest.TestCase):
+    def make_dao(self):
+        return None
+
+    def setUp(self):
+        dao = self.make_dao()
+        if dao is None:
+            self.skipTest("Base class: make_dao not defined")
+        self.app = create_asgi_app(dao)
+
+    def test_create_get_update_delete(self):
+        status, _, body = call(self.app, "POST", "/tasks", {"title": "New Task"})
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(body)["status"], "Pending")
+        status, _, body = call(self.app, "PATCH", "/tasks/1", {"status": "Completed"})
+        self.assertEqual(json.loads(body)["status"], "Completed")
+        self.assertEqual(json.loads(call(self.app, "GET", "/tasks/1")[2])["title"], "New Task")
+        etag = call(self.app, "GET", "/tasks/1")[1]["etag"]
+        self.assertEqual(call(self.app, "PATCH", "/tasks/1", {"title": "Renamed"}, {"If-Match": etag})[0], 200)
+        self.assertEqual(call(self.app, "PATCH", "/tasks/1", {"title": "Stale"}, {"If-Match": etag})[0], 412)
+        self.assertEqual(call(self.app, "DELETE", "/tasks/1")[0], 204)
+        status, _, body = call(self.app, "GET", "/tasks/1")
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body), {"message": "Task with ID 1 not found"})
+
+    def test_error_contract(self):
+        self.assertEqual(call(self.app, "POST", "/tasks", {"description": "no title"})[0], 400)
+        self.assertEqual(call(self.app, "GET", "/tasks?limit=0")[0], 400)
+        self.assertEqual(call(self.app, "POST", "/tasks", {"title": 123})[0], 400)
+        self.assertEqual(call(self.app, "POST", "/tasks", {"title": "Task", "status": 5})[0], 400)
+        status, headers, _ = call(self.app, "PUT", "/tasks")
+        self.assertEqual((status, headers["allow"]), (405, "GET, POST"))
+        self.assertEqual(call(self.app, "GET", "/tasks/bulk")[1]["allow"], "DELETE, PATCH, POST")
+        self.assertEqual(call(self.app, "GET", "/unknown")[0], 404)
+
+    def test_list_paginate_stream_and_bulk(self):
+        status, _, body = call(self.app, "POST", "/tasks/bulk", [{"title": f"Task {i}"} for i in range(5)] + [{}])
+        self.assertEqual(status, 207)
+        self.assertEqual([r["status"] for r in json.loads(body)], [201] * 5 + [400])
+
+        status, headers, body = call(self.app, "GET", "/tasks?limit=2&after_id=1")
+        self.assertEqual([t["id"] for t in json.loads(body)], [2, 3])
+        self.assertIn("after_id=3", headers["link"])
+
+        _, headers, body = call(self.app, "GET", "/tasks?stream=ndjson&limit=4")
+        self.assertEqual(headers["content-type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line)["id"] for line in body.splitlines()], [1, 2, 3, 4])
+
+    def test_stream_json_array(self):
+        call(self.app, "POST", "/tasks/bulk", [{"title": f"Task {i}"} for i in range(5)])
+        with mock.patch("asgi_app.STREAM_CHUNK_SIZE", 2): # the array spans several body messages
+            _, headers, body = call(self.app, "GET", "/tasks?stream=json")
+            self.assertEqual(headers["content-type"], "application/json")
+            self.assertEqual([t["id"] for t in json.loads(body)], [1, 2, 3, 4, 5])
+            self.assertEqual([t["id"] for t in json.loads(call(self.app, "GET", "/tasks?stream=json&limit=4")[2])], [1, 2, 3, 4])
+        self.assertEqual(json.loads(call(self.app, "GET", "/tasks?stream=json&status=Archived")[2]), [])
+        status, _, body = call(self.app, "GET", "/tasks?stream=csv")
+        self.assertEqual((status, json.loads(body)["message"]), (400, "stream must be 'ndjson' or 'json'"))
+
+
+class TestAsyncInMemoryDAO(AsgiAppBaseTestCase):
+    def make_dao(self):
+        return AsyncInMemoryDAO()
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncDBTaskDAO(AsgiAppBaseTestCase):
+    def make_dao(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "tasks.db")
+        dao = AsyncDBTaskDAO(f"sqlite+aiosqlite:///{self.path}")
+        asyncio.run(dao.create_all())
+        return dao
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from cached_task_dao import ResponseCache, CachingTaskDAO
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+from errors import TaskNotFoundError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put(1, b"one")
+        cache.put(2, b"two")
+        cache.get(1) # 2 is now least recently used
+        cache.put(3, b"three")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1).body, b"one")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = ResponseCache(ttl=10, clock=clock)
+        cache.put(1, b"one")
+        clock.now = 5
+        self.assertIsNotNone(cache.get(1))
+        clock.now = 11
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_put_after_invalidation_is_not_stored(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.invalidate([1]) # a write lands while the reader is loading
+        self.assertEqual(cache.put(1, b"stale", generation=generation).body, b"stale")
+        self.assertIsNone(cache.get(1))
+
+
+class TestCachingTaskDAO(unittest.TestCase):
+    def setUp(self):
+        self.dao = CachingTaskDAO(InMemoryDAO())
+
+    def test_write_invalidation(self):
+        task_1 = self.dao.create_task(Task("Task 1", "", "Pending"))
+        task_2 = self.dao.create_task(Task("Task 2", "", "Pending"))
+        body_1 = self.dao.get_task_body(task_1.get_id())
+        body_2 = self.dao.get_task_body(task_2.get_id())
+        list_body = self.dao.get_tasks_body()
+
+        partial_task = Task(status="Done")
+        partial_task.id = task_1.get_id()
+        self.dao.update_task(partial_task)
+        self.assertNotEqual(self.dao.get_task_body(task_1.get_id()).etag, body_1.etag)
+        self.assertIs(self.dao.get_task_body(task_2.get_id()), body_2) # untouched task stays cached
+        self.assertNotEqual(self.dao.get_tasks_body().etag, list_body.etag)
+
+        self.dao.delete_task(task_2.get_id())
+        with self.assertRaises(TaskNotFoundError):
+            self.dao.get_task_body(task_2.get_id())
+
+    def test_list_page_cursor(self):
+        for i in range(3):
+            self.dao.create_task(Task(f"Task {i}", "", "Pending"))
+        self.assertEqual(self.dao.get_tasks_body(limit=2).next_after_id, 2)
+        self.assertIsNone(self.dao.get_tasks_body(limit=2, after_id=2).next_after_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+from flask import Flask
+from cached_task_dao import CachingTaskDAO
+from change_feed import ChangeFeed, install_change_feed
+from in_memory_task_dao import InMemoryDAO
+from task_resource import TaskResource
+
+
+class TestChangeFeed(unittest.TestCase):
+    def test_since_and_eviction(self):
+        feed = ChangeFeed(max_changes=3)
+        self.assertEqual(feed.since(0), [])
+        for task_id in range(1, 6):
+            feed.publish("delete", task_id)
+        self.assertEqual([c.seq for c in feed.since(2)], [3, 4, 5])
+        self.assertEqual([c.seq for c in feed.since(3, limit=1)], [4])
+        self.assertEqual(feed.since(5), [])
+        self.assertIsNone(feed.since(1)) # seq 2 was evicted
+        self.assertIsNone(feed.since(9)) # cursor from a previous process
+
+    def test_wait(self):
+        feed = ChangeFeed()
+        self.assertFalse(feed.wait(0, timeout=0.01))
+        feed.publish("delete", 1)
+        self.assertTrue(feed.wait(0, timeout=0.01))
+
+
+class TestChangeFeedEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.resource = TaskResource(self.app, CachingTaskDAO(InMemoryDAO()))
+        self.feed = install_change_feed(self.app, self.resource, max_changes=4)
+        self.client = self.app.test_client()
+
+    def test_deltas(self):
+        self.client.post('/tasks', json={"title": "Task"})
+        self.client.patch('/tasks/1', json={"status": "Completed"})
+        self.client.post('/tasks/bulk', json=[{"title": "Bulk"}, {"description": "no title"}])
+        self.client.delete('/tasks/1')
+        self.assertIsInstance(self.resource.dao, CachingTaskDAO) # the cache stays in front
+
+        body = self.client.get('/tasks/changes?since=0').get_json()
+        self.assertEqual([(c["seq"], c["op"], c["id"]) for c in body["changes"]],
+                         [(1, "create", 1), (2, "update", 1), (3, "create", 2), (4, "delete", 1)])
+        self.assertEqual((body["changes"][1]["version"], body["changes"][1]["task"]["status"]), (2, "Completed"))
+        self.assertIsNone(body["changes"][3]["task"])
+        self.assertEqual(body["next"], 4)
+        self.assertEqual(self.client.get('/tasks/changes?since=4').get_json(), {"changes": [], "next": 4})
+        self.assertEqual(self.client.get('/tasks/changes?since=1&limit=1').get_json()["next"], 2)
+        self.assertEqual(self.client.get('/tasks/changes?since=-1').status_code, 400)
+
+    def test_resync_when_cursor_is_too_old(self):
+        for i in range(6):
+            self.client.post('/tasks', json={"title": f"Task {i}"})
+        body = self.client.get('/tasks/changes?since=1').get_json()
+        self.assertTrue(body["resync"])
+        self.assertEqual(body["next"], 6)
+        self.assertEqual(len(body["tasks"]), 6)
+
+    def test_event_stream(self):
+        self.client.post('/tasks', json={"title": "Task"})
+        self.client.patch('/tasks/1', json={"title": "Renamed"})
+        response = self.client.get('/tasks/changes/stream', headers={"Last-Event-ID": "1"}, buffered=False)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = next(response.response).decode()
+        response.close()
+        self.assertTrue(events.startswith("id: 2\nevent: update\ndata: "))
+        self.assertEqual(json.loads(events.split("data: ", 1)[1])["task"]["title"], "Renamed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
+import os
+import tempfile
+import threading
 import unittest
+from concurrent.futures import Future
 from flask import Flask
-from db_task_dao import db, DBTaskDAO, DBTask
-from task_resource import Task
-from errors import *
+from db_task_dao import db, DBTaskDAO, DBTask, GroupCommitWriter, init_db, READ_ONLY_BIND
+from task import Task
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+from sqlalchemy import event, text
 
 # Setup Flask application and database
 app = Flask(__name__)
@@ -72,6 +77,41 @@ class TestDBTaskDAO(unittest.TestCase):
             self.assertEqual(updated_task.get_title(), "New Task")
             self.assertEqual(updated_task.get_status(), "Completed")
 
+    def test_update_is_one_statement(self):
+        """Test update_task is a single UPDATE ... RETURNING that bumps and checks the version."""
+        with app.app_context():
+            created_task = self.dao.create_task(Task("Versioned", "", "Pending"))
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                partial_task = Task(status="Completed")
+                partial_task.id = created_task.get_id()
+                partial_task.version = 1
+                updated_task = self.dao.update_task(partial_task)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+            self.assertEqual(len(statements), 1)
+            self.assertTrue(statements[0].startswith("UPDATE tasks"))
+            self.assertEqual((updated_task.get_status(), updated_task.version), ("Completed", 2))
+            with self.assertRaises(VersionConflictError):
+                self.dao.update_task(partial_task)
+            partial_task.id = 999
+            with self.assertRaises(TaskNotFoundError):
+                self.dao.update_task(partial_task)
+
+    def test_ids_are_not_reused(self):
+        """Test a task created after the newest one was deleted gets a new id, so old ETags cannot match it."""
+        with app.app_context():
+            task_id = self.dao.create_task(Task("First", "", "Pending")).get_id()
+            self.dao.delete_task(task_id)
+            task = self.dao.create_task(Task("Second", "", "Pending"))
+            self.assertGreater(task.get_id(), task_id)
+            stale = Task(status="Done")
+            stale.id, stale.version = task_id, 1
+            with self.assertRaises(TaskNotFoundError):
+                self.dao.update_task(stale)
+
     def test_delete_task(self):
         """Test deleting a task by ID."""
         task = Task("Delete Task", "Description", "Pending")
@@ -82,5 +122,195 @@ class TestDBTaskDAO(unittest.TestCase):
             with self.assertRaises(TaskNotFoundError):
                 self.dao.get_task(created_task.get_id())
 
+    def test_get_tasks_paginated(self):
+        """Test keyset pagination and streaming over tasks."""
+        with app.app_context():
+            ids = [self.dao.create_task(Task(f"Task {i}", "", "Pending" if i % 2 else "Done")).get_id() for i in range(5)]
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2)], ids[:2])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2, after_id=ids[1])], ids[2:4])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Pending", after_id=ids[0])], [ids[1], ids[3]])
+            self.assertEqual([t.get_id() for t in self.dao.iter_tasks(batch_size=2)], ids)
+
+    def test_bulk_operations(self):
+        """Test batch create/update/delete with per-item errors."""
+        with app.app_context():
+            results = self.dao.create_tasks([Task("Task 1", "", "Pending"), Task(), Task("Task 2", "", "Pending")])
+            self.assertIsInstance(results[1], InvalidTaskError)
+            ids = [results[0].get_id(), results[2].get_id()]
+            self.assertEqual(len(self.dao.get_tasks()), 2)
+
+            partial_task = Task(status="Done")
+            partial_task.id = ids[1]
+            missing_task = Task(status="Done")
+            missing_task.id = 999
+            results = self.dao.update_tasks([partial_task, missing_task])
+            self.assertEqual(results[0].get_title(), "Task 2")
+            self.assertEqual(results[0].get_status(), "Done")
+            self.assertIsInstance(results[1], TaskNotFoundError)
+            self.assertEqual(self.dao.get_task(ids[1]).get_status(), "Done")
+
+            results = self.dao.delete_tasks([ids[0], 999])
+            self.assertIs(results[0], True)
+            self.assertIsInstance(results[1], TaskNotFoundError)
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks()], [ids[1]])
+
+    def test_bulk_update_races_another_writer(self):
+        """Test a bulk update never overwrites a write made after it read the rows."""
+        with app.app_context():
+            ids = [task.get_id() for task in self.dao.create_tasks([Task("Task 1"), Task("Task 2"), Task("Task 3")])]
+            read = self.dao._select_in
+
+            def read_then_concurrent_write(columns, task_ids):
+                rows = list(read(columns, task_ids))
+                db.session.execute(text("UPDATE tasks SET description = 'other writer', version = version + 1 WHERE id != :id"),
+                                   {"id": ids[2]})
+                db.session.commit()
+                return rows
+            self.dao._select_in = read_then_concurrent_write
+            partial_tasks = [Task(status="Done") for _ in ids]
+            for partial_task, task_id in zip(partial_tasks, ids):
+                partial_task.id = task_id
+            partial_tasks[1].version = 1 # If-Match the version it had when read
+            results = self.dao.update_tasks(partial_tasks)
+            del self.dao._select_in
+
+            self.assertEqual((results[0].get_description(), results[0].get_status(), results[0].version), ("other writer", "Done", 3))
+            self.assertIsInstance(results[1], VersionConflictError)
+            self.assertEqual((results[2].get_status(), results[2].version), ("Done", 2))
+            stored = {task.get_id(): (task.get_description(), task.get_status(), task.version) for task in self.dao.get_tasks()}
+            self.assertEqual(stored, {ids[0]: ("other writer", "Done", 3), ids[1]: ("other writer", "Pending", 2),
+                                      ids[2]: ("", "Done", 2)})
+
+    def test_filter_search_and_sort(self):
+        """Test status/title filters, FTS5 search and sorting."""
+        with app.app_context():
+            id_1 = self.dao.create_task(Task("Write report", "quarterly numbers for finance", "Pending")).get_id()
+            id_2 = self.dao.create_task(Task("Review 100% report", "finance review", "Done")).get_id()
+            id_3 = self.dao.create_task(Task("Plan offsite", "venue and numbers", "Pending")).get_id()
+
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(title="report")], [id_1, id_2])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(title="100%")], [id_2])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="Numbers finance")], [id_1])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="numbers", status="Pending", sort="-id")], [id_3, id_1])
+            self.assertEqual([t.get_title() for t in self.dao.get_tasks(sort="-title")], ["Write report", "Review 100% report", "Plan offsite"])
+
+            # Triggers keep the FTS table in step with single and bulk writes
+            partial_task = Task(description="nothing relevant")
+            partial_task.id = id_2
+            self.dao.update_tasks([partial_task])
+            self.dao.delete_task(id_1)
+            self.assertEqual(self.dao.get_tasks(search="finance"), [])
+            self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="relevant")], [id_2])
+
+class TestEngineProfile(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "tasks.db")
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{self.path}"
+        init_db(self.app, db, {"pool_size": 4, "read_only_uri": f"sqlite:///file:{self.path}?mode=ro&uri=true"})
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+    def test_pragmas_and_pool(self):
+        """Test WAL, synchronous=NORMAL and busy_timeout are set on new connections."""
+        with self.app.app_context():
+            self.assertEqual(db.session.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(db.session.execute(text("PRAGMA synchronous")).scalar(), 1) # NORMAL
+            self.assertEqual(db.session.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+            self.assertEqual(db.engine.pool.size(), 4)
+
+    def test_read_only_pool(self):
+        """Test reads go through the read-only bind while writes use the primary."""
+        with self.app.app_context():
+            dao = DBTaskDAO(db, read_bind=READ_ONLY_BIND)
+            created = dao.create_task(Task("Replica Task", "", "Pending"))
+            self.assertEqual(dao.get_task(created.get_id()).get_title(), "Replica Task")
+            self.assertEqual([t.get_id() for t in dao.get_tasks()], [created.get_id()])
+            with db.engines[READ_ONLY_BIND].connect() as connection:
+                self.assertEqual(connection.execute(text("PRAGMA query_only")).scalar(), 1)
+
+class TestGroupCommit(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tasks.db')}"
+        init_db(self.app, db)
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+        self.writer = GroupCommitWriter(self.app, db, max_delay=0.01, max_batch=8)
+        self.dao = DBTaskDAO(db, group_commit=self.writer)
+
+    def tearDown(self):
+        self.writer.close()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    def test_writer_needs_file_database(self):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        with self.assertRaises(ValueError):
+            GroupCommitWriter(app, db)
+
+    def test_stopped_writer_fails_writes(self):
+        """Test writes fail instead of hanging once the writer thread is gone."""
+        self.writer.queue.put(None) # the writer stops at this, stranding anything queued behind it
+        with self.app.app_context():
+            with self.assertRaises(RuntimeError):
+                self.dao.create_task(Task("Lost"))
+            self.writer.thread.join()
+            with self.assertRaises(RuntimeError):
+                self.dao.create_task(Task("After"))
+
+    def test_concurrent_writes_share_commits(self):
+        """Test each concurrent caller gets its own id and result while writes are committed in batches."""
+        created = []
+        barrier = threading.Barrier(16)
+
+        def client():
+            with self.app.app_context():
+                barrier.wait()
+                task = self.dao.create_task(Task("Grouped", "", "Pending"))
+                partial_task = Task(status="Done")
+                partial_task.id = task.get_id()
+                created.append((task.get_id(), self.dao.update_task(partial_task).version))
+
+        threads = [threading.Thread(target=client) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({task_id for task_id, _ in created}), 16)
+        self.assertEqual({version for _, version in created}, {2})
+        self.assertLess(self.writer.batches, self.writer.writes)
+        with self.app.app_context():
+            self.assertEqual(self.dao.status_counts(), {"total": 16, "by_status": {"Done": 16}})
+
+    def test_errors_reach_their_caller(self):
+        """Test not found, version conflicts and database errors fail only the write that caused them."""
+        with self.app.app_context():
+            task = self.dao.create_task(Task("Task", "", "Pending"))
+            self.assertEqual(self.dao.get_task(task.get_id()).get_title(), "Task") # read-your-writes
+            stale = Task(title="Stale")
+            stale.id, stale.version = task.get_id(), 7
+            with self.assertRaises(VersionConflictError):
+                self.dao.update_task(stale)
+            with self.assertRaises(TaskNotFoundError):
+                self.dao.delete_task(999)
+            self.assertTrue(self.dao.delete_task(task.get_id()))
+
+            def broken(item):
+                db.session.execute(text("INSERT INTO missing_table VALUES (1)"))
+            batch = [(broken, None, Future()), (self.dao._insert, Task("Survivor"), Future())]
+            self.writer._commit(batch)
+            with self.assertRaises(Exception):
+                batch[0][2].result()
+            self.assertEqual(self.dao.get_task(batch[1][2].result()).get_title(), "Survivor")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from html_based_app import create_html_app
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+
+
+class TestHtmlBasedApp(unittest.TestCase):
+    def setUp(self):
+        self.dao = InMemoryDAO()
+        self.app = create_html_app(self.dao, page_size=2)
+        self.client = self.app.test_client()
+
+    def test_index_is_paginated(self):
+        for i in range(3):
+            self.dao.create_task(Task(f"Task {i}", "", "Pending"))
+        page = self.client.get('/').get_data(as_text=True)
+        self.assertIn("Task 0", page)
+        self.assertIn("Task 1", page)
+        self.assertNotIn("Task 2", page)
+        self.assertIn("after_id=2", page)
+        page = self.client.get('/?after_id=2').get_data(as_text=True)
+        self.assertIn("Task 2", page)
+        self.assertNotIn("Next page", page)
+
+    def test_add_edit_delete(self):
+        response = self.client.post('/add', data={"title": "Write report", "description": "Q3", "status": "Pending"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.dao.get_task(1).get_title(), "Write report")
+
+        self.assertIn('value="Write report"', self.client.get('/edit/1').get_data(as_text=True))
+        self.client.post('/edit/1', data={"title": "Write report", "description": "Q4", "status": "Completed"})
+        self.assertEqual(self.dao.get_task(1).get_status(), "Completed")
+
+        self.assertEqual(self.client.get('/delete/1').status_code, 302)
+        self.assertEqual(len(self.dao), 0)
+        self.assertEqual(self.client.get('/edit/1').status_code, 404)
+
+    def test_add_without_title(self):
+        response = self.client.post('/add', data={"title": "", "description": "Q3"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Task must have a title", response.get_data(as_text=True))
+        self.assertIn("<form", response.get_data(as_text=True))
+        self.assertEqual(len(self.dao), 0)
+
+    def test_fragment_responses(self):
+        headers = {"X-Fragment": "1"}
+        response = self.client.post('/add', data={"title": "Fragment task"}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        fragment = response.get_data(as_text=True)
+        self.assertTrue(fragment.strip().startswith('<li id="task-1">'))
+        self.assertNotIn("<html", fragment)
+
+        response = self.client.post('/edit/1', data={"title": "Renamed", "status": "Completed"}, headers=headers)
+        self.assertIn("Renamed", response.get_data(as_text=True))
+        response = self.client.post('/delete/1', headers=headers)
+        self.assertEqual((response.status_code, response.get_data()), (200, b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
+import threading
 import unittest
 from in_memory_task_dao import InMemoryDAO
-from task_resource import Task
-from errors import TaskNotFoundError, InvalidTaskError  # Import custom errors
+from columnar_task_dao import ColumnarTaskDAO, np
+from task import Task
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError  # Import custom errors
 
 class TestInMemoryDAO(unittest.TestCase):
     def setUp(self):
@@ -15,6 +17,11 @@ class TestInMemoryDAO(unittest.TestCase):
         self.assertIsNotNone(new_task.get_id())
         self.assertEqual(len(self.dao.get_tasks()), 1)
 
+        # Single and batch creates store the same defaults for missing fields
+        single = self.dao.get_task(self.dao.create_task(Task("Task 2")).get_id())
+        batch = self.dao.get_task(self.dao.create_tasks([Task("Task 3")])[0].get_id())
+        self.assertEqual((batch.get_description(), batch.get_status()), (single.get_description(), single.get_status()))
+
         # Test creating a task without a title
         with self.assertRaises(InvalidTaskError) as context:
             self.dao.create_task(Task())
@@ -56,6 +63,17 @@ class TestInMemoryDAO(unittest.TestCase):
             self.dao.update_task(non_existent_task)
         self.assertEqual(str(context.exception), "Task with ID 99 not found")
 
+    def test_compare_and_set_update(self):
+        task = self.dao.create_task(Task("Task 1", "", "Pending"))
+        self.assertEqual(task.version, 1)
+        partial_task = Task(status="Done")
+        partial_task.id = task.get_id()
+        partial_task.version = 1
+        self.assertEqual(self.dao.update_task(partial_task).version, 2)
+        with self.assertRaises(VersionConflictError):
+            self.dao.update_task(partial_task) # still expects version 1
+        self.assertEqual(self.dao.get_task(task.get_id()).version, 2)
+
     def test_delete_task(self):
         task_1 = self.dao.create_task(Task("Task 1", "Description of task 1", "Pending"))
         task_2 = self.dao.create_task(Task("Task 2", "Description of task 2", "Pending"))
@@ -68,5 +86,152 @@ class TestInMemoryDAO(unittest.TestCase):
             self.dao.delete_task(99)
         self.assertEqual(str(context.exception), "Task with ID 99 not found")
 
+    def test_get_tasks_by_status(self):
+        task_1 = self.dao.create_task(Task("Task 1", "Description of task 1", "Pending"))
+        task_2 = self.dao.create_task(Task("Task 2", "Description of task 2", "Done"))
+        task_3 = self.dao.create_task(Task("Task 3", "Description of task 3", "Pending"))
+
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Pending")], [task_1.get_id(), task_3.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Done")], [task_2.get_id()])
+        self.assertEqual(self.dao.get_tasks(status="Blocked"), [])
+
+        # Status changes and deletes must keep the index in sync
+        partial_task_1 = Task(status="Done")
+        partial_task_1.id = task_1.get_id()
+        self.dao.update_task(partial_task_1)
+        self.dao.delete_task(task_2.get_id())
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Pending")], [task_3.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Done")], [task_1.get_id()])
+
+        # Unfiltered listing keeps creation order
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks()], [task_1.get_id(), task_3.get_id()])
+
+    def test_get_tasks_paginated(self):
+        tasks = [self.dao.create_task(Task(f"Task {i}", "", "Pending" if i % 2 else "Done")) for i in range(6)]
+        ids = [task.get_id() for task in tasks]
+
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2)], ids[:2])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2, after_id=ids[1])], ids[2:4])
+        self.assertEqual(self.dao.get_tasks(after_id=ids[-1]), [])
+
+        # Keyset cursors survive deletes and status moves, and status pages stay in id order
+        self.dao.delete_task(ids[2])
+        partial_task = Task(status="Pending")
+        partial_task.id = ids[0]
+        self.dao.update_task(partial_task)
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2, after_id=ids[1])], ids[3:5])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Pending")], [ids[0], ids[1], ids[3], ids[5]])
+        self.assertEqual([t.get_id() for t in self.dao.iter_tasks(status="Pending", after_id=ids[1])], [ids[3], ids[5]])
+
+    def test_filter_search_and_sort(self):
+        task_1 = self.dao.create_task(Task("Write report", "quarterly numbers for finance", "Pending"))
+        task_2 = self.dao.create_task(Task("Review report", "finance review", "Done"))
+        task_3 = self.dao.create_task(Task("Plan offsite", "venue and numbers", "Pending"))
+
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(title="REPORT")], [task_1.get_id(), task_2.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="finance")], [task_1.get_id(), task_2.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="Numbers finance")], [task_1.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="numbers", status="Pending", sort="-id")],
+                         [task_3.get_id(), task_1.get_id()])
+        self.assertEqual([t.get_title() for t in self.dao.get_tasks(sort="title")], ["Plan offsite", "Review report", "Write report"])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(sort="-id", after_id=task_3.get_id())], [task_2.get_id(), task_1.get_id()])
+
+        # The inverted index follows edits and deletes
+        partial_task = Task(description="nothing relevant")
+        partial_task.id = task_2.get_id()
+        self.dao.update_task(partial_task)
+        self.dao.delete_task(task_1.get_id())
+        self.assertEqual(self.dao.get_tasks(search="finance"), [])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="relevant")], [task_2.get_id()])
+        self.assertEqual(self.dao.get_tasks(search="quarterly"), [])
+
+    def test_concurrent_writers(self):
+        # Many threads creating, updating and deleting at once: no duplicate ids, no lost updates, indexes in sync
+        threads_count, per_thread = 8, 300
+        created = [[] for _ in range(threads_count)]
+        shared = self.dao.create_task(Task("Shared", "", "Pending"))
+        barrier = threading.Barrier(threads_count)
+
+        def worker(n):
+            barrier.wait()
+            for i in range(per_thread):
+                task = self.dao.create_task(Task(f"Task {n}-{i}", "load", "Pending"))
+                created[n].append(task.get_id())
+                partial_task = Task(status="Done" if i % 2 else "Pending")
+                partial_task.id = task.get_id()
+                self.dao.update_task(partial_task)
+                if i % 3 == 0:
+                    self.dao.delete_task(task.get_id())
+            # Each thread sets its own field on the shared task; neither write may be lost
+            partial_shared = Task(title="Shared title") if n % 2 else Task(description="Shared description")
+            partial_shared.id = shared.get_id()
+            self.dao.update_task(partial_shared)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_ids = [task_id for ids in created for task_id in ids]
+        self.assertEqual(len(all_ids), len(set(all_ids)))
+        expected = 1 + threads_count * (per_thread - len(range(0, per_thread, 3)))
+        self.assertEqual(len(self.dao), expected)
+        self.assertEqual(len(self.dao.get_tasks()), expected)
+        by_status = {status: len(self.dao.get_tasks(status=status)) for status in ("Pending", "Done")}
+        self.assertEqual(sum(by_status.values()), expected)
+        self.assertEqual(len(self.dao.get_tasks(search="load")), expected - 1)
+        shared_task = self.dao.get_task(shared.get_id())
+        self.assertEqual((shared_task.get_title(), shared_task.get_description()), ("Shared title", "Shared description"))
+        self.assertEqual(self.dao.status_counts(), {"total": expected, "by_status": {s: n for s, n in by_status.items() if n}})
+
+    def test_status_counts(self):
+        self.assertEqual(self.dao.status_counts(), {"total": 0, "by_status": {}})
+        for title, status in (("Write report", "Pending"), ("Review report", "Done"), ("Plan sprint", "Pending")):
+            self.dao.create_task(Task(title, "quarterly", status))
+        self.dao.delete_task(3)
+        self.assertEqual(self.dao.status_counts(), {"total": 2, "by_status": {"Pending": 1, "Done": 1}})
+        self.assertEqual(self.dao.status_counts(status="Done"), {"total": 1, "by_status": {"Done": 1}})
+        self.assertEqual(self.dao.status_counts(status="Archived"), {"total": 0, "by_status": {}})
+        self.assertEqual(self.dao.status_counts(title="REVIEW"), {"total": 1, "by_status": {"Done": 1}})
+        self.assertEqual(self.dao.status_counts(search="quarterly", status="Pending"), {"total": 1, "by_status": {"Pending": 1}})
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnarTaskDAO(TestInMemoryDAO):
+    def setUp(self):
+        self.dao = ColumnarTaskDAO(capacity=4) # grows, and compacts under test_concurrent_writers
+
+    def test_compaction_keeps_tasks(self):
+        for i in range(3000):
+            self.dao.create_task(Task(f"Task {i}", "x" * (i % 7), "Pending" if i % 2 else "Done"))
+        for task_id in range(1, 2501):
+            self.dao.delete_task(task_id)
+        self.assertLess(self.dao.size, 3000) # dead rows dropped
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(after_id=2995)], [2996, 2997, 2998, 2999, 3000])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(sort="-id", limit=3, after_id=2999)], [2998, 2997, 2996])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Done", limit=2, after_id=2600)], [2601, 2603])
+        self.assertEqual(len(list(self.dao.iter_tasks(status="Pending"))), 250)
+        self.assertEqual(self.dao.get_task(3000).get_description(), "x" * (2999 % 7))
+        self.assertEqual(self.dao.status_counts(), {"total": 500, "by_status": {"Pending": 250, "Done": 250}})
+        with self.assertRaises(TaskNotFoundError):
+            self.dao.get_task(1)
+
+    def test_non_string_fields_match_in_memory(self):
+        """Test non-string fields are rejected exactly as InMemoryDAO rejects them, leaving the row untouched."""
+        for dao in (InMemoryDAO(), self.dao):
+            task = dao.create_task(Task("Task 1", "", "Pending"))
+            for bad in (Task(123), Task("Task", 1.5), Task("Task", "", ["Done"])):
+                with self.assertRaises(InvalidTaskError):
+                    dao.create_task(bad)
+            partial_task = Task("Renamed", None, {"status": "Done"})
+            partial_task.id = task.get_id()
+            with self.assertRaises(InvalidTaskError):
+                dao.update_task(partial_task)
+            results = dao.create_tasks([Task("Task 2"), Task(b"bytes")])
+            self.assertIsInstance(results[1], InvalidTaskError)
+            self.assertEqual([(t.get_title(), t.get_status(), t.version) for t in dao.get_tasks()],
+                             [("Task 1", "Pending", 1), ("Task 2", None, 1)], type(dao).__name__)
+
 if __name__ == "__main__":
     unittest.main()
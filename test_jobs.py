@@ -0,0 +1,150 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from flask import Flask
+from cached_task_dao import CachingTaskDAO
+from in_memory_task_dao import InMemoryDAO
+from jobs import JobStore, install_jobs
+from task import Task
+from task_dao import DelegatingTaskDAO
+from task_resource import TaskResource
+
+
+class TrackingDAO(DelegatingTaskDAO):
+    # Records how many job chunks run at once
+    def __init__(self, dao, delay=0.0):
+        super().__init__(dao)
+        self.delay = delay
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+    def create_tasks(self, tasks):
+        with self.lock:
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        time.sleep(self.delay)
+        try:
+            return self.dao.create_tasks(tasks)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.dao = TrackingDAO(InMemoryDAO())
+        self.resource = TaskResource(self.app, CachingTaskDAO(self.dao))
+        self.runner = install_jobs(self.app, self.resource, self.directory, workers=1, chunk_size=3)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.runner.close()
+        shutil.rmtree(self.directory)
+
+    def wait(self, location, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.client.get(location).get_json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.01)
+        self.fail(f"{location} did not finish")
+
+    def test_import(self):
+        self.client.get('/tasks') # cached empty listing, must not outlive the import
+        response = self.client.post('/jobs', json={"type": "import", "tasks": [{"title": f"Task {i}"} for i in range(7)] + [{"description": "untitled"}]})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()["status"], "queued")
+        job = self.wait(response.headers["Location"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], {"done": 8, "total": 8})
+        self.assertEqual(job["result"], {"created": 7, "failed": 1, "errors": [{"index": 7, "message": "Task must have a title"}]})
+        self.assertEqual(len(self.client.get('/tasks').get_json()), 7)
+
+        upload = b'{"title": "From file"}\n{"title": "Also from file", "status": "Done"}\n'
+        response = self.client.post('/jobs', data={"type": "import", "file": (io.BytesIO(upload), "tasks.ndjson")})
+        self.assertEqual(self.wait(response.headers["Location"])["result"]["created"], 2)
+        response = self.client.post('/jobs', data={"type": "import", "file": (io.BytesIO(b"[{"), "tasks.json")})
+        self.assertEqual(response.status_code, 400)
+
+    def test_status_change_and_export(self):
+        self.dao.create_tasks([Task(f"Task {i}", "", "Done" if i % 3 == 0 else "Pending") for i in range(10)])
+        response = self.client.post('/jobs', json={"type": "status_change", "status": "Archived", "filter": {"status": "Pending"}})
+        job = self.wait(response.headers["Location"])
+        self.assertEqual((job["progress"], job["result"]), ({"done": 6, "total": 6}, {"updated": 6, "missing": 0}))
+        self.assertEqual(self.client.get('/tasks/stats').get_json()["by_status"], {"Done": 4, "Archived": 6})
+
+        job = self.wait(self.client.post('/jobs', json={"type": "export", "filter": {"status": "Done"}}).headers["Location"])
+        self.assertEqual(job["result"]["exported"], 4)
+        lines = self.client.get(job["result"]["url"]).get_data().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [1, 4, 7, 10])
+        self.assertEqual(self.client.get(f"/jobs/{job['id'] - 1}/result").status_code, 404)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post('/jobs', json={"type": "reindex"}).status_code, 400)
+        self.assertEqual(self.client.post('/jobs', json={"type": "status_change", "filter": {}}).status_code, 400)
+        self.assertEqual(self.client.post('/jobs', json={"type": "export", "filter": "Pending"}).status_code, 400)
+        self.assertEqual(self.client.post('/jobs', json={"type": "export", "filter": {"title": 5}}).status_code, 400)
+        self.assertEqual(self.client.post('/jobs', json={"type": "export", "filter": {"status": ["x"]}}).status_code, 400)
+        self.assertEqual(self.client.get('/jobs/999').status_code, 404)
+
+    def test_import_item_failure(self):
+        """Test an error the DAO raises for one imported task fails that task only, not the job."""
+        dao = self.dao.dao
+        create_task = dao.create_task
+
+        def failing_create_task(task):
+            if task.title == "Task 4":
+                raise RuntimeError("disk full")
+            return create_task(task)
+        dao.create_task = failing_create_task # InMemoryDAO.create_tasks calls it per task and lets this through
+        response = self.client.post('/jobs', json={"type": "import", "tasks": [{"title": f"Task {i}"} for i in range(7)]})
+        job = self.wait(response.headers["Location"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"], {"created": 6, "failed": 1, "errors": [{"index": 4, "message": "disk full"}]})
+        self.assertEqual([task.get_title() for task in dao.get_tasks()], [f"Task {i}" for i in (0, 1, 2, 3, 5, 6)])
+
+    def test_one_job_at_a_time(self):
+        self.dao.delay = 0.01
+        locations = [self.client.post('/jobs', json={"type": "import", "tasks": [{"title": "Task"}] * 9}).headers["Location"]
+                     for _ in range(3)]
+        for location in locations:
+            self.assertEqual(self.wait(location)["status"], "succeeded")
+        self.assertEqual(self.dao.most_active, 1)
+        self.assertEqual(len(self.dao), 27)
+
+    def test_queue_limit(self):
+        self.runner.close()
+        app = Flask(__name__)
+        self.runner = install_jobs(app, TaskResource(app), self.directory, workers=0, max_queued=2)
+        client = app.test_client()
+        statuses = [client.post('/jobs', json={"type": "export"}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [202, 202, 503])
+
+    def test_restart_resumes_from_checkpoint(self):
+        """Test a job left running by a dead process resumes after its last checkpoint."""
+        self.runner.close()
+        store = JobStore(os.path.join(self.directory, "jobs.db"))
+        job = store.create("import", {}, json.dumps([{"title": f"Task {i}"} for i in range(10)]).encode())
+        store.claim()
+        store.progress(job["id"], 6, 10, {"offset": 6, "created": 6, "failed": 0, "errors": []}) # then the process died
+        store.close()
+
+        self.app = Flask(__name__) # the restarted process
+        self.runner = install_jobs(self.app, TaskResource(self.app, self.dao), self.directory, chunk_size=3)
+        self.client = self.app.test_client()
+        job = self.wait(f"/jobs/{job['id']}")
+        self.assertEqual(job["result"]["created"], 10)
+        self.assertEqual([t.get_title() for t in self.dao.get_tasks()], [f"Task {i}" for i in range(6, 10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from flask import Flask
+from db_task_dao import db, DBTaskDAO
+from cached_task_dao import CachingTaskDAO
+from in_memory_task_dao import InMemoryDAO
+from metrics import MetricsRegistry, InstrumentedTaskDAO, install_metrics
+from task_resource import TaskResource, Task
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.describe("calls_total", "counter", "Calls")
+        registry.inc("calls_total", method="get")
+        registry.inc("calls_total", 2, method="get")
+        registry.observe("latency_seconds", 0.002)
+        text = registry.render()
+        self.assertIn("# TYPE calls_total counter", text)
+        self.assertIn('calls_total{method="get"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="0.0025"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("latency_seconds_count 1", text)
+
+
+class TestInstrumentedTaskDAO(unittest.TestCase):
+    def test_counts_calls_rows_and_errors(self):
+        registry = MetricsRegistry()
+        dao = InstrumentedTaskDAO(InMemoryDAO(), registry)
+        dao.create_tasks([Task("One", "", "Pending"), Task("Two", "", "Pending")])
+        self.assertEqual(len(dao.get_tasks()), 2)
+        self.assertEqual(len(list(dao.iter_tasks())), 2)
+        self.assertEqual(dao.status_counts()["total"], 2)
+        with self.assertRaises(Exception):
+            dao.get_task(99)
+        counters = registry.counters
+        self.assertEqual(counters[("taskmanager_dao_rows_total", (("method", "get_tasks"),))], 2)
+        self.assertEqual(counters[("taskmanager_dao_rows_total", (("method", "iter_tasks"),))], 2)
+        self.assertEqual(counters[("taskmanager_dao_calls_total", (("method", "get_task"), ("outcome", "error")))], 1)
+        self.assertEqual(registry.histograms[("taskmanager_dao_seconds", (("method", "create_tasks"),))].count, 1)
+        self.assertEqual(counters[("taskmanager_dao_calls_total", (("method", "status_counts"), ("outcome", "ok")))], 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.client = self.app.test_client()
+
+    def test_routes_and_dao_are_timed(self):
+        resource = TaskResource(self.app, InMemoryDAO())
+        install_metrics(self.app, resource)
+        self.client.post('/tasks', json={"title": "Task"})
+        self.client.get('/tasks/1')
+        self.client.get('/tasks/2')
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('taskmanager_http_requests_total{endpoint="get_task",method="GET",status="200"} 1', text)
+        self.assertIn('taskmanager_http_requests_total{endpoint="get_task",method="GET",status="404"} 1', text)
+        self.assertIn('taskmanager_dao_calls_total{method="create_task",outcome="ok"} 1', text)
+        self.assertIn('taskmanager_request_phase_seconds_count{endpoint="get_task",phase="dao"} 2', text)
+        self.assertNotIn('endpoint="metrics"', text)
+
+    def test_cache_stays_in_front_and_reports_stats(self):
+        resource = TaskResource(self.app, CachingTaskDAO(InMemoryDAO()))
+        install_metrics(self.app, resource)
+        self.assertIsInstance(resource.dao, CachingTaskDAO)
+        self.client.post('/tasks', json={"title": "Task"})
+        self.client.get('/tasks/1')
+        self.client.get('/tasks/1')
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('taskmanager_cache_hits_total{cache="tasks"} 1', text)
+        self.assertIn('taskmanager_dao_calls_total{method="get_task",outcome="ok"} 1', text)
+
+    def test_db_queries_are_counted(self):
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all(bind_key=None) # other tests may have registered a read-only bind on db
+        resource = TaskResource(self.app, DBTaskDAO(db))
+        install_metrics(self.app, resource)
+        self.client.get('/tasks')
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('taskmanager_db_queries_total{executemany="false"}', text)
+
+    def test_profiler_is_opt_in(self):
+        resource = TaskResource(self.app, InMemoryDAO())
+        install_metrics(self.app, resource)
+        self.assertEqual(self.client.get('/metrics/profile').status_code, 404)
+
+    def test_profiler_samples_every_nth_request(self):
+        resource = TaskResource(self.app, InMemoryDAO())
+        install_metrics(self.app, resource, profile_every=2)
+        self.assertIn("no requests profiled", self.client.get('/metrics/profile').get_data(as_text=True))
+        for _ in range(4):
+            self.client.get('/tasks')
+        text = self.client.get('/metrics/profile?reset=1').get_data(as_text=True)
+        self.assertIn("2 profiled requests (1 in 2)", text)
+        self.assertIn("no requests profiled", self.client.get('/metrics/profile').get_data(as_text=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
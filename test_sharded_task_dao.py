@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine, text
+from sharded_task_dao import ShardedTaskDAO, shard_path
+from task import Task
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+import test_in_memory_task_dao
+
+
+class TestShardedTaskDAO(test_in_memory_task_dao.TestInMemoryDAO):
+    # The TaskDAO contract over three shards, so every listing is a merge
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dao = ShardedTaskDAO(self.directory, shards=3)
+
+    def tearDown(self):
+        self.dao.close()
+        shutil.rmtree(self.directory)
+
+    def shard_ids(self, shard):
+        engine = create_engine(f"sqlite:///{shard_path(self.directory, shard)}")
+        with engine.connect() as connection:
+            ids = [row.id for row in connection.execute(text("SELECT id FROM tasks ORDER BY id"))]
+        engine.dispose()
+        return ids
+
+    def test_tasks_live_in_their_shard(self):
+        """Test task id n is stored in shard n % N and creates spread evenly."""
+        self.dao.create_tasks([Task(f"Task {i}") for i in range(5)])
+        self.dao.create_task(Task("Task 5"))
+        self.assertEqual([self.shard_ids(shard) for shard in range(3)], [[3, 6], [1, 4], [2, 5]])
+
+    def test_merged_listings(self):
+        """Test listings across shards come back in the order of their sort, with keyset pages."""
+        for title, status in (("b", "Done"), ("a", "Pending"), ("c", "Done"), ("a", "Done"), ("b", "Pending")):
+            self.dao.create_task(Task(title, "shared words", status))
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(sort="title")], [2, 4, 1, 5, 3])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(sort="-title")], [3, 5, 1, 4, 2])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(sort="-id", limit=2, after_id=4)], [3, 2])
+        self.assertEqual([t.get_id() for t in self.dao.iter_tasks(status="Done", sort="status")], [1, 3, 4])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="shared", limit=3)], [1, 2, 3])
+
+    def test_batches_keep_input_order(self):
+        """Test batch results line up with their inputs while shards run separately."""
+        results = self.dao.create_tasks([Task("Task 1"), Task(), Task("Task 2"), Task("Task 3")])
+        self.assertIsInstance(results[1], InvalidTaskError)
+        self.assertEqual([r.get_id() for r in results if isinstance(r, Task)], [1, 2, 3])
+        partial_tasks = []
+        for task_id, version in ((3, None), (99, None), (1, 5), (2, 1)):
+            partial_task = Task(status="Done")
+            partial_task.id, partial_task.version = task_id, version
+            partial_tasks.append(partial_task)
+        results = self.dao.update_tasks(partial_tasks)
+        self.assertEqual([type(r) for r in results], [Task, TaskNotFoundError, VersionConflictError, Task])
+        results = self.dao.delete_tasks([2, 2, 1, 50])
+        self.assertEqual(results[0], True)
+        self.assertEqual([type(r) for r in results[1:]], [TaskNotFoundError, bool, TaskNotFoundError])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks()], [3])
+
+    def test_batch_creates_take_column_defaults(self):
+        self.dao.create_tasks([Task("Task 1"), Task("Task 2", "notes", "Done"), Task("Task 3", None, "Done")])
+        self.assertEqual([(t.get_description(), t.get_status()) for t in self.dao.get_tasks()],
+                         [("", "Pending"), ("notes", "Done"), ("", "Done")])
+        self.assertEqual(self.dao.status_counts(status="Pending"), {"total": 1, "by_status": {"Pending": 1}})
+
+    def test_reopen(self):
+        """Test ids continue after a restart and the shard count cannot change."""
+        self.dao.create_tasks([Task("Task 1"), Task("Task 2")])
+        self.dao.delete_task(1)
+        self.dao.close()
+        with self.assertRaises(ValueError):
+            ShardedTaskDAO(self.directory, shards=2)
+        self.dao = ShardedTaskDAO(self.directory, shards=3)
+        self.assertEqual(self.dao.get_task(2).get_title(), "Task 2")
+        self.assertEqual(self.dao.create_task(Task("Task 3")).get_id(), 3)
+        self.dao.delete_task(3) # the newest id, in its own shard
+        self.dao.close()
+        self.dao = ShardedTaskDAO(self.directory, shards=3)
+        self.assertEqual(self.dao.create_task(Task("Task 4")).get_id(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import threading
+import unittest
+from flask import Flask
+from in_memory_task_dao import InMemoryDAO
+from shared_store import RemoteTaskDAO, TaskStoreServer
+from task_resource import Task, TaskResource
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        self.address = os.path.join(tempfile.mkdtemp(), "store.sock")
+        self.server = TaskStoreServer(InMemoryDAO(), self.address, b"secret")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.dao = RemoteTaskDAO(self.address, b"secret")
+
+    def tearDown(self):
+        self.dao.close()
+        self.server.close()
+
+    def test_crud_and_errors(self):
+        task = self.dao.create_task(Task("Task 1", "Description", "Pending"))
+        self.assertEqual((task.get_id(), task.version), (1, 1))
+        self.assertEqual(self.dao.get_task(1).get_title(), "Task 1")
+        partial_task = Task(status="Done")
+        partial_task.id = 1
+        partial_task.version = 1
+        self.assertEqual(self.dao.update_task(partial_task).get_status(), "Done")
+        with self.assertRaises(VersionConflictError):
+            self.dao.update_task(partial_task)
+        with self.assertRaises(InvalidTaskError):
+            self.dao.create_task(Task())
+        self.assertTrue(self.dao.delete_task(1))
+        with self.assertRaises(TaskNotFoundError):
+            self.dao.get_task(1)
+        with self.assertRaises(ValueError):
+            self.dao._call("__init__")
+
+    def test_batches_listing_and_streaming(self):
+        results = self.dao.create_tasks([Task(f"Task {i}", "", "Pending") for i in range(600)] + [Task()])
+        self.assertIsInstance(results[-1], InvalidTaskError)
+        self.assertEqual(len(self.dao), 600)
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(limit=2, after_id=10)], [11, 12])
+        self.assertEqual([t.get_id() for t in self.dao.iter_tasks()], list(range(1, 601)))
+        self.assertEqual(self.dao.delete_tasks([1, 1])[1].__class__, TaskNotFoundError)
+
+    def test_connections_are_reused_across_threads(self):
+        """Test a thread per request, as werkzeug runs them, borrows pooled connections instead of opening new ones."""
+        self.dao.create_task(Task("Task 1"))
+        for _ in range(20):
+            thread = threading.Thread(target=self.dao.get_task, args=(1,))
+            thread.start()
+            thread.join()
+        self.assertEqual(self.dao.opened, 1)
+
+        barrier = threading.Barrier(4)
+
+        def concurrent_reads():
+            barrier.wait()
+            for _ in range(50):
+                self.dao.get_task(1)
+        threads = [threading.Thread(target=concurrent_reads) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(self.dao.opened, 4)
+        self.assertLessEqual(self.dao.idle.qsize(), 4)
+
+    def test_workers_share_one_task_set(self):
+        other = RemoteTaskDAO(self.address, b"secret")
+        apps = []
+        for dao in (self.dao, other):
+            app = Flask(__name__)
+            TaskResource(app, dao)
+            apps.append(app.test_client())
+        apps[0].post('/tasks', json={"title": "Created by worker 0"})
+        self.assertEqual(apps[1].get('/tasks/1').get_json()["title"], "Created by worker 0")
+        apps[1].patch('/tasks/1', json={"status": "Completed"})
+        self.assertEqual(apps[0].get('/tasks').get_json()[0]["status"], "Completed")
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import gzip
+import json
+import unittest
+from flask import Flask
+import task_formats
+from cached_task_dao import CachingTaskDAO
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+from task_resource import TaskResource
+
+
+class TestTaskFormats(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [Task(f"Task {i}", "", "Done" if i % 3 else "Pending") for i in range(4)]
+        for i, task in enumerate(self.tasks):
+            task.id = i + 1
+
+    def test_columns(self):
+        columns = json.loads(task_formats.encode_tasks(self.tasks, task_formats.COLUMNS_JSON))
+        self.assertEqual(columns["id"], [1, 2, 3, 4])
+        self.assertEqual([columns["statuses"][code] for code in columns["status"]], [t.status for t in self.tasks])
+        self.assertEqual(columns["statuses"], ["Pending", "Done"])
+
+    @unittest.skipIf(task_formats.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        msgpack = task_formats.msgpack
+        self.assertEqual(msgpack.unpackb(task_formats.encode_tasks(self.tasks, task_formats.MSGPACK)),
+                         [task.to_json() for task in self.tasks])
+        self.assertEqual(msgpack.unpackb(task_formats.encode_task(self.tasks[0], task_formats.MSGPACK)), self.tasks[0].to_json())
+        self.assertEqual(msgpack.unpackb(task_formats.encode_tasks(self.tasks, task_formats.COLUMNS_MSGPACK)),
+                         json.loads(task_formats.encode_tasks(self.tasks, task_formats.COLUMNS_JSON)))
+
+    def test_compress(self):
+        body = task_formats.encode_tasks(self.tasks * 50, task_formats.JSON)
+        self.assertEqual(gzip.decompress(task_formats.compress(body, "gzip")), body)
+        if task_formats.zstandard is not None:
+            self.assertEqual(task_formats.zstandard.ZstdDecompressor().decompress(task_formats.compress(body, "zstd")), body)
+        if task_formats.brotli is not None:
+            self.assertEqual(task_formats.brotli.decompress(task_formats.compress(body, "br")), body)
+
+
+class TestNegotiation(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        TaskResource(self.app, CachingTaskDAO(InMemoryDAO()))
+        self.client = self.app.test_client()
+        self.client.post('/tasks/bulk', json=[{"title": f"Task {i}", "description": "repeated"} for i in range(100)])
+
+    def test_formats(self):
+        response = self.client.get('/tasks?limit=2', headers={"Accept": task_formats.COLUMNS_JSON})
+        self.assertEqual(response.mimetype, task_formats.COLUMNS_JSON)
+        self.assertEqual(response.get_json(force=True)["id"], [1, 2])
+        self.assertIn("Accept", response.headers["Vary"])
+        self.assertEqual(self.client.get('/tasks/1', headers={"Accept": "text/html"}).mimetype, task_formats.JSON)
+        if task_formats.msgpack is not None:
+            response = self.client.get('/tasks/1', headers={"Accept": task_formats.MSGPACK})
+            self.assertEqual(task_formats.msgpack.unpackb(response.data)["title"], "Task 0")
+            self.assertEqual(response.headers["ETag"], '"1"')
+
+    def test_compression(self):
+        response = self.client.get('/tasks', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))), 100)
+        self.assertTrue(response.headers["ETag"].startswith('W/'))
+        self.assertEqual(self.client.get('/tasks', headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}).status_code, 304)
+
+        self.assertNotIn("Content-Encoding", self.client.get('/tasks?limit=1', headers={"Accept-Encoding": "gzip"}).headers) # below the threshold
+        self.assertNotIn("Content-Encoding", self.client.get('/tasks').headers)
+        self.assertNotIn("Content-Encoding", self.client.get('/tasks?stream=ndjson', headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertEqual(self.client.get('/tasks', headers={"Accept-Encoding": "br;q=0.5, gzip"}).headers["Content-Encoding"], "gzip")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import importlib
+import json
+import sys
+import unittest
+from unittest import mock
+import task_json
+from task import Task
+
+
+class TestTaskJson(unittest.TestCase):
+    def setUp(self):
+        self.task = Task('Quote " and \\ backslash', "Ünïcode\nnewline", None)
+        self.task.id = 7
+
+    def test_dumps_task_matches_to_json(self):
+        self.assertEqual(json.loads(task_json.dumps_task(self.task)), self.task.to_json())
+        self.assertEqual(json.loads(self.task.to_json_bytes()), self.task.to_json())
+
+    def test_dumps_tasks(self):
+        other = Task("Second", "", "Done")
+        other.id = 8
+        self.assertEqual(json.loads(task_json.dumps_tasks([self.task, other])), [self.task.to_json(), other.to_json()])
+        self.assertEqual(json.loads(task_json.dumps_tasks([])), [])
+
+    def test_hand_written_encoder(self):
+        # The fallback used when orjson is not installed
+        self.assertEqual(json.loads(task_json._encode_task(self.task)), self.task.to_json())
+
+    def test_encoder_without_orjson(self):
+        """Test non-string field values keep their JSON types when orjson is not installed."""
+        with mock.patch.dict(sys.modules, {"orjson": None}):
+            fallback = importlib.reload(task_json)
+        try:
+            self.assertIsNone(fallback.orjson)
+            for value in (1.5, True, False, 3, ["a", 1], {"b": None}):
+                task = Task(value, value, "Pending")
+                task.id = 1
+                self.assertEqual(json.loads(fallback.dumps_task(task)), task.to_json())
+                self.assertEqual(json.loads(fallback.dumps_tasks([task])), [task.to_json()])
+        finally:
+            importlib.reload(task_json)
+
+    def test_task_has_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            self.task.assignee = "someone"
+
+
+if __name__ == "__main__":
+    unittest.main()
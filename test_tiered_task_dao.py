@@ -0,0 +1,194 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from flask import Flask
+from db_task_dao import db, DBTaskDAO, init_db
+from tiered_task_dao import TieredTaskDAO
+from task import Task
+from errors import TaskNotFoundError
+import test_in_memory_task_dao
+
+# Run in a child process against the database file in argv[1], then killed (os._exit) or exited normally
+CHILD_SETUP = """
+import os, sys
+from flask import Flask
+from sqlalchemy import event
+from db_task_dao import db, DBTaskDAO, init_db
+from tiered_task_dao import TieredTaskDAO
+from task import Task
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + sys.argv[1]
+init_db(app, db)
+with app.app_context():
+    db.create_all(bind_key=None)
+dao = TieredTaskDAO(app, DBTaskDAO(db), capacity=4, max_staleness=60)
+def update(task_id, **fields):
+    partial_task = Task(fields.get("title"), fields.get("description"), fields.get("status"))
+    partial_task.id = task_id
+    dao.update_task(partial_task)
+"""
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    init_db(app, db)
+    with app.app_context():
+        db.create_all(bind_key=None)
+    return app
+
+
+def stored_tasks(path):
+    # What is durable in the database file, read without any tier in front
+    app = make_app(path)
+    with app.app_context():
+        tasks = {task.id: (task.title, task.status, task.version) for task in DBTaskDAO(db).get_tasks()}
+        db.engine.dispose()
+    return tasks
+
+
+class TestTieredTaskDAO(test_in_memory_task_dao.TestInMemoryDAO):
+    # The TaskDAO contract, with a working set small enough that most reads miss
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "tasks.db")
+        self.app = make_app(self.path)
+        self.context = self.app.app_context()
+        self.context.push()
+        self.dao = TieredTaskDAO(self.app, DBTaskDAO(db), capacity=2, max_staleness=0.05, max_batch=64)
+
+    def tearDown(self):
+        self.dao.close()
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+
+    def test_write_behind(self):
+        """Test writes reach the database only after they are flushed, within the staleness bound."""
+        dao = TieredTaskDAO(self.app, DBTaskDAO(db), capacity=2, max_staleness=60)
+        try:
+            task = dao.create_task(Task("Task 1", None, None))
+            self.assertEqual((dao.get_task(task.get_id()).get_description(), dao.get_task(task.get_id()).get_status()), ("", "Pending"))
+            self.assertEqual(stored_tasks(self.path), {})
+            self.assertEqual(dao.flush(), 1)
+            self.assertEqual(stored_tasks(self.path), {1: ("Task 1", "Pending", 1)})
+        finally:
+            dao.close()
+
+        task = self.dao.create_task(Task("Task 2"))
+        deadline = time.monotonic() + 5
+        while task.get_id() not in stored_tasks(self.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn(task.get_id(), stored_tasks(self.path))
+
+    def test_working_set(self):
+        """Test the working set stays within capacity and misses are loaded from the database."""
+        tasks = self.dao.create_tasks([Task(f"Task {i}") for i in range(10)])
+        self.dao.flush()
+        self.assertLessEqual(len(self.dao.hot), 2)
+        self.assertEqual(self.dao.get_task(tasks[0].get_id()).get_title(), "Task 0")
+        self.assertEqual(self.dao.stats()["misses"], 1)
+        self.dao.get_task(tasks[0].get_id())
+        self.assertEqual(self.dao.stats()["hits"], 1)
+        self.dao.delete_task(tasks[1].get_id()) # a miss, deleted before it was ever loaded
+        with self.assertRaises(TaskNotFoundError):
+            self.dao.get_task(tasks[1].get_id())
+
+    def test_failed_flush_keeps_writes(self):
+        """Test a flush that fails is rolled back whole and retried, newer writes winning."""
+        dao = TieredTaskDAO(self.app, DBTaskDAO(db), max_staleness=60)
+        try:
+            dao.create_tasks([Task("Task 1"), Task("Task 2")])
+            dao.flush()
+            update = Task(status="Done")
+            update.id = 1
+            dao.update_task(update)
+            dao.delete_task(2)
+
+            def broken(changes):
+                db.session.connection().exec_driver_sql("DELETE FROM tasks") # applied, then rolled back
+                raise RuntimeError("disk full")
+            dao.db_dao.write_back = broken
+            with self.assertRaises(RuntimeError):
+                dao.flush()
+            self.assertEqual(stored_tasks(self.path), {1: ("Task 1", "Pending", 1), 2: ("Task 2", "Pending", 1)})
+            del dao.db_dao.write_back
+            update.status = "Blocked"
+            dao.update_task(update)
+            self.assertEqual(dao.flush(), 2)
+            self.assertEqual(stored_tasks(self.path), {1: ("Task 1", "Blocked", 3)})
+        finally:
+            dao.close()
+
+    def crash_child(self, script):
+        self.dao.close()
+        subprocess.run([sys.executable, "-c", CHILD_SETUP + script, self.path], check=False, timeout=60,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        return stored_tasks(self.path)
+
+    def test_crash_loses_only_unflushed_writes(self):
+        """Test a killed process leaves the database exactly as of its last flush."""
+        stored = self.crash_child("""
+dao.create_tasks([Task(f"Task {i}") for i in range(10)])
+update(1, status="Done")
+dao.flush()
+update(1, status="Blocked")
+dao.delete_task(2)
+dao.create_task(Task("Lost"))
+os._exit(1)
+""")
+        self.assertEqual(len(stored), 10)
+        self.assertEqual(stored[1], ("Task 0", "Done", 2))
+
+    def test_crash_during_flush_is_atomic(self):
+        """Test a process killed halfway through writing a batch leaves none of it behind."""
+        stored = self.crash_child("""
+dao.create_tasks([Task(f"Task {i}") for i in range(10)])
+dao.flush()
+update(1, status="Done")
+dao.delete_task(2)
+with app.app_context():
+    engine = db.engine
+@event.listens_for(engine, "before_cursor_execute")
+def crash(conn, cursor, statement, *args):
+    if statement.startswith("INSERT INTO tasks "): # the deletes of this batch already ran
+        os._exit(1)
+dao.flush()
+""")
+        self.assertEqual(len(stored), 10)
+        self.assertEqual(stored[1], ("Task 0", "Pending", 1))
+
+    def test_exit_flushes(self):
+        """Test writes still buffered when the process exits normally are flushed on the way out."""
+        stored = self.crash_child("""
+dao.create_tasks([Task(f"Task {i}") for i in range(10)])
+update(1, status="Done")
+dao.delete_task(2)
+sys.exit(0)
+""")
+        self.assertEqual(len(stored), 9)
+        self.assertEqual(stored[1], ("Task 0", "Done", 2))
+
+    def test_restart_continues_ids(self):
+        self.dao.create_tasks([Task("Task 1"), Task("Task 2")])
+        self.dao.close()
+        self.dao = TieredTaskDAO(self.app, DBTaskDAO(db))
+        self.assertEqual(self.dao.create_task(Task("Task 3")).get_id(), 3)
+        self.assertEqual(self.dao.get_task(2).get_title(), "Task 2")
+
+    def test_restart_never_reuses_ids(self):
+        """Test ids of deleted tasks stay taken after a restart, even ones never written to the database."""
+        self.dao.create_tasks([Task("Task 1"), Task("Task 2")])
+        self.dao.flush()
+        self.dao.delete_task(2) # stored, then deleted
+        self.dao.create_task(Task("Task 3"))
+        self.dao.delete_task(3) # created and deleted within one flush, never stored
+        self.dao.close()
+        self.dao = TieredTaskDAO(self.app, DBTaskDAO(db))
+        self.assertEqual(self.dao.create_task(Task("Task 4")).get_id(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
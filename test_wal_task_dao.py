@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from wal_task_dao import WALTaskDAO
+from task import Task
+from errors import TaskNotFoundError, InvalidTaskError
+
+
+class TestWALTaskDAO(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dao = WALTaskDAO(self.directory)
+
+    def tearDown(self):
+        self.dao.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.dao.close()
+        self.dao = WALTaskDAO(self.directory)
+
+    def partial(self, task_id, **fields):
+        partial_task = Task(fields.get("title"), fields.get("description"), fields.get("status"))
+        partial_task.id = task_id
+        return partial_task
+
+    def snapshot(self):
+        return [t.to_json() for t in self.dao.get_tasks()]
+
+    def test_recovers_from_log(self):
+        """Test creates, updates and deletes survive a restart by replaying the log."""
+        first = self.dao.create_task(Task("Task 1", "Description", "Pending"))
+        second = self.dao.create_task(Task("Task 2", None, "Pending"))
+        self.dao.update_task(self.partial(first.get_id(), status="Completed"))
+        self.dao.delete_task(second.get_id())
+        before = self.snapshot()
+        self.reopen()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(status="Completed")], [first.get_id()])
+        self.assertEqual([t.get_id() for t in self.dao.get_tasks(search="description")], [first.get_id()])
+        # The deleted highest id is not handed out again
+        self.assertEqual(self.dao.create_task(Task("Task 3")).get_id(), second.get_id() + 1)
+
+    def test_recovers_from_snapshot_and_tail(self):
+        """Test state is rebuilt from the compacted snapshot plus the log written after it."""
+        self.dao.create_tasks([Task(f"Task {i}", "", "Pending") for i in range(100)])
+        self.dao.compact()
+        self.dao.update_task(self.partial(1, title="Renamed"))
+        self.dao.delete_task(2)
+        before = self.snapshot()
+        self.reopen()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(self.dao.get_task(1).get_title(), "Renamed")
+        with self.assertRaises(TaskNotFoundError):
+            self.dao.get_task(2)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["snapshot", "wal.0000000001"])
+
+    def test_non_string_fields_never_reach_the_log(self):
+        """Test non-string fields are rejected before they are encoded, leaving the log replayable."""
+        task = self.dao.create_task(Task("Task 1", "", "Pending"))
+        with self.assertRaises(InvalidTaskError):
+            self.dao.create_task(Task("Task 2", "", 5))
+        with self.assertRaises(InvalidTaskError):
+            self.dao.update_task(self.partial(task.get_id(), status=5))
+        results = self.dao.create_tasks([Task("Task 3", 1.5), Task("Task 4")])
+        self.assertIsInstance(results[0], InvalidTaskError)
+        before = self.snapshot()
+        self.reopen()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual([(t.get_title(), t.version) for t in self.dao.get_tasks()], [("Task 1", 1), ("Task 4", 1)])
+
+    def test_torn_tail_is_truncated(self):
+        """Test a partially written last record is dropped and appends continue after it."""
+        self.dao.create_task(Task("Kept"))
+        self.dao.create_task(Task("Torn"))
+        self.dao.close()
+        path = os.path.join(self.directory, "wal.0000000000")
+        with open(path, "r+b") as log_file:
+            log_file.truncate(os.path.getsize(path) - 3)
+        self.dao = WALTaskDAO(self.directory)
+        self.assertEqual([t.get_title() for t in self.dao.get_tasks()], ["Kept"])
+        self.dao.create_task(Task("After"))
+        self.reopen()
+        self.assertEqual([t.get_title() for t in self.dao.get_tasks()], ["Kept", "After"])
+
+    def test_automatic_compaction(self):
+        """Test the log is folded into a snapshot once it passes compact_bytes."""
+        self.dao.close()
+        self.dao = WALTaskDAO(self.directory, compact_bytes=4096)
+        for i in range(200):
+            self.dao.create_task(Task(f"Task {i}", "A description long enough to fill the log", "Pending"))
+        self.reopen()
+        self.assertEqual(len(self.dao), 200)
+        self.assertIn("snapshot", os.listdir(self.directory))
+
+    def test_batches_and_concurrent_writers(self):
+        """Test batch results and concurrent writes are all durable and grouped into fewer fsyncs."""
+        results = self.dao.create_tasks([Task("One"), Task(), Task("Three")])
+        self.assertEqual([r.get_id() if isinstance(r, Task) else None for r in results], [1, None, 2])
+
+        def writer():
+            for i in range(50):
+                self.dao.create_task(Task(f"Task {i}"))
+
+        threads = [threading.Thread(target=writer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(self.dao.log.syncs, self.dao.log.appended)
+        self.reopen()
+        self.assertEqual(len(self.dao), 402)
+        self.assertEqual(len({t.get_id() for t in self.dao.get_tasks()}), 402)
+
+
+if __name__ == '__main__':
+    unittest.main()
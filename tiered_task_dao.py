@@ -0,0 +1,240 @@
+import atexit
+import copy
+import threading
+import time
+from collections import OrderedDict
+from flask import has_app_context
+from task_dao import TaskDAO
+from errors import TaskNotFoundError, InvalidTaskError, VersionConflictError
+
+# Hot working set in memory over a DBTaskDAO:
+#  - get_task is served from memory: the latest unflushed write, or an LRU of up to `capacity` clean tasks, with
+#    misses loaded from the database
+#  - writes apply to memory and return; a background thread writes them back in batches, one transaction each,
+#    once the oldest unflushed write is max_staleness seconds old or max_batch tasks are dirty. Writes to one task
+#    coalesce, so the database always holds the state as of some earlier flush: a crash loses at most the last
+#    max_staleness seconds of writes, never part of a batch. Writers flush inline past max_dirty (backpressure).
+#  - listings, search and counts need the whole table, so they flush first and are answered by the database;
+#    their rows are not cached, so a scan never evicts the working set
+# The DAO assigns ids and versions itself and must be the only writer to its table. close() flushes and stops
+# the writer (also run at exit); the database must be file-backed, see GroupCommitWriter.
+
+_MISSING = object() # not in memory; None in the dirty set means deleted
+
+
+class TieredTaskDAO(TaskDAO):
+    def __init__(self, app, db_dao, capacity=100_000, max_staleness=1.0, max_batch=1000, max_dirty=None):
+        self.app = app
+        self.db_dao = db_dao
+        self.capacity = capacity
+        self.max_staleness = max_staleness
+        self.max_batch = max_batch
+        self.max_dirty = max_dirty if max_dirty is not None else 10 * max_batch
+        self.hot = OrderedDict() # {id: Task}, clean tasks in LRU order
+        self.dirty = {} # {id: Task or None}, written since the last flush
+        self.flushing = {} # the batch being written back
+        self.dirty_since = None # when the oldest unflushed write was made
+        self.lock = threading.Lock() # guards everything above and next_id
+        self.wake = threading.Condition(self.lock)
+        self.flush_lock = threading.Lock() # one flush at a time, in write order
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_tasks = 0
+        self.closed = False
+        self.next_id = (self._with_db(db_dao.max_id) or 0) + 1
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _with_db(self, call, *args, **kwargs):
+        # Request threads already have an app context (and a session); others get one for the call
+        if has_app_context():
+            return call(*args, **kwargs)
+        with self.app.app_context():
+            return call(*args, **kwargs)
+
+    def __len__(self):
+        self.flush()
+        return self._with_db(len, self.db_dao)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.hot), "dirty": len(self.dirty),
+                    "flushes": self.flushes, "flushed_tasks": self.flushed_tasks}
+
+    def _cached(self, task_id):
+        # Latest known state: a Task, None if deleted, or _MISSING. Caller holds self.lock.
+        task = self.dirty.get(task_id, _MISSING)
+        if task is _MISSING:
+            task = self.flushing.get(task_id, _MISSING)
+        if task is _MISSING:
+            task = self.hot.get(task_id, _MISSING)
+            if task is not _MISSING:
+                self.hot.move_to_end(task_id)
+        return task
+
+    def _remember(self, task):
+        self.hot[task.id] = task
+        self.hot.move_to_end(task.id)
+        while len(self.hot) > self.capacity:
+            self.hot.popitem(last=False)
+
+    def _load(self, task_id):
+        # Reads a miss from the database. Returns the task and the flush count it was read under: the task is only
+        # current if no flush has completed since and no write to it is pending (checked by the caller, under the lock).
+        with self.lock:
+            self.misses += 1
+            flushes = self.flushes
+        return self._with_db(self.db_dao.get_task, task_id), flushes # raises TaskNotFoundError
+
+    def get_task(self, task_id):
+        with self.lock:
+            task = self._cached(task_id)
+            if task is not _MISSING:
+                self.hits += 1
+        if task is _MISSING:
+            task, flushes = self._load(task_id)
+            with self.lock:
+                if self.flushes == flushes and self._cached(task_id) is _MISSING:
+                    self._remember(task)
+        if task is None:
+            raise TaskNotFoundError(f"Task with ID {task_id} not found")
+        return task
+
+    def _write(self, task_id, change):
+        # Applies change(current task) -> new task, or None to delete, under the lock; a miss is loaded first
+        loaded = flushes = None
+        while True:
+            with self.lock:
+                current = self._cached(task_id)
+                if current is _MISSING and loaded is not None and self.flushes == flushes:
+                    current = loaded
+                if current is not _MISSING:
+                    if current is None:
+                        raise TaskNotFoundError(f"Task with ID {task_id} not found")
+                    task = change(current)
+                    self._mark_dirty(task_id, task)
+                    break
+            loaded, flushes = self._load(task_id)
+        self._apply_backpressure()
+        return task
+
+    def _mark_dirty(self, task_id, task):
+        self.dirty[task_id] = task
+        self.hot.pop(task_id, None)
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+            self.wake.notify()
+        elif len(self.dirty) >= self.max_batch:
+            self.wake.notify()
+
+    def _apply_backpressure(self):
+        if len(self.dirty) >= self.max_dirty:
+            self.flush()
+
+    def create_task(self, task):
+        if not task.title:
+            raise InvalidTaskError("Task must have a title")
+        if task.description is None: # the column defaults DBTaskDAO would apply
+            task.description = ""
+        if task.status is None:
+            task.status = "Pending"
+        with self.lock:
+            task.id = self.next_id
+            self.next_id += 1
+            task.version = 1
+            self._mark_dirty(task.id, task)
+        self._apply_backpressure()
+        return task
+
+    def update_task(self, partial_task):
+        def change(existing_task):
+            if partial_task.version is not None and partial_task.version != existing_task.version:
+                raise VersionConflictError(f"Task with ID {partial_task.id} is at version {existing_task.version}, not {partial_task.version}")
+            updated_task = copy.copy(existing_task)
+            updated_task.version = existing_task.version + 1
+            if partial_task.title is not None:
+                updated_task.title = partial_task.title
+            if partial_task.description is not None:
+                updated_task.description = partial_task.description
+            if partial_task.status is not None:
+                updated_task.status = partial_task.status
+            return updated_task
+        return self._write(partial_task.id, change)
+
+    def delete_task(self, task_id):
+        self._write(task_id, lambda existing_task: None)
+        return True
+
+    def _sync(self):
+        # Makes the database current before a query only it can answer
+        self.flush()
+        self._with_db(self.db_dao.db.session.commit) # a snapshot older than another thread's flush must not be read
+
+    def get_tasks(self, **query):
+        self._sync()
+        return self._with_db(self.db_dao.get_tasks, **query)
+
+    def iter_tasks(self, **query):
+        self._sync()
+        return self.db_dao.iter_tasks(**query) # consumed inside the caller's app context, like DBTaskDAO's
+
+    def status_counts(self, **query):
+        self._sync()
+        return self._with_db(self.db_dao.status_counts, **query)
+
+    def flush(self):
+        # Writes back every write made so far, in one transaction; on failure they stay dirty and the error is raised.
+        # Returns the number of tasks written.
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty:
+                    return 0
+                batch, dirty_since = self.dirty, self.dirty_since
+                self.flushing, self.dirty, self.dirty_since = batch, {}, None
+            try:
+                self._with_db(self.db_dao.write_back, batch)
+            except Exception:
+                with self.lock:
+                    for task_id, task in batch.items():
+                        self.dirty.setdefault(task_id, task) # writes made since are newer
+                    self.dirty_since = dirty_since
+                    self.flushing = {}
+                raise
+            with self.lock:
+                self.flushing = {}
+                for task_id, task in batch.items():
+                    if task is not None and task_id not in self.dirty:
+                        self._remember(task) # clean now
+                self.flushes += 1
+                self.flushed_tasks += len(batch)
+            return len(batch)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.closed:
+                    timeout = None
+                    if self.dirty:
+                        timeout = self.dirty_since + self.max_staleness - time.monotonic()
+                        if timeout <= 0 or len(self.dirty) >= self.max_batch:
+                            break
+                    self.wake.wait(timeout)
+                if self.closed:
+                    return # close() runs the final flush
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(min(self.max_staleness, 1.0)) # the batch is dirty again, retry it later
+
+    def close(self):
+        # Stops the writer and flushes what is left; raises if that last flush fails
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.wake.notify()
+        atexit.unregister(self.close)
+        self.thread.join()
+        self.flush()
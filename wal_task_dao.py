@@ -0,0 +1,345 @@
+import functools
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from in_memory_task_dao import InMemoryDAO
+from task import Task
+
+# Durable InMemoryDAO: reads are served from memory exactly as before, and every create/update/delete is appended
+# to a binary write-ahead log before it becomes visible. A background writer batches whatever records piled up
+# during the previous fsync into one write+fsync (group commit), and each mutating call returns once its record is
+# on disk. When the log grows past compact_bytes it is folded into a snapshot; startup mmaps the snapshot and
+# replays the log written since.
+#
+# On disk, in `directory`:
+#   snapshot             MAGIC, generation, next_id, count, count task records, crc32 of everything before it
+#   wal.<generation>     log records appended since that generation's snapshot was cut
+# A task record is <id, version, field lengths> followed by the UTF-8 fields. A log record is <payload length,
+# crc32(op + payload), op> followed by the payload: a task record for PUT (the
+# whole task after the write, so replay is idempotent), the id for DELETE. A torn record at the end of the newest
+# log (a crash mid-write) is cut off at startup.
+
+SNAPSHOT_MAGIC = b"TASKSNP1"
+SNAPSHOT_HEADER = struct.Struct("<QQQ") # generation, next_id, count
+RECORD_HEADER = struct.Struct("<IIB") # payload length, crc32, op
+ID = struct.Struct("<Q")
+TASK_HEADER = struct.Struct("<QQiii") # id, version, then byte lengths of title, description and status (-1 encodes None)
+CRC = struct.Struct("<I")
+OP_PUT = 1
+OP_DELETE = 2
+WAL_FILE = re.compile(r"^wal\.(\d+)$")
+
+
+def encode_task(task):
+    fields = [None if value is None else value.encode("utf-8") for value in (task.title, task.description, task.status)]
+    header = TASK_HEADER.pack(task.id, task.version, *(-1 if data is None else len(data) for data in fields))
+    return header + b"".join(data for data in fields if data is not None)
+
+
+def _field(buffer, offset, length):
+    if length < 0:
+        return None, offset
+    return str(buffer[offset:offset + length], "utf-8"), offset + length
+
+
+def decode_task(buffer, offset):
+    # Returns (task, offset just past it); buffer may be bytes or an mmap
+    task = Task()
+    task.id, task.version, title_length, description_length, status_length = TASK_HEADER.unpack_from(buffer, offset)
+    offset += TASK_HEADER.size
+    task.title, offset = _field(buffer, offset, title_length)
+    task.description, offset = _field(buffer, offset, description_length)
+    task.status, offset = _field(buffer, offset, status_length)
+    return task, offset
+
+
+def encode_record(op, payload):
+    body = bytes((op,)) + payload
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(body), op) + payload
+
+
+def read_records(buffer):
+    # Yields (op, payload, end offset) for each intact record, stopping at the first torn or corrupt one
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(buffer):
+        length, crc, op = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        payload = buffer[start:start + length]
+        if len(payload) < length or zlib.crc32(bytes((op,)) + payload) != crc:
+            return
+        offset = start + length
+        yield op, payload, offset
+
+
+def write_snapshot(path, generation, next_id, tasks):
+    # Written beside the live snapshot and renamed over it, so a crash leaves either the old or the new one
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as output:
+        crc = 0
+        chunk = [SNAPSHOT_MAGIC, SNAPSHOT_HEADER.pack(generation, next_id, len(tasks))]
+        for task in tasks:
+            chunk.append(encode_task(task))
+            if len(chunk) >= 4096:
+                data = b"".join(chunk)
+                crc = zlib.crc32(data, crc)
+                output.write(data)
+                chunk = []
+        data = b"".join(chunk)
+        output.write(data)
+        output.write(CRC.pack(zlib.crc32(data, crc)))
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+def load_snapshot(path, tasks):
+    # Fills `tasks` from the snapshot through an mmap (no read() copy of the file); returns (generation, next_id)
+    with open(path, "rb") as snapshot_file, mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        end = len(buffer) - CRC.size
+        crc = 0
+        for start in range(0, end, 2**20):
+            crc = zlib.crc32(buffer[start:min(start + 2**20, end)], crc)
+        if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or CRC.unpack_from(buffer, end)[0] != crc:
+            raise ValueError(f"corrupt snapshot {path}")
+        generation, next_id, count = SNAPSHOT_HEADER.unpack_from(buffer, len(SNAPSHOT_MAGIC))
+        offset = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size
+        for _ in range(count):
+            task, offset = decode_task(buffer, offset)
+            tasks[task.id] = task
+    return generation, next_id
+
+
+def _fsync_directory(directory):
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class WriteAheadLog:
+    # Append-only log file with group commit: append() queues an encoded record and returns its sequence number,
+    # the writer thread writes and fsyncs everything queued in one go, wait(seq) blocks until seq is durable.
+    # A failed write is sticky: every later append/wait raises it, so nothing is acknowledged past a lost record.
+    def __init__(self, path, commit_delay=0.0):
+        self.file = open(path, "ab")
+        self.size = self.file.tell() # bytes in the current file, for the compaction trigger
+        self.commit_delay = commit_delay # optional extra wait to gather a bigger batch
+        self.condition = threading.Condition()
+        self.pending = []
+        self.appended = 0
+        self.durable = 0
+        self.syncs = 0
+        self.error = None
+        self.closed = False
+        self.writer = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+        self.writer.start()
+
+    def append(self, record):
+        with self.condition:
+            if self.error is not None:
+                raise self.error
+            if self.closed:
+                raise ValueError("write-ahead log is closed")
+            self.pending.append(record)
+            self.size += len(record)
+            self.appended += 1
+            self.condition.notify_all()
+            return self.appended
+
+    def wait(self, seq):
+        with self.condition:
+            while self.durable < seq and self.error is None:
+                self.condition.wait()
+            if self.durable < seq:
+                raise self.error
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self.condition:
+                batch, self.pending = self.pending, []
+                seq = self.appended
+                log_file = self.file
+            try:
+                log_file.write(b"".join(batch))
+                log_file.flush()
+                os.fsync(log_file.fileno())
+            except OSError as error:
+                with self.condition:
+                    self.error = error
+                    self.condition.notify_all()
+                return
+            with self.condition:
+                self.durable = seq
+                self.syncs += 1
+                self.condition.notify_all()
+
+    def rotate(self, path):
+        # Callers stop appends first (WALTaskDAO holds every write lock); waits for the old file to be durable
+        self.wait(self.appended)
+        with self.condition:
+            self.file.close()
+            self.file = open(path, "ab")
+            self.size = 0
+        _fsync_directory(os.path.dirname(path))
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.writer.join()
+        self.file.close()
+
+
+class WALTaskDAO(InMemoryDAO):
+    # InMemoryDAO backed by `directory`: the state found there is recovered on construction, and every write is
+    # durable when its call returns. Call close() on shutdown to stop the background threads.
+    def __init__(self, directory, compact_bytes=64 * 2**20, commit_delay=0.0, stripes=64):
+        super().__init__(stripes=stripes)
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self.compaction_lock = threading.Lock()
+        self.local = threading.local() # seq of the calling thread's last record
+        os.makedirs(directory, exist_ok=True)
+        self.generation = self._recover()
+        self.log = WriteAheadLog(self._wal_path(self.generation), commit_delay)
+        self.compact_requested = threading.Event()
+        self.closed = False
+        self.compactor = threading.Thread(target=self._compact_when_requested, name="wal-compactor", daemon=True)
+        self.compactor.start()
+
+    def _wal_path(self, generation):
+        return os.path.join(self.directory, f"wal.{generation:010d}")
+
+    def _log_generations(self):
+        return sorted(int(match.group(1)) for match in map(WAL_FILE.match, os.listdir(self.directory)) if match)
+
+    def _recover(self):
+        # Snapshot, then every log from its generation on, applied to a plain dict; indexes are built once at the end
+        tasks = {}
+        generation, next_id = 0, 1
+        snapshot_path = os.path.join(self.directory, "snapshot")
+        if os.path.exists(snapshot_path):
+            generation, next_id = load_snapshot(snapshot_path, tasks)
+        generations = [g for g in self._log_generations() if g >= generation]
+        for position, log_generation in enumerate(generations):
+            path = self._wal_path(log_generation)
+            with open(path, "rb") as log_file:
+                data = log_file.read()
+            end = 0
+            for op, payload, end in read_records(data):
+                if op == OP_PUT:
+                    task, _ = decode_task(payload, 0)
+                    tasks[task.id] = task
+                    next_id = max(next_id, task.id + 1)
+                else:
+                    tasks.pop(ID.unpack_from(payload)[0], None)
+            if end < len(data):
+                if position != len(generations) - 1:
+                    raise ValueError(f"corrupt write-ahead log {path} at offset {end}")
+                with open(path, "r+b") as log_file: # torn tail from a crash mid-append
+                    log_file.truncate(end)
+        for stale in self._log_generations():
+            if stale < generation: # already folded into the snapshot; left behind by a crash during compaction
+                os.remove(self._wal_path(stale))
+
+        self.tasks = tasks
+        self.next_id = next_id
+        for task_id in sorted(tasks):
+            task = tasks[task_id]
+            self.ids.add(task_id)
+            self._index(task)
+            self._index_text(task, self._tokens(task))
+        return generations[-1] if generations else generation
+
+    def _before_publish(self, task_id, task):
+        record = encode_record(OP_DELETE, ID.pack(task_id)) if task is None else encode_record(OP_PUT, encode_task(task))
+        self.local.seq = self.log.append(record)
+        if self.log.size > self.compact_bytes:
+            self.compact_requested.set()
+
+    def _wait_durable(self):
+        seq = getattr(self.local, "seq", None)
+        if seq is not None:
+            self.log.wait(seq)
+
+    def create_task(self, task):
+        task = super().create_task(task)
+        self._wait_durable()
+        return task
+
+    def update_task(self, partial_task):
+        task = super().update_task(partial_task)
+        self._wait_durable()
+        return task
+
+    def delete_task(self, task_id):
+        result = super().delete_task(task_id)
+        self._wait_durable()
+        return result
+
+    # Batches queue all their records first and wait for durability once, so a batch costs about one fsync
+
+    def create_tasks(self, tasks):
+        results = [self._try(functools.partial(InMemoryDAO.create_task, self), task) for task in tasks]
+        self._wait_durable()
+        return results
+
+    def update_tasks(self, partial_tasks):
+        results = [self._try(functools.partial(InMemoryDAO.update_task, self), partial_task) for partial_task in partial_tasks]
+        self._wait_durable()
+        return results
+
+    def delete_tasks(self, task_ids):
+        results = [self._try(functools.partial(InMemoryDAO.delete_task, self), task_id) for task_id in task_ids]
+        self._wait_durable()
+        return results
+
+    def compact(self):
+        # Cuts a consistent point with every write lock held (stripes, then the index lock, the order writes take
+        # them in), starts the next log there, then writes the snapshot without blocking writers. Tasks are never
+        # mutated in place, so a shallow copy of the dict is a consistent image.
+        with self.compaction_lock:
+            for lock in self.stripe_locks:
+                lock.acquire()
+            try:
+                with self.index_lock:
+                    generation = self.generation + 1
+                    self.log.rotate(self._wal_path(generation))
+                    self.generation = generation
+                    tasks = list(self.tasks.values())
+                    next_id = self.next_id
+            finally:
+                for lock in self.stripe_locks:
+                    lock.release()
+            write_snapshot(os.path.join(self.directory, "snapshot"), generation, next_id, tasks)
+            for stale in self._log_generations():
+                if stale < generation:
+                    os.remove(self._wal_path(stale))
+
+    def _compact_when_requested(self):
+        while True:
+            self.compact_requested.wait()
+            if self.closed:
+                return
+            self.compact_requested.clear()
+            if self.log.size > self.compact_bytes:
+                self.compact()
+
+    def close(self):
+        self.closed = True
+        self.compact_requested.set()
+        self.compactor.join()
+        self.log.close()